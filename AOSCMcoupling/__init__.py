@@ -1,12 +1,64 @@
-from AOSCMcoupling.context import Context
-from AOSCMcoupling.convergence_checker import ConvergenceChecker
-from AOSCMcoupling.experiment import Experiment
-from AOSCMcoupling.files import NEMOPreprocessor, OASISPreprocessor, OIFSPreprocessor
-from AOSCMcoupling.helpers import (
-    AOSCM,
-    compute_nstrtini,
-    get_ifs_forcing_info,
-    reduce_output,
-)
-from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
-from AOSCMcoupling.templates import render_config_xml
+"""Wrapper to run the EC-Earth AOSCM with varying coupling schemes.
+
+Submodules are imported on first access of their names (e.g.,
+`AOSCMcoupling.SchwarzCoupling`), so that importing the package itself is cheap
+and lightweight tools like the command line interface start quickly.
+"""
+
+import importlib
+
+_lazy_imports = {
+    "AitkenRelaxation": "acceleration",
+    "AndersonAcceleration": "acceleration",
+    "ConstantRelaxation": "acceleration",
+    "ExperimentCatalog": "catalog",
+    "compact_output": "compaction",
+    "Context": "context",
+    "deduplicate": "deduplication",
+    "prune_store": "deduplication",
+    "ConvergenceChecker": "convergence_checker",
+    "EnsembleRunner": "ensemble",
+    "create_sandbox": "ensemble",
+    "sweep": "ensemble",
+    "EnsembleStore": "ensemble_store",
+    "Experiment": "experiment",
+    "ForcingIndex": "forcing",
+    "compute_nstrtinis": "forcing",
+    "NEMOPreprocessor": "files",
+    "OASISPreprocessor": "files",
+    "OIFSPreprocessor": "files",
+    "load_nemo_ensemble": "files",
+    "load_nemo_output": "files",
+    "load_oifs_ensemble": "files",
+    "load_oifs_output": "files",
+    "AOSCM": "helpers",
+    "ModelRunError": "helpers",
+    "ModelRunEvent": "helpers",
+    "compute_nstrtini": "helpers",
+    "get_ifs_forcing_info": "helpers",
+    "IterateArchive": "iterate_archive",
+    "archive_iterates": "iterate_archive",
+    "reduce_output": "run_directory",
+    "RunCache": "run_cache",
+    "SchwarzCoupling": "schwarz_coupling",
+    "render_config_xml": "templates",
+    "render_config_xmls": "templates",
+    "Tracer": "tracing",
+    "WindowedSchwarzCoupling": "windowed_schwarz_coupling",
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name: str):
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f"{__name__}.{_lazy_imports[name]}")
+    value = getattr(module, name)
+    # cache the value, __getattr__ is only called for missing attributes
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
@@ -0,0 +1,244 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+from AOSCMcoupling.checkpoint import write_atomically
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.remapping import (
+    atm_to_oce,
+    oce_to_atm,
+    read_coupling_file,
+    write_coupling_file,
+)
+
+# physical bounds of remapped fields, enforced after extrapolation
+field_bounds = {
+    "A_Ice_frac": (0.0, 1.0),
+    "A_Ice_albedo": (0.0, 1.0),
+    "A_Ice_thickness": (0.0, None),
+    "A_Snow_thickness": (0.0, None),
+}
+
+
+class Acceleration(ABC):
+    """Base class for accelerating the Schwarz fixed-point iteration.
+
+    The fixed-point map G takes the forcing x_k of iteration k to the forcing remapped
+    from its output. Instead of x_{k+1} = G(x_k), accelerations combine G(x_k) with
+    previous forcings. Subclasses implement `_next`. All vectors are the coupling
+    fields of one iteration, flattened and concatenated (see `read_forcing`).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """forget all previous iterations, e.g., when starting a new experiment."""
+        self.forcing = None
+        self.weights = None
+
+    def update(self, remapped: np.ndarray) -> np.ndarray:
+        """forcing for the next iteration, given the remapped forcing G(x_k)."""
+        if self.forcing is None:
+            # no forcing of the current iteration known yet: plain fixed-point step
+            next_forcing = remapped
+        else:
+            next_forcing = self._next(self.forcing, remapped)
+        self.forcing = next_forcing
+        return next_forcing
+
+    @abstractmethod
+    def _next(self, forcing: np.ndarray, remapped: np.ndarray) -> np.ndarray:
+        """forcing x_{k+1}, given the forcing x_k and the remapped forcing G(x_k)."""
+
+
+class ConstantRelaxation(Acceleration):
+    """x_{k+1} = x_k + omega * (G(x_k) - x_k)."""
+
+    def __init__(self, omega: float = 0.5):
+        """Constructor.
+
+        :param omega: relaxation factor in (0, 1], default: 0.5
+        :type omega: float, optional
+        """
+        if not 0 < omega <= 1:
+            raise ValueError("Relaxation factor must be in (0, 1]")
+        self.omega = omega
+        super().__init__()
+
+    def _next(self, forcing: np.ndarray, remapped: np.ndarray) -> np.ndarray:
+        return forcing + self.omega * (remapped - forcing)
+
+
+class AitkenRelaxation(Acceleration):
+    """Relaxation with a factor updated by Aitken's delta-squared method.
+
+    omega_k = -omega_{k-1} * r_{k-1}^T (r_k - r_{k-1}) / |r_k - r_{k-1}|^2
+    with residuals r_k = G(x_k) - x_k, bounded by `omega_bounds`.
+    """
+
+    def __init__(
+        self, initial_omega: float = 0.5, omega_bounds: tuple[float, float] = (0.05, 1)
+    ):
+        """Constructor.
+
+        :param initial_omega: relaxation factor of the first relaxed step, default: 0.5
+        :type initial_omega: float, optional
+        :param omega_bounds: smallest and largest relaxation factor, default: (0.05, 1)
+        :type omega_bounds: tuple[float, float], optional
+        """
+        self.initial_omega = initial_omega
+        self.omega_bounds = omega_bounds
+        super().__init__()
+
+    def reset(self) -> None:
+        super().reset()
+        self.omega = self.initial_omega
+        self.residual = None
+
+    def _next(self, forcing: np.ndarray, remapped: np.ndarray) -> np.ndarray:
+        residual = remapped - forcing
+        if self.residual is not None:
+            residual_change = residual - self.residual
+            denominator = residual_change @ residual_change
+            if denominator > 0:
+                self.omega = np.clip(
+                    -self.omega * (self.residual @ residual_change) / denominator,
+                    *self.omega_bounds,
+                )
+        self.residual = residual
+        return forcing + self.omega * residual
+
+
+class AndersonAcceleration(Acceleration):
+    """Anderson mixing over the last `history` iterations.
+
+    The residual is minimized (in the least squares sense, with each coupling field
+    scaled to unit maximum) over affine combinations of previous residuals, and the
+    next forcing is the corresponding combination of forcings and remapped forcings.
+    """
+
+    def __init__(self, history: int = 5, mixing: float = 1.0, rcond: float = 1e-10):
+        """Constructor.
+
+        :param history: maximum number of previous iterations used, default: 5
+        :type history: int, optional
+        :param mixing: weight of the remapped forcing (1: plain Anderson), default: 1
+        :type mixing: float, optional
+        :param rcond: cut-off ratio for small singular values, default: 1e-10
+        :type rcond: float, optional
+        """
+        if history < 1:
+            raise ValueError("History must contain at least one iteration")
+        self.history = history
+        self.mixing = mixing
+        self.rcond = rcond
+        super().__init__()
+
+    def reset(self) -> None:
+        super().reset()
+        self.forcings = []
+        self.residuals = []
+
+    def _next(self, forcing: np.ndarray, remapped: np.ndarray) -> np.ndarray:
+        residual = remapped - forcing
+        self.forcings = (self.forcings + [forcing])[-(self.history + 1) :]
+        self.residuals = (self.residuals + [residual])[-(self.history + 1) :]
+        next_forcing = forcing + self.mixing * residual
+        if len(self.residuals) == 1:
+            return next_forcing
+
+        weights = np.ones_like(residual) if self.weights is None else self.weights
+        residual_changes = np.diff(self.residuals, axis=0).T
+        forcing_changes = np.diff(self.forcings, axis=0).T
+        gamma = np.linalg.lstsq(
+            weights[:, None] * residual_changes, weights * residual, rcond=self.rcond
+        )[0]
+        return next_forcing - (forcing_changes + self.mixing * residual_changes) @ gamma
+
+
+def _forcing_files(directory: Path) -> list[Path]:
+    names = [*atm_to_oce.values(), *oce_to_atm.values()]
+    return [
+        directory / f"{name}.nc"
+        for name in names
+        if (directory / f"{name}.nc").exists()
+    ]
+
+
+def read_forcing(directory: Path) -> tuple[dict[Path, dict], np.ndarray]:
+    """Read the remapped coupling fields in a run directory.
+
+    :return: the fields (as read by `read_coupling_file`), by file, and all their
+        values flattened into one vector
+    :rtype: tuple[dict[Path, dict], np.ndarray]
+    """
+    fields = {}
+    for path in _forcing_files(Path(directory)):
+        content = path.read_bytes()
+        with netcdf_lock:
+            field = read_coupling_file(path.name, content)
+        if field is None:
+            raise ValueError(f"Unexpected format of remapped forcing: {path}")
+        fields[path] = field
+    vector = np.concatenate(
+        [np.ravel(field["data"]).astype(np.float64) for field in fields.values()]
+    )
+    return fields, vector
+
+
+def field_weights(fields: dict[Path, dict]) -> np.ndarray:
+    """per-value weights scaling each field to a maximum of one."""
+    return np.concatenate(
+        [
+            np.full(field["data"].size, 1 / max(np.abs(field["data"]).max(), 1e-12))
+            for field in fields.values()
+        ]
+    )
+
+
+def write_forcing(fields: dict[Path, dict], vector: np.ndarray) -> np.ndarray:
+    """Write forcing values back to the files read by `read_forcing`.
+
+    Values are clipped to `field_bounds`; fill values are kept.
+
+    :return: the values as written
+    :rtype: np.ndarray
+    """
+    written = []
+    offset = 0
+    for path, field in fields.items():
+        data = field["data"]
+        values = vector[offset : offset + data.size].reshape(data.shape)
+        offset += data.size
+        var_name = path.stem
+        if var_name in field_bounds:
+            values = np.clip(values, *field_bounds[var_name])
+        fill_value = field["attributes"].get("_FillValue", None)
+        if fill_value is not None:
+            values = np.where(data == fill_value, data, values)
+        field = dict(field, data=values.astype(data.dtype))
+        written.append(np.ravel(field["data"]).astype(np.float64))
+        with netcdf_lock:
+            content = write_coupling_file(path.name, var_name, field)
+        write_atomically(path, bytes(content))
+    return np.concatenate(written)
+
+
+def accelerate_forcing(directory: Path, acceleration: Acceleration) -> np.ndarray:
+    """Replace the remapped forcing in a run directory by the accelerated forcing.
+
+    :param directory: run directory containing the remapped forcing
+    :type directory: Path
+    :param acceleration: acceleration method, keeps track of previous iterations
+    :type acceleration: Acceleration
+    :return: the accelerated forcing
+    :rtype: np.ndarray
+    """
+    fields, remapped = read_forcing(directory)
+    if acceleration.weights is None:
+        acceleration.weights = field_weights(fields)
+    # the next iteration is forced with the values after clipping
+    acceleration.forcing = write_forcing(fields, acceleration.update(remapped))
+    return acceleration.forcing
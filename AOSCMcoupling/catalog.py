@@ -0,0 +1,234 @@
+import dataclasses
+import json
+import sqlite3
+import types
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ruamel.yaml import YAML
+
+from AOSCMcoupling.experiment import Experiment
+
+# columns describing the run, in addition to one column per `Experiment` field
+run_columns = {
+    "run_directory": "TEXT PRIMARY KEY",
+    "kind": "TEXT",
+    "converged": "INTEGER",
+    "wall_time": "REAL",
+    "recorded_at": "TEXT",
+}
+
+
+def _field_types(field: dataclasses.Field) -> tuple:
+    """types of a field, i.e., the members of a union or the annotation itself."""
+    if typing.get_origin(field.type) in (typing.Union, types.UnionType):
+        return typing.get_args(field.type)
+    return (field.type,)
+
+
+def _is_json(field: dataclasses.Field) -> bool:
+    return any(
+        field_type is dict or typing.get_origin(field_type) is dict
+        for field_type in _field_types(field)
+    )
+
+
+def _column_type(field: dataclasses.Field) -> str:
+    field_types = _field_types(field)
+    if bool in field_types or int in field_types:
+        return "INTEGER"
+    if float in field_types:
+        return "REAL"
+    return "TEXT"
+
+
+experiment_fields = {field.name: field for field in dataclasses.fields(Experiment)}
+experiment_columns = {
+    name: _column_type(field) for name, field in experiment_fields.items()
+}
+
+
+def _to_sql(value):
+    """representation of a value in the catalog."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def _normalize(column: str, value):
+    """value of a column in the representation used in the catalog."""
+    field = experiment_fields.get(column)
+    if field is not None and pd.Timestamp in _field_types(field):
+        value = pd.Timestamp(value)
+    return _to_sql(value)
+
+
+class ExperimentCatalog:
+    """Catalog of AOSCM runs in a local SQLite database.
+
+    Each run directory (e.g., an SWR iterate) is one row, holding all `Experiment`
+    fields and the run's kind ("coupled", "atmosphere", "ocean" or "schwarz"),
+    convergence (all criteria met, for SWR iterates after the first), wall time of the
+    model run in seconds and the time it was recorded. Recording a run directory again
+    replaces its row. `SchwarzCoupling` and `EnsembleRunner` record their runs if they
+    are given a catalog.
+
+    A connection is opened for each operation, so catalogs can be shared by several
+    processes (on a local file system).
+    """
+
+    def __init__(self, path: Path | str, timeout: float = 60.0):
+        """Constructor.
+
+        :param path: database file, created if it does not exist
+        :type path: Path | str
+        :param timeout: seconds to wait for a lock held by another process, default: 60
+        :type timeout: float, optional
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(
+                f'"{name}" {column_type}'
+                for name, column_type in {**run_columns, **experiment_columns}.items()
+            )
+            connection.execute(f"CREATE TABLE IF NOT EXISTS runs ({columns})")
+            # columns of Experiment fields added after the catalog was created
+            existing = {row[1] for row in connection.execute("PRAGMA table_info(runs)")}
+            for name, column_type in experiment_columns.items():
+                if name not in existing:
+                    connection.execute(
+                        f'ALTER TABLE runs ADD COLUMN "{name}" {column_type}'
+                    )
+        connection.close()
+        self.columns = [*run_columns, *experiment_columns]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def record(
+        self,
+        experiment: Experiment,
+        run_directory: Path,
+        kind: str,
+        wall_time: float = None,
+    ) -> None:
+        """Add a run to the catalog.
+
+        :param experiment: experiment of the run, including iteration and convergence
+        :type experiment: Experiment
+        :param run_directory: output directory of the run
+        :type run_directory: Path
+        :param kind: "coupled", "atmosphere", "ocean" or "schwarz"
+        :type kind: str
+        :param wall_time: wall time of the model run in seconds, default: unknown
+        :type wall_time: float, optional
+        """
+        converged = None
+        if experiment.iterate_converged is not None:
+            converged = all(experiment.iterate_converged.values())
+        row = {
+            "run_directory": str(Path(run_directory).absolute()),
+            "kind": kind,
+            "converged": converged,
+            "wall_time": wall_time,
+            "recorded_at": str(pd.Timestamp.now()),
+            **{name: getattr(experiment, name) for name in experiment_columns.keys()},
+        }
+        names = ", ".join(f'"{name}"' for name in row)
+        placeholders = ", ".join("?" for _ in row)
+        with self._connect() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO runs ({names}) VALUES ({placeholders})",
+                [
+                    None if value is None else _normalize(name, value)
+                    for name, value in row.items()
+                ],
+            )
+        connection.close()
+
+    def _where(self, conditions: dict) -> tuple[str, list]:
+        clauses = []
+        parameters = []
+        for column, value in conditions.items():
+            if column not in self.columns:
+                raise ValueError(f"Unknown catalog column: {column}")
+            if value is None:
+                clauses.append(f'"{column}" IS NULL')
+            elif isinstance(value, (list, tuple, set)):
+                clauses.append(f'"{column}" IN ({", ".join("?" for _ in value)})')
+                parameters.extend(_normalize(column, item) for item in value)
+            else:
+                clauses.append(f'"{column}" = ?')
+                parameters.append(_normalize(column, value))
+        if not clauses:
+            return "", []
+        return " WHERE " + " AND ".join(clauses), parameters
+
+    def find(self, **conditions) -> list[Path]:
+        """Run directories matching all conditions.
+
+        Conditions are column names with a value (equality), a list of values (any
+        of them), or None (missing value), e.g.,
+        `catalog.find(kind="schwarz", converged=True, dt_cpl=3600, with_ice=True)`.
+
+        :return: matching run directories, ordered by recording time
+        :rtype: list[Path]
+        """
+        where, parameters = self._where(conditions)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT run_directory FROM runs{where} ORDER BY recorded_at",
+                parameters,
+            ).fetchall()
+        connection.close()
+        return [Path(row[0]) for row in rows]
+
+    def records(self, **conditions) -> pd.DataFrame:
+        """all columns of the runs matching all conditions (see `find`)."""
+        where, parameters = self._where(conditions)
+        with self._connect() as connection:
+            table = pd.read_sql_query(
+                f"SELECT * FROM runs{where} ORDER BY recorded_at",
+                connection,
+                params=parameters,
+            )
+        connection.close()
+        bool_columns = ["converged"] + [
+            name
+            for name, field in experiment_fields.items()
+            if bool in _field_types(field)
+        ]
+        for column in bool_columns:
+            table[column] = pd.array(
+                [None if pd.isna(value) else bool(value) for value in table[column]],
+                dtype="boolean",
+            )
+        for name, field in experiment_fields.items():
+            if _is_json(field):
+                table[name] = [
+                    None if pd.isna(value) else json.loads(value)
+                    for value in table[name]
+                ]
+        return table
+
+    def to_yaml(self, file: Path | str, **conditions) -> None:
+        """export the runs matching all conditions (see `find`) as a YAML list."""
+        table = self.records(**conditions).astype(object)
+        table = table.where(table.notna(), None)
+        entries = [
+            {
+                key: value if isinstance(value, dict) else _to_sql(value)
+                for key, value in entry.items()
+            }
+            for entry in table.to_dict("records")
+        ]
+        with open(file, "w") as stream:
+            YAML(typ="safe", pure=True).dump(entries, stream)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+manifest_name = "manifest.json"
+
+
+@contextmanager
+def atomic_path(path: Path):
+    """Temporary path next to `path` which replaces `path` when the block succeeds.
+
+    Files written to the temporary path and moved into place with `os.replace` are
+    never seen partially written, even after a crash. On an exception, the
+    temporary file is removed and `path` is unchanged.
+
+    :param path: file to write
+    :type path: Path
+    :yield: temporary file, to be written inside the block
+    :rtype: Path
+    """
+    path = Path(path)
+    temporary_file = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield temporary_file
+        os.replace(temporary_file, path)
+    finally:
+        temporary_file.unlink(missing_ok=True)
+
+
+def write_atomically(path: Path, content: str | bytes) -> Path:
+    """write text or bytes to a file atomically (see `atomic_path`)."""
+    with atomic_path(path) as temporary_file:
+        with open(temporary_file, "w" if isinstance(content, str) else "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+    return Path(path)
+
+
+def file_checksum(path: Path) -> str:
+    """sha256 checksum of a file."""
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def directory_checksums(directory: Path) -> dict[str, str]:
+    """checksums of all (non-hidden) files in a directory, by file name."""
+    return {
+        path.name: file_checksum(path)
+        for path in sorted(Path(directory).iterdir())
+        if path.is_file() and not path.name.startswith(".")
+    }
+
+
+def write_manifest(iterate_dir: Path, manifest: dict) -> Path:
+    """Write the manifest of an iteration atomically (see `atomic_path`).
+
+    :param iterate_dir: output directory of the iteration
+    :type iterate_dir: Path
+    :param manifest: JSON-serializable content
+    :type manifest: dict
+    :return: path of the manifest
+    :rtype: Path
+    """
+    return write_atomically(
+        Path(iterate_dir) / manifest_name, json.dumps(manifest, indent=2)
+    )
+
+
+def read_manifest(iterate_dir: Path) -> dict | None:
+    """manifest of an iteration, None if it does not exist or cannot be read."""
+    manifest_file = Path(iterate_dir) / manifest_name
+    try:
+        with open(manifest_file) as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_complete(manifest: dict | None) -> bool:
+    return manifest is not None and manifest.get("status") == "complete"
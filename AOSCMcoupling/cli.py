@@ -0,0 +1,297 @@
+"""Command line interface of AOSCMcoupling.
+
+Experiments are described by a YAML file with a `context` and an `experiment`
+section, holding the arguments of `Context` and `Experiment`:
+```yaml
+context:
+  model_version: 4
+  platform: pc-gcc-openmpi
+  model_dir: /path/to/ecearth
+  output_dir: /path/to/output
+  template_dir: /path/to/ece-scm-coupling/templates
+  data_dir: /path/to/data
+experiment:
+  exp_id: TEST
+  run_start_date: 2014-07-01
+  run_end_date: 2014-07-03
+  ...
+```
+
+Modules are only imported by the commands which need them, such that lightweight
+commands (e.g., `reduce-output`) start quickly.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+
+def load_setup(config_file: Path) -> tuple:
+    """Create context and experiment from a YAML configuration file.
+
+    :param config_file: file with a `context` and an `experiment` section
+    :type config_file: Path
+    :return: context and experiment
+    :rtype: tuple[Context, Experiment]
+    """
+    import pandas as pd
+    from ruamel.yaml import YAML
+
+    from AOSCMcoupling.context import Context
+    from AOSCMcoupling.experiment import Experiment
+
+    with open(config_file) as file:
+        config = YAML(typ="safe", pure=True).load(file)
+    if not isinstance(config, dict) or {"context", "experiment"} - set(config):
+        raise ValueError(
+            f"{config_file} needs a 'context' and an 'experiment' section."
+        )
+    experiment_config = dict(config["experiment"])
+    for date in ("run_start_date", "run_end_date"):
+        if date in experiment_config:
+            experiment_config[date] = pd.Timestamp(experiment_config[date])
+    return Context(**config["context"]), Experiment(**experiment_config)
+
+
+def _catalog(args: argparse.Namespace):
+    if args.catalog is None:
+        return None
+    from AOSCMcoupling.catalog import ExperimentCatalog
+
+    return ExperimentCatalog(args.catalog)
+
+
+def run_experiment(args: argparse.Namespace) -> int:
+    import asyncio
+    import time
+
+    from AOSCMcoupling.helpers import AOSCM, ModelRunError
+    from AOSCMcoupling.templates import render_config_xml
+
+    context, experiment = load_setup(args.config)
+    render_config_xml(context, experiment)
+    aoscm = AOSCM(context)
+    start = time.perf_counter()
+    if args.mode == "atmosphere":
+        model_run = aoscm.run_atmosphere_only_async()
+    elif args.mode == "ocean":
+        model_run = aoscm.run_ocean_only_async()
+    else:
+        model_run = aoscm.run_coupled_model_async()
+    # the asynchronous runs raise if the model fails, unlike the synchronous ones
+    try:
+        asyncio.run(model_run)
+    except ModelRunError as error:
+        print(f"Model run failed: {error}", file=sys.stderr)
+        return 1
+    catalog = _catalog(args)
+    if catalog is not None:
+        catalog.record(
+            experiment,
+            context.output_dir / experiment.exp_id,
+            args.mode,
+            time.perf_counter() - start,
+        )
+    return 0
+
+
+def run_schwarz(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+    context, experiment = load_setup(args.config)
+    schwarz = SchwarzCoupling(
+        experiment,
+        context,
+        reduce_output_after_iteration=not args.keep_output,
+        catalog=_catalog(args),
+    )
+    schwarz.run(
+        args.max_iters,
+        current_iter=None if args.command == "resume" else 1,
+        stop_at_convergence=not args.no_stop_at_convergence,
+        rel_tol=args.rel_tol,
+        pipelined=args.pipelined,
+        predictive_stopping=args.predictive_stopping,
+    )
+    print(f"Iterations: {schwarz.iter}, converged: {schwarz.converged}")
+    return 0
+
+
+def reduce(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.run_directory import reduce_output
+
+    for run_directory in args.run_directories:
+        if not run_directory.is_dir():
+            print(f"Not a directory: {run_directory}", file=sys.stderr)
+            return 1
+        reduce_output(run_directory, keep_debug_output=not args.remove_debug_output)
+    return 0
+
+
+def deduplicate(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.deduplication import deduplicate, prune_store
+
+    bytes_saved = deduplicate(args.directories, args.store, categories=args.categories)
+    if args.prune:
+        bytes_saved += prune_store(args.store)
+    print(f"Deduplication saved {bytes_saved / 2**20:.1f} MiB")
+    return 0
+
+
+def archive(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.iterate_archive import archive_iterates
+
+    archive_iterates(args.output_dir, args.exp_id, args.archive_dir, args.keyframe)
+    return 0
+
+
+def check_convergence(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.convergence_checker import ConvergenceChecker
+
+    checker = ConvergenceChecker()
+    converged_2, converged_inf = checker.check_convergence(
+        args.iterate, args.previous_iterate, args.reference, args.rel_tol
+    )
+    print(checker.errors.to_string())
+    print(f"2-norm: {converged_2}, inf-norm: {converged_inf}")
+    return 0 if converged_2 and converged_inf else 1
+
+
+def _condition(text: str) -> tuple[str, object]:
+    """parse `column=value` or `column=value,value` (any of the values)."""
+    import json
+
+    column, separator, value = text.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected column=value, got {text}")
+
+    def parse(item: str):
+        try:
+            return json.loads(item)
+        except json.JSONDecodeError:
+            return item
+
+    values = [parse(item) for item in value.split(",")]
+    return column, values if len(values) > 1 else values[0]
+
+
+def find_runs(args: argparse.Namespace) -> int:
+    from AOSCMcoupling.catalog import ExperimentCatalog
+
+    for run_directory in ExperimentCatalog(args.catalog).find(**dict(args.conditions)):
+        print(run_directory)
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="aoscm", description="Run and analyse EC-Earth AOSCM experiments."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run a single experiment")
+    run_parser.add_argument("config", type=Path, help="YAML configuration file")
+    run_parser.add_argument(
+        "--mode", choices=("coupled", "atmosphere", "ocean"), default="coupled"
+    )
+    run_parser.add_argument("--catalog", type=Path, help="record the run here")
+    run_parser.set_defaults(function=run_experiment)
+
+    for command, help in (
+        ("swr", "run Schwarz waveform relaxation from the first iteration"),
+        ("resume", "resume Schwarz waveform relaxation after the last iteration"),
+    ):
+        swr_parser = subparsers.add_parser(command, help=help)
+        swr_parser.add_argument("config", type=Path, help="YAML configuration file")
+        swr_parser.add_argument("--max-iters", type=int, required=True)
+        swr_parser.add_argument("--rel-tol", type=float, default=1e-3)
+        swr_parser.add_argument(
+            "--no-stop-at-convergence",
+            action="store_true",
+            help="always run max-iters iterations",
+        )
+        swr_parser.add_argument("--pipelined", action="store_true")
+        swr_parser.add_argument("--predictive-stopping", action="store_true")
+        swr_parser.add_argument(
+            "--keep-output", action="store_true", help="do not reduce the output"
+        )
+        swr_parser.add_argument(
+            "--catalog", type=Path, help="record all iterations here"
+        )
+        swr_parser.set_defaults(function=run_schwarz)
+
+    reduce_parser = subparsers.add_parser(
+        "reduce-output", help="remove output irrelevant for analysis"
+    )
+    reduce_parser.add_argument("run_directories", type=Path, nargs="+")
+    reduce_parser.add_argument("--remove-debug-output", action="store_true")
+    reduce_parser.set_defaults(function=reduce)
+
+    deduplicate_parser = subparsers.add_parser(
+        "deduplicate",
+        help="replace identical files in run directories by hardlinks to a store",
+    )
+    deduplicate_parser.add_argument(
+        "store", type=Path, help="on the same file system as the directories"
+    )
+    deduplicate_parser.add_argument("directories", type=Path, nargs="+")
+    deduplicate_parser.add_argument(
+        "--categories",
+        nargs="+",
+        default=["static"],
+        help="file categories to deduplicate, default: static",
+    )
+    deduplicate_parser.add_argument(
+        "--prune", action="store_true", help="remove files no longer linked"
+    )
+    deduplicate_parser.set_defaults(function=deduplicate)
+
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="archive the SWR iterates of an experiment as differences to a keyframe",
+    )
+    archive_parser.add_argument("output_dir", type=Path)
+    archive_parser.add_argument("exp_id")
+    archive_parser.add_argument("archive_dir", type=Path)
+    archive_parser.add_argument(
+        "--keyframe",
+        choices=("first", "last"),
+        default="first",
+        help="iterate stored in full",
+    )
+    archive_parser.set_defaults(function=archive)
+
+    convergence_parser = subparsers.add_parser(
+        "check-convergence",
+        help="check the SWR termination criteria for existing iterates "
+        "(exit status 1 if not converged)",
+    )
+    convergence_parser.add_argument("iterate", type=Path)
+    convergence_parser.add_argument("previous_iterate", type=Path)
+    convergence_parser.add_argument(
+        "reference", type=Path, help="usually the first iterate"
+    )
+    convergence_parser.add_argument("--rel-tol", type=float, default=1e-3)
+    convergence_parser.set_defaults(function=check_convergence)
+
+    find_parser = subparsers.add_parser(
+        "find", help="list run directories in a catalog matching all conditions"
+    )
+    find_parser.add_argument("catalog", type=Path)
+    find_parser.add_argument(
+        "conditions",
+        type=_condition,
+        nargs="*",
+        help="e.g., kind=schwarz converged=true dt_cpl=900,3600",
+    )
+    find_parser.set_defaults(function=find_runs)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = parser().parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
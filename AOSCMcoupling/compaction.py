@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Collection
+
+import netCDF4
+import numpy as np
+
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.helpers import available_cores
+from AOSCMcoupling.run_directory import RunDirectoryIndex, as_index
+
+compacted_categories = ("coupling", "oifs", "nemo")
+
+
+def _chunksizes(variable: netCDF4.Variable, target_bytes: int = 2**20) -> list[int]:
+    """chunks spanning all dimensions but the first one, with at most ~`target_bytes`."""
+    shape = [max(size, 1) for size in variable.shape]
+    if not shape:
+        return None
+    inner_size = int(np.prod(shape[1:])) * variable.dtype.itemsize
+    return [max(1, min(shape[0], target_bytes // max(inner_size, 1)))] + shape[1:]
+
+
+def _is_compressed(dataset: netCDF4.Dataset) -> bool:
+    return all(
+        (variable.filters() or {}).get("zlib", False)
+        for name, variable in dataset.variables.items()
+        if variable.ndim > 0 and name not in dataset.dimensions
+    )
+
+
+def _write_compacted(
+    source: netCDF4.Dataset,
+    target: netCDF4.Dataset,
+    complevel: int,
+    float32_variables: Collection[str] | bool,
+) -> None:
+    target.setncatts({attr: source.getncattr(attr) for attr in source.ncattrs()})
+    for name, dim in source.dimensions.items():
+        target.createDimension(name, None if dim.isunlimited() else dim.size)
+    for name, variable in source.variables.items():
+        variable.set_auto_maskandscale(False)
+        attributes = {attr: variable.getncattr(attr) for attr in variable.ncattrs()}
+        fill_value = attributes.pop("_FillValue", None)
+        dtype = variable.dtype
+        if float32_variables is True:
+            # coordinates, e.g., time in seconds, keep their precision
+            downcast = name not in source.dimensions
+        else:
+            downcast = name in float32_variables
+        downcast = downcast and dtype == np.float64
+        if downcast:
+            dtype = np.dtype(np.float32)
+            if fill_value is not None:
+                fill_value = np.float32(fill_value)
+        compress = variable.ndim > 0 and dtype != str
+        target_variable = target.createVariable(
+            name,
+            dtype,
+            variable.dimensions,
+            zlib=compress,
+            complevel=complevel,
+            shuffle=compress,
+            chunksizes=_chunksizes(variable) if compress else None,
+            fill_value=fill_value,
+        )
+        target_variable.set_auto_maskandscale(False)
+        target_variable.setncatts(attributes)
+        data = variable[...]
+        target_variable[...] = data.astype(dtype) if downcast else data
+
+
+def compact_file(
+    path: Path,
+    complevel: int = 4,
+    float32_variables: Collection[str] | bool = (),
+) -> int:
+    """Rewrite a NetCDF file with compression, chunking and optional float32 data.
+
+    The file is replaced only if the rewritten version is smaller.
+    Files in which all data variables are already compressed are skipped.
+
+    :param path: NetCDF file
+    :type path: Path
+    :param complevel: zlib compression level, default: 4
+    :type complevel: int, optional
+    :param float32_variables: names of float64 variables to store as float32,
+        or True for all of them except coordinates, default: none
+    :type float32_variables: Collection[str] | bool, optional
+    :return: bytes saved
+    :rtype: int
+    """
+    path = Path(path)
+    compacted_path = path.with_name(f".{path.name}.compact")
+    with netCDF4.Dataset(path) as source:
+        if _is_compressed(source):
+            return 0
+        file_format = "NETCDF4"
+        if source.data_model != "NETCDF4":
+            # keep the classic data model, which supports compression in NETCDF4 files
+            file_format = "NETCDF4_CLASSIC"
+        try:
+            with netCDF4.Dataset(compacted_path, "w", format=file_format) as target:
+                _write_compacted(source, target, complevel, float32_variables)
+        except BaseException:
+            compacted_path.unlink(missing_ok=True)
+            raise
+
+    bytes_saved = path.stat().st_size - compacted_path.stat().st_size
+    if bytes_saved <= 0:
+        compacted_path.unlink()
+        return 0
+    os.replace(compacted_path, path)
+    return bytes_saved
+
+
+def compact_output(
+    run_directory: Path | RunDirectoryIndex,
+    complevel: int = 4,
+    float32_variables: Collection[str] | bool = (),
+    max_workers: int = None,
+) -> int:
+    """Compress the NetCDF files which `reduce_output` keeps in a run directory.
+
+    Compacted are OASIS coupling fields, OpenIFS diagvar/progvar and NEMO output,
+    in parallel across files (see `compact_file` for the parameters). Coupling fields
+    are never downcast to float32, as they are remapped to the forcing of the next
+    iteration and compared in the convergence check.
+
+    :param run_directory: run directory or its index
+    :type run_directory: Path | RunDirectoryIndex
+    :param max_workers: number of processes, default: number of available cores
+    :type max_workers: int, optional
+    :return: bytes saved
+    :rtype: int
+    """
+    index = as_index(run_directory)
+    files = []
+    file_float32_variables = []
+    for category in compacted_categories:
+        for path in index.category(category):
+            if path.suffix != ".nc":
+                continue
+            files.append(path)
+            file_float32_variables.append(
+                () if category == "coupling" else float32_variables
+            )
+    if max_workers is None:
+        max_workers = available_cores()
+    max_workers = min(max_workers, len(files))
+    if max_workers <= 1:
+        bytes_saved = 0
+        for file, variables in zip(files, file_float32_variables):
+            with netcdf_lock:
+                bytes_saved += compact_file(file, complevel, variables)
+        return bytes_saved
+    # forking may copy netcdf_lock or HDF5 state held by another thread, e.g., the
+    # postprocessing thread of a pipelined SWR run, so workers are spawned
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        bytes_saved = executor.map(
+            compact_file,
+            files,
+            [complevel] * len(files),
+            file_float32_variables,
+        )
+        return sum(bytes_saved)
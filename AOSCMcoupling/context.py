@@ -8,6 +8,9 @@ class Context:
 
     Dataclass collecting paths relevant for running (multiple) experiments.
     Data in here is expected to be the same for all your experiments.
+    By default, the runscripts are expected in `runtime/scm-classic/PAPA`
+    inside `model_dir`. Pass `runscript_dir` to use a different directory,
+    e.g., a per-run copy for running several experiments at the same time.
 
     :raises ValueError: if model version is not supported
     :raises FileNotFoundError: if a provided path does not exist
@@ -22,9 +25,9 @@ class Context:
     data_dir: str | Path
 
     ifs_version: str = "43r3v1.ref"
+    runscript_dir: str | Path = None
 
     ecconf_executable: Path = field(init=False)
-    runscript_dir: Path = field(init=False)
     config_run_template: Path = field(init=False)
 
     ascm_executable: Path = field(init=False)
@@ -51,7 +54,9 @@ class Context:
             raise ValueError("Unsupported IFS version")
 
         self.ecconf_executable = self.model_dir / "sources/util/ec-conf/ec-conf"
-        self.runscript_dir = self.model_dir / "runtime/scm-classic/PAPA"
+        if self.runscript_dir is None:
+            self.runscript_dir = self.model_dir / "runtime/scm-classic/PAPA"
+        self.runscript_dir = Path(self.runscript_dir)
         self.ascm_executable = self.runscript_dir / f"{prefix}-scm_oifs.sh"
         self.oscm_executable = self.runscript_dir / f"{prefix}-scm_nemo.sh"
         self.aoscm_executable = self.runscript_dir / f"{prefix}-scm_oifs+nemo.sh"
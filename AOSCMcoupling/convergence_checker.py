@@ -1,9 +1,12 @@
 from pathlib import Path
 
+import netCDF4
 import numpy as np
+import pandas as pd
 import xarray as xr
 
-from AOSCMcoupling.files import OASISPreprocessor
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.run_directory import RunDirectoryIndex, as_index
 
 
 def vector_norm(x, dim, ord=None):
@@ -68,11 +71,121 @@ def relative_criterion(
     return bool(converged)
 
 
+def norm_name(ord) -> str:
+    """name of a vector norm as used in `Experiment.iterate_converged`, e.g., "2-norm"."""
+    if ord == np.inf:
+        return "inf-norm"
+    if ord == -np.inf:
+        return "-inf-norm"
+    return f"{ord}-norm"
+
+
+def _as_2d_array(data: xr.DataArray | xr.Dataset | dict) -> tuple[list, np.ndarray]:
+    if isinstance(data, xr.Dataset):
+        data = data.to_dataarray("variable")
+    if isinstance(data, xr.DataArray):
+        data = data.transpose("variable", "time")
+        return list(data["variable"].to_numpy()), data.to_numpy()
+    return list(data), np.stack([np.asarray(values) for values in data.values()])
+
+
+def error_table(
+    iterate_1: xr.DataArray | xr.Dataset | dict,
+    iterate_2: xr.DataArray | xr.Dataset | dict,
+    reference: xr.DataArray | xr.Dataset | dict,
+    ords=(2, np.inf),
+) -> pd.DataFrame:
+    """Compute ||iterate_1 - iterate_2||_ord and ||reference||_ord for all variables and norms.
+
+    The difference between the iterates is computed only once for all norms.
+    Iterates can be given as Datasets with a 'time' coordinate, as DataArrays with
+    dimensions ('variable', 'time'), or as dictionaries of 1D arrays over time.
+
+    :param iterate_1: current iterate
+    :param iterate_2: previous iterate
+    :param reference: reference for the relative error
+    :param ords: orders of the norms, defaults to (2, np.inf)
+    :type ords: tuple, optional
+    :return: table with one row per variable and columns (norm, quantity), where
+        quantity is "absolute", "reference", or "relative"
+    :rtype: pd.DataFrame
+    """
+    variables, values_1 = _as_2d_array(iterate_1)
+    _, values_2 = _as_2d_array(iterate_2)
+    _, values_reference = _as_2d_array(reference)
+    delta = values_1 - values_2
+    columns = {}
+    for ord in ords:
+        normed_delta = np.linalg.norm(delta, ord=ord, axis=-1)
+        normed_delta = np.where(normed_delta < 1e-16, 0.0, normed_delta)
+        normed_reference = np.linalg.norm(values_reference, ord=ord, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.where(
+                normed_delta == 0.0, 0.0, normed_delta / normed_reference
+            )
+        name = norm_name(ord)
+        columns[(name, "absolute")] = normed_delta
+        columns[(name, "reference")] = normed_reference
+        columns[(name, "relative")] = relative
+    table = pd.DataFrame(columns, index=pd.Index(variables, name="variable"))
+    table.columns.names = ["norm", "quantity"]
+    return table
+
+
+def criteria_from_error_table(table: pd.DataFrame, rel_tol: float) -> dict[str, bool]:
+    """Evaluate ||iterate_1 - iterate_2|| <= rel_tol * ||reference|| for each norm in the table.
+
+    :param table: output of `error_table`
+    :type table: pd.DataFrame
+    :param rel_tol: Tolerance
+    :type rel_tol: float
+    :return: for each norm, whether the criterion holds for all variables
+    :rtype: dict[str, bool]
+    """
+    return {
+        name: bool(
+            (table[name, "absolute"] <= rel_tol * table[name, "reference"]).all()
+        )
+        for name in table.columns.unique("norm")
+    }
+
+
+def read_coupling_field(coupling_file: Path, coupling_var: str) -> np.ndarray:
+    """Eagerly read the time series of an OASIS coupling field.
+
+    Like `OASISPreprocessor`, only the first horizontal grid point is kept.
+
+    :param coupling_file: OASIS output file
+    :type coupling_file: Path
+    :param coupling_var: name of the coupling field
+    :type coupling_var: str
+    :return: 1D array over time
+    :rtype: np.ndarray
+    """
+    with netcdf_lock, netCDF4.Dataset(coupling_file) as dataset:
+        if coupling_var in dataset.variables:
+            variable = dataset.variables[coupling_var]
+        else:
+            (variable,) = [
+                variable
+                for name, variable in dataset.variables.items()
+                if name not in dataset.dimensions
+            ]
+        variable.set_auto_mask(False)
+        values = variable[:]
+    return np.asarray(values, dtype=np.float64)[
+        (slice(None),) + (0,) * (values.ndim - 1)
+    ]
+
+
 class ConvergenceChecker:
-    """Wrapper to compute termination criteria for Schwarz iterations."""
+    """Wrapper to compute termination criteria for Schwarz iterations.
+
+    Coupling fields are read once per iterate and kept in memory as NumPy arrays,
+    such that each iterate is only read from disk when it is the current iterate.
+    """
 
     def __init__(self):
-        self.preprocessor = OASISPreprocessor()
         self.coupling_vars = [
             "A_TauX_oce",
             "A_TauY_oce",
@@ -97,52 +210,198 @@ class ConvergenceChecker:
         self.reference = None
         self.iterate_1 = None
         self.iterate_2 = None
+        self.errors = None
+        self._iterates = {}
 
-    def _load_reference_data(self, reference_rundir: Path):
-        coupling_files_reference = [
-            next(reference_rundir.glob(f"{coupling_var}_*.nc"))
+    def _read_iterate(self, index: RunDirectoryIndex) -> dict[str, np.ndarray]:
+        iterate = {
+            coupling_var: read_coupling_field(
+                index.coupling_file(coupling_var), coupling_var
+            )
             for coupling_var in self.coupling_vars
-        ]
-        self.reference = xr.open_mfdataset(
-            coupling_files_reference, preprocess=self.preprocessor.preprocess
+        }
+        lengths = {
+            coupling_var: len(values) for coupling_var, values in iterate.items()
+        }
+        if len(set(lengths.values())) > 1:
+            raise ValueError(
+                f"Coupling fields in {index.directory} differ in length: {lengths}"
+            )
+        return iterate
+
+    def _get_iterate(
+        self, rundir: Path | RunDirectoryIndex
+    ) -> tuple[Path, dict[str, np.ndarray]]:
+        if isinstance(rundir, RunDirectoryIndex):
+            key = rundir.directory.absolute()
+        else:
+            key = Path(rundir).absolute()
+        if key not in self._iterates:
+            self._iterates[key] = self._read_iterate(as_index(rundir))
+        return key, self._iterates[key]
+
+    def _to_dataarray(self, iterate: dict[str, np.ndarray]) -> xr.DataArray:
+        return xr.DataArray(
+            np.stack(list(iterate.values())),
+            dims=("variable", "time"),
+            coords={"variable": list(iterate)},
         )
 
     def check_convergence(
         self,
-        iterate_1_dir: Path,
-        iterate_2_dir: Path,
-        reference_dir: Path,
+        iterate_1_dir: Path | RunDirectoryIndex,
+        iterate_2_dir: Path | RunDirectoryIndex,
+        reference_dir: Path | RunDirectoryIndex,
         tolerance: float,
     ):
-        if self.reference is None:
-            self._load_reference_data(reference_dir)
+        """Check the termination criteria (2-norm and inf-norm) for the current iterate.
 
-        coupling_files_1 = [
-            next(iterate_1_dir.glob(f"{coupling_var}_*.nc"))
-            for coupling_var in self.coupling_vars
-        ]
-        self.iterate_1 = xr.open_mfdataset(
-            coupling_files_1, preprocess=self.preprocessor.preprocess
-        )
-        coupling_files_2 = [
-            next(iterate_2_dir.glob(f"{coupling_var}_*.nc"))
-            for coupling_var in self.coupling_vars
-        ]
-        self.iterate_2 = xr.open_mfdataset(
-            coupling_files_2, preprocess=self.preprocessor.preprocess
-        )
-        conv_2_norm = relative_criterion(
-            self.iterate_1,
-            self.iterate_2,
-            self.reference,
-            tolerance,
-            2,
-        )
-        conv_inf_norm = relative_criterion(
-            self.iterate_1,
-            self.iterate_2,
-            self.reference,
-            tolerance,
-            np.inf,
+        The current iterate (`iterate_1_dir`) is always read from disk, the previous
+        iterate and the reference are taken from memory if they have been read before.
+        The per-variable errors are available in `errors` afterwards (see `error_table`).
+        All coupling fields of all iterates need to have the same number of time steps.
+
+        :param iterate_1_dir: run directory (or its index) of the current iterate
+        :type iterate_1_dir: Path | RunDirectoryIndex
+        :param iterate_2_dir: run directory (or its index) of the previous iterate
+        :type iterate_2_dir: Path | RunDirectoryIndex
+        :param reference_dir: run directory (or its index) of the reference (usually the first iterate)
+        :type reference_dir: Path | RunDirectoryIndex
+        :param tolerance: relative tolerance
+        :type tolerance: float
+        :raises ValueError: if coupling fields differ in their number of time steps
+        :return: whether the 2-norm and the inf-norm criterion are satisfied
+        :rtype: tuple[bool, bool]
+        """
+        if isinstance(iterate_1_dir, RunDirectoryIndex):
+            self._iterates.pop(iterate_1_dir.directory.absolute(), None)
+        else:
+            self._iterates.pop(Path(iterate_1_dir).absolute(), None)
+        reference_key, reference = self._get_iterate(reference_dir)
+        _, iterate_2 = self._get_iterate(iterate_2_dir)
+        iterate_1_key, iterate_1 = self._get_iterate(iterate_1_dir)
+        # only the reference and the current iterate (the next previous one) are kept
+        self._iterates = {
+            reference_key: reference,
+            iterate_1_key: iterate_1,
+        }
+
+        self.reference = self._to_dataarray(reference)
+        self.iterate_1 = self._to_dataarray(iterate_1)
+        self.iterate_2 = self._to_dataarray(iterate_2)
+        lengths = {
+            "current iterate": self.iterate_1.sizes["time"],
+            "previous iterate": self.iterate_2.sizes["time"],
+            "reference": self.reference.sizes["time"],
+        }
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Iterates differ in the number of time steps: {lengths}")
+        self.errors = error_table(
+            self.iterate_1, self.iterate_2, self.reference, (2, np.inf)
         )
-        return conv_2_norm, conv_inf_norm
+        converged = criteria_from_error_table(self.errors, tolerance)
+        return converged["2-norm"], converged["inf-norm"]
+
+
+def max_relative_error(table: pd.DataFrame) -> float:
+    """largest relative error over all variables and norms of an `error_table`."""
+    relative = table.xs("relative", axis=1, level="quantity").to_numpy()
+    relative = relative[~np.isnan(relative)]
+    if relative.size == 0:
+        return 0.0
+    return float(relative.max())
+
+
+class ConvergenceMonitor:
+    """Track the errors of Schwarz iterations and predict convergence.
+
+    The error of an iteration is the largest relative error of an `error_table`,
+    the iteration converged if it is below the tolerance. The contraction factor
+    rho is the geometric mean of the ratios of successive errors over the last
+    `window` iterations. Assuming linear convergence, about
+    log(rel_tol / error) / log(rho) further iterations are needed.
+    With rho >= `stagnation_threshold`, the iteration is considered stagnating,
+    with rho > 1 diverging.
+    """
+
+    def __init__(
+        self,
+        rel_tol: float = 1e-3,
+        window: int = 3,
+        stagnation_threshold: float = 0.95,
+    ):
+        """Constructor.
+
+        :param rel_tol: relative tolerance of the convergence criteria, default: 1e-3
+        :type rel_tol: float, optional
+        :param window: number of error ratios for estimating the contraction factor, default: 3
+        :type window: int, optional
+        :param stagnation_threshold: contraction factor above which the iteration
+            stagnates, default: 0.95
+        :type stagnation_threshold: float, optional
+        """
+        self.rel_tol = rel_tol
+        self.window = window
+        self.stagnation_threshold = stagnation_threshold
+        self.errors = []
+
+    def update(self, errors: pd.DataFrame | float) -> dict:
+        """Add the errors of the next iteration and update the prediction.
+
+        :param errors: `error_table` of the iteration or its maximum relative error
+        :type errors: pd.DataFrame | float
+        :return: current prediction (see `prediction`)
+        :rtype: dict
+        """
+        if isinstance(errors, pd.DataFrame):
+            errors = max_relative_error(errors)
+        self.errors.append(float(errors))
+        return self.prediction()
+
+    def contraction_factor(self) -> float | None:
+        """estimated contraction factor, None if it cannot be estimated (yet)."""
+        errors = np.array(self.errors[-(self.window + 1) :])
+        if len(errors) < 2 or not np.all(np.isfinite(errors)):
+            return None
+        if np.any(errors[:-1] == 0):
+            return None
+        ratios = errors[1:] / errors[:-1]
+        if np.any(ratios == 0):
+            return 0.0
+        return float(np.exp(np.mean(np.log(ratios))))
+
+    def status(self) -> str:
+        """ "converged", "converging", "stagnating", "diverging", or "unknown"."""
+        if self.errors and self.errors[-1] <= self.rel_tol:
+            return "converged"
+        contraction_factor = self.contraction_factor()
+        if contraction_factor is None or len(self.errors) <= self.window:
+            return "unknown"
+        if contraction_factor > 1:
+            return "diverging"
+        if contraction_factor >= self.stagnation_threshold:
+            return "stagnating"
+        return "converging"
+
+    def remaining_iterations(self) -> int | None:
+        """predicted number of further iterations until convergence."""
+        if not self.errors:
+            return None
+        error = self.errors[-1]
+        if error <= self.rel_tol:
+            return 0
+        contraction_factor = self.contraction_factor()
+        if contraction_factor is None or contraction_factor >= 1:
+            return None
+        if contraction_factor == 0:
+            return 1
+        return int(np.ceil(np.log(self.rel_tol / error) / np.log(contraction_factor)))
+
+    def prediction(self) -> dict:
+        """error, contraction factor, predicted further iterations and status."""
+        return {
+            "error": self.errors[-1] if self.errors else None,
+            "contraction_factor": self.contraction_factor(),
+            "remaining_iterations": self.remaining_iterations(),
+            "status": self.status(),
+        }
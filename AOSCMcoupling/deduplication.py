@@ -0,0 +1,125 @@
+import os
+import stat
+import uuid
+from pathlib import Path
+from typing import Collection
+
+from AOSCMcoupling.checkpoint import file_checksum
+from AOSCMcoupling.run_directory import classify
+
+
+def _stored_path(store: Path, checksum: str) -> Path:
+    return store / checksum[:2] / checksum
+
+
+def _replace_with_link(source: Path, target: Path) -> bool:
+    """atomically replace `target` by a hardlink to `source`, False if impossible."""
+    temporary_file = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.link(source, temporary_file)
+        os.replace(temporary_file, target)
+    except OSError:
+        # e.g., store and output are on different file systems
+        temporary_file.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _files(directory: Path, store: Path, categories: Collection[str]):
+    """files of the given categories below a directory, except hidden ones."""
+    for root, dir_names, file_names in os.walk(directory):
+        root = Path(root)
+        if root.absolute() == store.absolute():
+            dir_names.clear()
+            continue
+        dir_names[:] = [name for name in dir_names if not name.startswith(".")]
+        for file_name in file_names:
+            if file_name.startswith(".") or classify(file_name) not in categories:
+                continue
+            path = root / file_name
+            if path.is_file() and not path.is_symlink():
+                yield path
+
+
+def deduplicate(
+    directories: list[Path | str],
+    store: Path | str,
+    categories: Collection[str] = ("static",),
+    min_size: int = 1,
+) -> int:
+    """Replace identical files in run directories by hardlinks to a shared store.
+
+    All files of the given categories (see `run_directory.classify`) in the
+    directories and their subdirectories, e.g., the iterates `{exp_id}_{n}` of several
+    experiments or a whole output directory, are hashed (sha256). Each distinct content
+    is kept once in `store`, which has to be on the same file system, and every copy
+    is replaced by a hardlink to it. The directory layout is unchanged. Stored files
+    are made read-only, as modifying one of the links in place would modify all of
+    them; removing a link (e.g., with `reduce_output`) is safe.
+
+    Directories can be deduplicated again, e.g., after further iterations, and several
+    processes can share a store.
+
+    :param directories: run directories or directories containing them
+    :type directories: list[Path | str]
+    :param store: directory of the shared store, created if it does not exist
+    :type store: Path | str
+    :param categories: file categories to deduplicate, default: ("static",), i.e.,
+        namelists, namcouple and fort.4
+    :type categories: Collection[str], optional
+    :param min_size: smallest file size in bytes to deduplicate, default: 1
+    :type min_size: int, optional
+    :return: number of bytes freed
+    :rtype: int
+    """
+    store = Path(store)
+    store.mkdir(parents=True, exist_ok=True)
+    bytes_saved = 0
+    # checksums of files seen in this pass, by (device, inode)
+    checksums = {}
+    for directory in directories:
+        for path in _files(Path(directory), store, categories):
+            file_stat = path.stat()
+            if file_stat.st_size < min_size:
+                continue
+            inode = (file_stat.st_dev, file_stat.st_ino)
+            if inode not in checksums:
+                checksums[inode] = file_checksum(path)
+            stored_path = _stored_path(store, checksums[inode])
+            if not stored_path.exists():
+                stored_path.parent.mkdir(exist_ok=True)
+                try:
+                    os.link(path, stored_path)
+                except FileExistsError:
+                    # stored by another process in the meantime
+                    pass
+                except OSError:
+                    continue
+                else:
+                    read_only = file_stat.st_mode & ~(
+                        stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+                    )
+                    os.chmod(stored_path, read_only)
+                    continue
+            if os.path.samefile(path, stored_path):
+                continue
+            if _replace_with_link(stored_path, path) and file_stat.st_nlink == 1:
+                bytes_saved += file_stat.st_size
+    return bytes_saved
+
+
+def prune_store(store: Path | str) -> int:
+    """Remove stored files which are no longer linked from any run directory.
+
+    :param store: directory of the shared store
+    :type store: Path | str
+    :return: number of bytes freed
+    :rtype: int
+    """
+    bytes_freed = 0
+    for stored_path in Path(store).glob("*/*"):
+        file_stat = stored_path.stat()
+        if file_stat.st_nlink == 1:
+            stored_path.unlink()
+            bytes_freed += file_stat.st_size
+    return bytes_freed
@@ -0,0 +1,186 @@
+import asyncio
+import dataclasses
+import itertools
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from AOSCMcoupling.catalog import ExperimentCatalog
+from AOSCMcoupling.context import Context
+from AOSCMcoupling.experiment import Experiment
+from AOSCMcoupling.helpers import AOSCM, available_cores
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+from AOSCMcoupling.templates import render_config_xml
+
+run_modes = {
+    "coupled": "run_coupled_model_async",
+    "atmosphere": "run_atmosphere_only_async",
+    "ocean": "run_ocean_only_async",
+    "schwarz": None,
+}
+
+
+def sweep(experiment: Experiment, **parameters) -> list[Experiment]:
+    """Create one experiment per combination of parameter values (Cartesian product).
+
+    Example: `sweep(experiment, cpl_scheme=[0, 1, 2], dt_cpl=[900, 3600])`
+    returns six experiments which only differ from `experiment` in these two fields.
+    If `dt_ice` is not swept and equal to `dt_nemo` in `experiment`, it follows `dt_nemo`.
+
+    :param experiment: base experiment
+    :type experiment: Experiment
+    :param parameters: lists of values for fields of `Experiment`
+    :return: list of experiments, one for each combination of values
+    :rtype: list[Experiment]
+    """
+    names = list(parameters)
+    if "dt_ice" not in parameters and experiment.dt_ice == experiment.dt_nemo:
+        names.append("dt_ice")
+        parameters["dt_ice"] = [None]
+    return [
+        dataclasses.replace(experiment, **dict(zip(names, values)))
+        for values in itertools.product(*parameters.values())
+    ]
+
+
+def create_sandbox(context: Context, sandbox_dir: Path) -> Context:
+    """Create a private copy of the runscript directory for a single run.
+
+    The returned context uses the copied runscript directory and an output directory
+    inside `sandbox_dir`, such that `config-run.xml`, the scripts generated by `ec-conf`
+    and the model output do not interfere with other runs.
+
+    :param context: context of the model installation
+    :type context: Context
+    :param sandbox_dir: directory for the sandbox, will be created if necessary
+    :type sandbox_dir: Path
+    :return: context pointing to the sandbox
+    :rtype: Context
+    """
+    sandbox_dir = Path(sandbox_dir).absolute()
+    runscript_dir = sandbox_dir / "runscripts"
+    shutil.copytree(
+        context.runscript_dir, runscript_dir, symlinks=True, dirs_exist_ok=True
+    )
+    return dataclasses.replace(
+        context,
+        runscript_dir=runscript_dir,
+        output_dir=sandbox_dir / context.output_dir.name,
+    )
+
+
+@dataclass
+class EnsembleMember:
+    """Result of a single run inside an ensemble."""
+
+    experiment: Experiment
+    context: Context
+    error: Exception = None
+
+    @property
+    def run_directory(self) -> Path:
+        return self.context.output_dir / self.experiment.exp_id
+
+
+def _run_member(
+    context: Context,
+    experiment: Experiment,
+    mode: str,
+    run_kwargs: dict,
+    catalog: ExperimentCatalog = None,
+) -> Experiment:
+    render_config_xml(context, experiment)
+    if mode == "schwarz":
+        schwarz = SchwarzCoupling(experiment, context, catalog=catalog)
+        schwarz.run(**run_kwargs)
+        return schwarz.experiment
+    aoscm = AOSCM(context)
+    start = time.perf_counter()
+    # raises ModelRunError if the model fails, so failed runs are not recorded
+    asyncio.run(getattr(aoscm, run_modes[mode])(**run_kwargs))
+    if catalog is not None:
+        catalog.record(
+            experiment,
+            context.output_dir / experiment.exp_id,
+            mode,
+            time.perf_counter() - start,
+        )
+    return experiment
+
+
+class EnsembleRunner:
+    """Run many AOSCM experiments concurrently.
+
+    Each experiment is run in its own sandbox (see `create_sandbox`) inside
+    `sandbox_root`, using a pool of processes. By default, the pool has one process
+    per available core. If a `catalog` is given, all runs (and all SWR iterates) are
+    recorded in it.
+    """
+
+    def __init__(
+        self,
+        context: Context,
+        sandbox_root: Path | str,
+        max_workers: int = None,
+        catalog: ExperimentCatalog = None,
+    ):
+        self.context = context
+        self.catalog = catalog
+        self.sandbox_root = Path(sandbox_root)
+        if max_workers is None:
+            max_workers = available_cores()
+        if max_workers < 1:
+            raise ValueError("Number of workers must be >= 1")
+        self.max_workers = max_workers
+
+    def run(
+        self, experiments: list[Experiment], mode: str = "coupled", **run_kwargs
+    ) -> list[EnsembleMember]:
+        """Run all experiments and wait for them to finish.
+
+        Failing runs do not stop the ensemble, their exception is stored in
+        `EnsembleMember.error` instead.
+
+        :param experiments: experiments to run, e.g., created with `sweep`
+        :type experiments: list[Experiment]
+        :param mode: "coupled", "atmosphere", "ocean", or "schwarz", default: "coupled"
+        :type mode: str, optional
+        :param run_kwargs: passed on to the asynchronous run method of `AOSCM` (e.g.,
+            `run_coupled_model_async`) or to `SchwarzCoupling.run`
+        :return: one member per experiment, in the same order as `experiments`
+        :rtype: list[EnsembleMember]
+        """
+        if mode not in run_modes:
+            raise ValueError(f"Run mode {mode} not available.")
+        self.sandbox_root.mkdir(parents=True, exist_ok=True)
+        members = [
+            EnsembleMember(
+                experiment,
+                create_sandbox(
+                    self.context, self.sandbox_root / f"{i:04d}_{experiment.exp_id}"
+                ),
+            )
+            for i, experiment in enumerate(experiments)
+        ]
+        max_workers = min(self.max_workers, max(len(members), 1))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _run_member,
+                    member.context,
+                    member.experiment,
+                    mode,
+                    run_kwargs,
+                    self.catalog,
+                )
+                for member in members
+            ]
+            for member, future in zip(members, futures):
+                try:
+                    member.experiment = future.result()
+                except Exception as error:
+                    print(f"Run in {member.context.output_dir} failed: {error}")
+                    member.error = error
+        return members
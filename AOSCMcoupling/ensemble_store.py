@@ -0,0 +1,229 @@
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from AOSCMcoupling.files import (
+    NEMOEnsemblePreprocessor,
+    OIFSEnsemblePreprocessor,
+    netcdf_lock,
+    parse_ensemble_path,
+)
+
+preprocessors = {
+    "oifs": OIFSEnsemblePreprocessor,
+    "nemo": NEMOEnsemblePreprocessor,
+}
+
+_epoch = pd.Timestamp("1970-01-01")
+
+
+def _time_in_seconds(time: np.ndarray) -> np.ndarray:
+    if np.issubdtype(time.dtype, np.timedelta64):
+        return time / np.timedelta64(1, "s")
+    return np.asarray(time, dtype=np.float64)
+
+
+class EnsembleStore:
+    """Consolidated, incrementally growing store of ensemble output of one component.
+
+    All members are kept in a single NetCDF4 file with an unlimited `member`
+    dimension, compressed and chunked per member. Each member is identified by its
+    start date and coupling scheme, its time coordinate is relative to the start date
+    (as in `OIFSEnsemblePreprocessor`/`NEMOEnsemblePreprocessor`).
+
+    Only numeric data variables (of the first member) and dimension coordinates are
+    stored. Members have to share the time axis; shorter members are padded with NaN.
+
+    The start date of a member is written after its data, so a member is only part of
+    the store once it is complete. The slot of a member whose addition was interrupted
+    is reused by the next one.
+    """
+
+    def __init__(self, path: Path | str, component: str, complevel: int = 4):
+        """Constructor.
+
+        :param path: NetCDF file of the store, created when the first member is added
+        :type path: Path | str
+        :param component: "oifs" or "nemo", determines the preprocessing of members
+        :type component: str
+        :param complevel: zlib compression level, default: 4
+        :type complevel: int, optional
+        """
+        if component not in preprocessors:
+            raise ValueError(f"Component {component} not supported.")
+        self.path = Path(path)
+        self.component = component
+        self.preprocessor = preprocessors[component]()
+        self.complevel = complevel
+        self._members = None
+
+    def members(self) -> list[tuple[pd.Timestamp, str]]:
+        """(start date, coupling scheme) of all complete members in the store."""
+        members = []
+        if self.path.exists():
+            with netcdf_lock, netCDF4.Dataset(self.path) as store:
+                start_dates = np.ma.masked_invalid(store.variables["start_date"][:])
+                coupling_schemes = store.variables["coupling_scheme"][:]
+            members = [
+                (_epoch + pd.Timedelta(seconds=float(start_date)), str(coupling_scheme))
+                for start_date, coupling_scheme in zip(start_dates, coupling_schemes)
+                if start_date is not np.ma.masked
+            ]
+        self._members = set(members)
+        return members
+
+    def add_member(
+        self,
+        files: list[Path],
+        start_date: pd.Timestamp = None,
+        coupling_scheme: str = None,
+    ) -> bool:
+        """Add the output of one ensemble member to the store.
+
+        :param files: output files of the member (e.g., diagvar.nc and progvar.nc)
+        :type files: list[Path]
+        :param start_date: start date, default: deduced from the path (see `parse_ensemble_path`)
+        :type start_date: pd.Timestamp, optional
+        :param coupling_scheme: coupling scheme, default: deduced from the path
+        :type coupling_scheme: str, optional
+        :return: False if the member was already in the store, True otherwise
+        :rtype: bool
+        """
+        files = [Path(file) for file in files]
+        if start_date is None or coupling_scheme is None:
+            parsed_scheme, parsed_start_date = parse_ensemble_path(files[0])
+            coupling_scheme = coupling_scheme or parsed_scheme
+            start_date = start_date or parsed_start_date
+        start_date = pd.Timestamp(start_date)
+        if self._members is None:
+            self.members()
+        if (start_date, coupling_scheme) in self._members:
+            return False
+
+        datasets = []
+        for file in files:
+            with xr.open_dataset(file) as ds:
+                datasets.append(self.preprocessor.preprocess_member(ds, start_date))
+        member = xr.merge(datasets).load()
+        self._append(member, start_date, coupling_scheme)
+        return True
+
+    def ingest(self, root: Path | str, pattern: str) -> int:
+        """Add all members found in `<root>/<start_date>/<coupling_scheme>/` to the store.
+
+        Members already in the store are skipped, so this can be called repeatedly
+        while an ensemble is running.
+
+        :param root: root directory of the ensemble
+        :type root: Path | str
+        :param pattern: glob pattern for the output files of a member, e.g., "*grid_T.nc"
+        :type pattern: str
+        :return: number of new members
+        :rtype: int
+        """
+        members = {}
+        for file in sorted(Path(root).glob(f"*/*/{pattern}")):
+            members.setdefault(file.parent, []).append(file)
+        # read the members once, e.g., to see those added by other processes
+        self.members()
+        return sum(self.add_member(files) for files in members.values())
+
+    def _append(
+        self, member: xr.Dataset, start_date: pd.Timestamp, coupling_scheme: str
+    ) -> None:
+        time = _time_in_seconds(member.time.to_numpy())
+        mode = "a" if self.path.exists() else "w"
+        with netcdf_lock, netCDF4.Dataset(self.path, mode) as store:
+            if mode == "w":
+                self._create(store, member)
+            n_time = store.dimensions["time"].size
+            stored_time = store.variables["time"][:n_time]
+            n_common = min(n_time, len(time))
+            if not np.allclose(stored_time[:n_common], time[:n_common]):
+                raise ValueError("Time axis of the member does not match the store.")
+            if len(time) > n_time:
+                store.variables["time"][n_time:] = time[n_time:]
+
+            # the slot after the complete members, possibly left by an interrupted append
+            start_dates = np.ma.masked_invalid(store.variables["start_date"][:])
+            index = int(np.ma.count(start_dates))
+            for name, da in member.data_vars.items():
+                if name not in store.variables:
+                    continue
+                variable = store.variables[name]
+                # shorter members are padded with the fill value
+                data = np.ma.masked_all(variable.shape[1:], dtype=variable.dtype)
+                data[tuple(slice(0, size) for size in da.shape)] = da.to_numpy()
+                variable[index] = data
+            store.variables["coupling_scheme"][index] = coupling_scheme
+            store.sync()
+            # written last: marks the member as complete
+            store.variables["start_date"][index] = (start_date - _epoch).total_seconds()
+        self._members.add((start_date, coupling_scheme))
+
+    def _create(self, store: netCDF4.Dataset, member: xr.Dataset) -> None:
+        store.createDimension("member", None)
+        store.createDimension("time", None)
+        start_date = store.createVariable(
+            "start_date", "f8", ("member",), fill_value=np.nan
+        )
+        start_date.units = "seconds since 1970-01-01"
+        store.createVariable("coupling_scheme", str, ("member",))
+        time = store.createVariable("time", "f8", ("time",))
+        time.units = "seconds"
+
+        for dim, size in member.sizes.items():
+            if dim == "time":
+                continue
+            store.createDimension(dim, size)
+            if dim in member.coords:
+                coord = member[dim]
+                variable = store.createVariable(dim, coord.dtype, (dim,))
+                variable.setncatts(coord.attrs)
+                variable[:] = coord.to_numpy()
+
+        for name, da in member.data_vars.items():
+            if not np.issubdtype(da.dtype, np.number):
+                continue
+            dims = ("member",) + da.dims
+            chunksizes = (1,) + tuple(max(size, 1) for size in da.shape)
+            fill_value = np.nan if np.issubdtype(da.dtype, np.floating) else None
+            variable = store.createVariable(
+                name,
+                da.dtype,
+                dims,
+                zlib=True,
+                complevel=self.complevel,
+                chunksizes=chunksizes,
+                fill_value=fill_value,
+            )
+            variable.setncatts(
+                {key: value for key, value in da.attrs.items() if key != "_FillValue"}
+            )
+
+    def open(
+        self, time_shift: pd.Timedelta = pd.Timedelta(0), unstack: bool = True
+    ) -> xr.Dataset:
+        """Open the store.
+
+        :param time_shift: time shift applied to the start dates, default: 0
+        :type time_shift: pd.Timedelta, optional
+        :param unstack: return dimensions (coupling_scheme, start_date, ...) like the
+            ensemble preprocessors; otherwise, members are kept along `member`, default: True
+        :type unstack: bool, optional
+        :return: all members of the store
+        :rtype: xr.Dataset
+        """
+        store = xr.open_dataset(self.path, decode_timedelta=True)
+        # skip the slot of an interrupted append
+        ds = store.isel(member=store.start_date.notnull().to_numpy())
+        ds = ds.assign_coords(start_date=ds.start_date + time_shift)
+        if unstack:
+            ds = ds.set_index(member=["coupling_scheme", "start_date"])
+            ds = ds.unstack("member").transpose("coupling_scheme", "start_date", ...)
+        # closing the returned dataset closes the file
+        ds.set_close(store.close)
+        return ds
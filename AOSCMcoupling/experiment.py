@@ -44,6 +44,7 @@ class Experiment:
     ice_jpl: int = 5
     iteration: int = None
     iterate_converged: dict[str, bool] = None
+    convergence_prediction: dict = None
 
     def __post_init__(self):
         self.nem_input_file = Path(self.nem_input_file)
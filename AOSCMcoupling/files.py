@@ -1,9 +1,17 @@
 import os
+import threading
 from pathlib import Path
+from typing import Callable
 
+import netCDF4
 import numpy as np
 import pandas as pd
 import xarray as xr
+from xarray.coding.times import decode_cf_datetime, decode_cf_timedelta
+
+# The netCDF C library is not thread-safe. Code which uses netCDF4 directly and may run
+# in several threads (remapping, convergence checks, compaction) holds this lock.
+netcdf_lock = threading.Lock()
 
 
 class ChangeDirectory:
@@ -31,6 +39,25 @@ class ChangeDirectory:
         os.chdir(self.saved_path)
 
 
+def parse_ensemble_path(source_file: Path | str) -> tuple[str, pd.Timestamp]:
+    """Deduce coupling scheme and start date from the path of an ensemble output file.
+
+    Ensemble output is expected in `<start_date>/<coupling_scheme>/<file>`,
+    where "schwarz" is reported as "converged SWR".
+
+    :param source_file: path of the output file
+    :type source_file: Path | str
+    :return: coupling scheme and start date
+    :rtype: tuple[str, pd.Timestamp]
+    """
+    source_file = Path(source_file)
+    coupling_scheme = source_file.parent.name
+    if coupling_scheme == "schwarz":
+        coupling_scheme = "converged SWR"
+    start_date = pd.Timestamp(source_file.parent.parent.name.replace("_", ", "))
+    return coupling_scheme, start_date
+
+
 class OIFSPreprocessor:
     """Preprocessor for Output Data from the OpenIFS SCM.
 
@@ -141,16 +168,24 @@ class OIFSEnsemblePreprocessor:
         :return: preprocessed dataset
         :rtype: xr.Dataset
         """
-        source_file = Path(ds.encoding["source"])
-        coupling_scheme = source_file.parent.name
-        if coupling_scheme == "schwarz":
-            coupling_scheme = "converged SWR"
-
-        start_date = pd.Timestamp(source_file.parent.parent.name.replace("_", ", "))
+        coupling_scheme, start_date = parse_ensemble_path(ds.encoding["source"])
+        ds = self.preprocess_member(ds, start_date)
         ds = ds.expand_dims(
             coupling_scheme=[coupling_scheme],
             start_date=[start_date + self.time_shift],
         )
+        return ds
+
+    def preprocess_member(self, ds: xr.Dataset, start_date: pd.Timestamp) -> xr.Dataset:
+        """Preprocessing of a single ensemble member, without adding metadata.
+
+        :param ds: dataset as loaded from disk
+        :type ds: xr.Dataset
+        :param start_date: start date of the member
+        :type start_date: pd.Timestamp
+        :return: preprocessed dataset
+        :rtype: xr.Dataset
+        """
         try:
             ds = ds.drop_vars("ncextr")
         except ValueError:
@@ -187,20 +222,28 @@ class NEMOEnsemblePreprocessor:
         :return: preprocessed dataset
         :rtype: xr.Dataset
         """
-        source_file = Path(ds.encoding["source"])
-        coupling_scheme = source_file.parent.name
-        if coupling_scheme == "schwarz":
-            coupling_scheme = "converged SWR"
+        coupling_scheme, start_date = parse_ensemble_path(ds.encoding["source"])
+        ds = self.preprocess_member(ds, start_date)
+        ds = ds.expand_dims(
+            coupling_scheme=[coupling_scheme],
+            start_date=[start_date + self.time_shift],
+        )
+        return ds
+
+    def preprocess_member(self, ds: xr.Dataset, start_date: pd.Timestamp) -> xr.Dataset:
+        """Preprocessing of a single ensemble member, without adding metadata.
 
-        start_date = pd.Timestamp(source_file.parent.parent.name.replace("_", ", "))
+        :param ds: dataset as loaded from disk
+        :type ds: xr.Dataset
+        :param start_date: start date of the member
+        :type start_date: pd.Timestamp
+        :return: preprocessed dataset, time relative to the start date (00:00 UTC)
+        :rtype: xr.Dataset
+        """
         ds = ds.isel(y=0, x=0)
         ds = ds.rename(time_counter="time")
         ds = ds.convert_calendar("gregorian")
         ds = ds.assign_coords(time=ds.time.data - np.datetime64(start_date.date()))
-        ds = ds.expand_dims(
-            coupling_scheme=[coupling_scheme],
-            start_date=[start_date + self.time_shift],
-        )
         return ds
 
 
@@ -242,3 +285,267 @@ class OASISPreprocessor:
             return ds.to_dataarray()
         except AttributeError:
             return ds.to_array()
+
+
+# attributes which xarray moves to the encoding when decoding a variable
+_encoding_attributes = ("_FillValue", "missing_value", "scale_factor", "add_offset")
+
+
+def _decode_time(variable: netCDF4.Variable) -> np.ndarray:
+    """Decode a time variable like xarray, as datetime64 or timedelta64 values.
+
+    Dates of non-standard calendars are converted to the Gregorian calendar with the
+    same year, month, day and time (as `convert_calendar("gregorian")` does).
+    """
+    values = np.asarray(variable[:], dtype=np.float64)
+    units = variable.getncattr("units")
+    if "since" not in units:
+        return np.asarray(decode_cf_timedelta(values, units), dtype="timedelta64[ns]")
+    calendar = getattr(variable, "calendar", "standard")
+    dates = decode_cf_datetime(values, units, calendar)
+    if dates.dtype == object:
+        dates = pd.to_datetime([str(date) for date in dates]).to_numpy()
+    return np.asarray(dates, dtype="datetime64[ns]")
+
+
+def _read_file(
+    path: Path,
+    variables: list[str],
+    time_dim: str,
+    transform_time: Callable[[np.ndarray], np.ndarray],
+    time_range: tuple = None,
+    squeeze_dims: tuple[str] = (),
+) -> xr.Dataset:
+    """Read some variables of a file, only the time steps within `time_range`.
+
+    The time axis is decoded once, transformed with `transform_time` and renamed to
+    `time`; `time_range` refers to the transformed time. The first element is taken
+    along `squeeze_dims`. Coordinate variables of the remaining dimensions are kept.
+    """
+    with netcdf_lock, netCDF4.Dataset(path) as dataset:
+        time = transform_time(_decode_time(dataset.variables[time_dim]))
+        time_slice = slice(None)
+        if time_range is not None:
+            if time.dtype.kind == "M":
+                start, end = (
+                    pd.Timestamp(bound).to_datetime64() for bound in time_range
+                )
+            else:
+                start, end = (_as_timedelta64(bound) for bound in time_range)
+            (indices,) = np.nonzero((time >= start) & (time <= end))
+            time_slice = slice(0, 0)
+            if indices.size:
+                time_slice = slice(indices[0], indices[-1] + 1)
+        data_vars = {}
+        coords = {"time": time[time_slice]}
+        for name in variables:
+            variable = dataset.variables[name]
+            index = []
+            dims = []
+            for dim in variable.dimensions:
+                if dim == time_dim:
+                    index.append(time_slice)
+                    dims.append("time")
+                elif dim in squeeze_dims:
+                    index.append(0)
+                else:
+                    index.append(slice(None))
+                    dims.append(dim)
+            values = variable[tuple(index)]
+            if np.ma.is_masked(values):
+                values = np.ma.filled(values.astype(np.float64), np.nan)
+            attrs = {
+                key: variable.getncattr(key)
+                for key in variable.ncattrs()
+                if key not in _encoding_attributes
+            }
+            data_vars[name] = xr.Variable(dims, np.asarray(values), attrs)
+            for dim in dims:
+                if dim not in coords and dim in dataset.variables:
+                    coords[dim] = np.asarray(dataset.variables[dim][:])
+    return xr.Dataset(data_vars, coords=coords)
+
+
+def _concat_time(datasets: list[xr.Dataset]) -> xr.Dataset:
+    datasets = [ds for ds in datasets if ds.time.size] or datasets[:1]
+    datasets = sorted(datasets, key=lambda ds: ds.time.values[0])
+    if len(datasets) == 1:
+        return datasets[0]
+    return xr.concat(datasets, dim="time", data_vars="minimal", coords="minimal")
+
+
+def _as_timedelta64(value) -> np.timedelta64:
+    return pd.Timedelta(value).to_timedelta64()
+
+
+def _nemo_time(origin: pd.Timestamp) -> Callable[[np.ndarray], np.ndarray]:
+    """NEMO output time relative to the start date (00:00 UTC) plus `origin`."""
+    origin = pd.Timestamp(origin)
+    if origin.hour == 0:
+        return lambda time: time
+    midnight = np.datetime64(origin.date(), "ns")
+    return lambda time: time - midnight + origin.to_datetime64()
+
+
+def load_oifs_output(
+    files: list[Path],
+    variables: list[str],
+    origin: pd.Timestamp,
+    time_shift: pd.Timedelta = pd.Timedelta(0),
+    time_range: tuple = None,
+) -> xr.Dataset:
+    """Load some variables of OpenIFS SCM output, as preprocessed by `OIFSPreprocessor`.
+
+    Equivalent to `xr.open_mfdataset(files, preprocess=OIFSPreprocessor(origin,
+    time_shift).preprocess)[variables]`, but only the given variables and time steps
+    are read (directly with netCDF4) and returned in memory.
+
+    :param files: output files, e.g., diagvar.nc, concatenated along time
+    :type files: list[Path]
+    :param variables: names of the variables to load
+    :type variables: list[str]
+    :param origin: start date (+ time) of the simulation
+    :type origin: pd.Timestamp
+    :param time_shift: time shift to apply for local time, default: 0
+    :type time_shift: pd.Timedelta, optional
+    :param time_range: first and last date (after the time shift) to load, default: all
+    :type time_range: tuple, optional
+    :return: preprocessed dataset
+    :rtype: xr.Dataset
+    """
+    offset = pd.Timestamp(origin).to_datetime64() + _as_timedelta64(time_shift)
+    return _concat_time(
+        [
+            _read_file(path, variables, "time", lambda time: offset + time, time_range)
+            for path in files
+        ]
+    )
+
+
+def load_nemo_output(
+    files: list[Path],
+    variables: list[str],
+    origin: pd.Timestamp,
+    time_shift: pd.Timedelta = pd.Timedelta(0),
+    time_range: tuple = None,
+) -> xr.Dataset:
+    """Load some variables of NEMO SCM output, as preprocessed by `NEMOPreprocessor`.
+
+    Equivalent to `xr.open_mfdataset(files, preprocess=NEMOPreprocessor(origin,
+    time_shift).preprocess)[variables]`, but only the given variables and time steps
+    are read (directly with netCDF4) and returned in memory.
+
+    :param files: output files, e.g., `*_grid_T.nc`, concatenated along time
+    :type files: list[Path]
+    :param variables: names of the variables to load
+    :type variables: list[str]
+    :param origin: start date (+ time) of the simulation
+    :type origin: pd.Timestamp
+    :param time_shift: time shift to apply for local time, default: 0
+    :type time_shift: pd.Timedelta, optional
+    :param time_range: first and last date (after the time shift) to load, default: all
+    :type time_range: tuple, optional
+    :return: preprocessed dataset
+    :rtype: xr.Dataset
+    """
+    start_date = _nemo_time(origin)
+    shift = _as_timedelta64(time_shift)
+    return _concat_time(
+        [
+            _read_file(
+                path,
+                variables,
+                "time_counter",
+                lambda time: start_date(time) + shift,
+                time_range,
+                squeeze_dims=("y", "x"),
+            )
+            for path in files
+        ]
+    )
+
+
+def _load_ensemble(
+    files: list[Path],
+    time_shift: pd.Timedelta,
+    read_member: Callable[[Path, pd.Timestamp], xr.Dataset],
+) -> xr.Dataset:
+    members = []
+    for path in files:
+        coupling_scheme, start_date = parse_ensemble_path(path)
+        members.append(
+            read_member(path, start_date).expand_dims(
+                coupling_scheme=[coupling_scheme],
+                start_date=[start_date + time_shift],
+            )
+        )
+    return xr.combine_by_coords(members, combine_attrs="drop_conflicts")
+
+
+def load_oifs_ensemble(
+    files: list[Path],
+    variables: list[str],
+    time_shift: pd.Timedelta = pd.Timedelta(0),
+    time_range: tuple = None,
+) -> xr.Dataset:
+    """Load some variables of OpenIFS ensemble output, like `OIFSEnsemblePreprocessor`.
+
+    Equivalent to `xr.open_mfdataset(files, preprocess=OIFSEnsemblePreprocessor(
+    time_shift).preprocess_ensemble)[variables]`, reading only what is needed.
+
+    :param files: output files in `<start_date>/<coupling_scheme>/` directories
+    :type files: list[Path]
+    :param variables: names of the variables to load
+    :type variables: list[str]
+    :param time_shift: time shift to apply to the start dates, default: 0
+    :type time_shift: pd.Timedelta, optional
+    :param time_range: first and last time (relative to the start date), default: all
+    :type time_range: tuple, optional
+    :return: dataset with dimensions `coupling_scheme`, `start_date` and `time`
+    :rtype: xr.Dataset
+    """
+    return _load_ensemble(
+        files,
+        time_shift,
+        lambda path, _: _read_file(
+            path, variables, "time", lambda time: time, time_range
+        ),
+    )
+
+
+def load_nemo_ensemble(
+    files: list[Path],
+    variables: list[str],
+    time_shift: pd.Timedelta = pd.Timedelta(0),
+    time_range: tuple = None,
+) -> xr.Dataset:
+    """Load some variables of NEMO ensemble output, like `NEMOEnsemblePreprocessor`.
+
+    Equivalent to `xr.open_mfdataset(files, preprocess=NEMOEnsemblePreprocessor(
+    time_shift).preprocess_ensemble)[variables]`, reading only what is needed.
+
+    :param files: output files in `<start_date>/<coupling_scheme>/` directories
+    :type files: list[Path]
+    :param variables: names of the variables to load
+    :type variables: list[str]
+    :param time_shift: time shift to apply to the start dates, default: 0
+    :type time_shift: pd.Timedelta, optional
+    :param time_range: first and last time (relative to 00:00 UTC of the start
+        date), default: all
+    :type time_range: tuple, optional
+    :return: dataset with dimensions `coupling_scheme`, `start_date` and `time`
+    :rtype: xr.Dataset
+    """
+
+    def read_member(path: Path, start_date: pd.Timestamp) -> xr.Dataset:
+        midnight = np.datetime64(start_date.date(), "ns")
+        return _read_file(
+            path,
+            variables,
+            "time_counter",
+            lambda time: time - midnight,
+            time_range,
+            squeeze_dims=("y", "x"),
+        )
+
+    return _load_ensemble(files, time_shift, read_member)
@@ -0,0 +1,249 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import pandas as pd
+
+from AOSCMcoupling.checkpoint import write_atomically
+from AOSCMcoupling.files import netcdf_lock
+
+
+def _timestamp(date: int, second: int) -> pd.Timestamp:
+    return pd.Timestamp(str(int(date))) + pd.Timedelta(seconds=int(second))
+
+
+@dataclass(frozen=True)
+class ForcingInfo:
+    """Metadata of an OpenIFS forcing file with equidistant time steps."""
+
+    path: Path
+    start_date: pd.Timestamp
+    frequency: pd.Timedelta
+    nlev: int
+    n_time: int
+
+    @property
+    def end_date(self) -> pd.Timestamp:
+        """date of the last time step."""
+        return self.start_date + (self.n_time - 1) * self.frequency
+
+    def nstrtini(
+        self, start_dates: pd.DatetimeIndex | list, end_dates=None
+    ) -> np.ndarray:
+        """Index of the first forcing time step (1-based) for each start date.
+
+        :param start_dates: simulation start dates
+        :type start_dates: pd.DatetimeIndex | list
+        :param end_dates: simulation end dates, checked against the end of the forcing
+            if given, default: None
+        :type end_dates: pd.DatetimeIndex | list, optional
+        :raises ValueError: if any start date is not available in the forcing file or
+            any end date is after its last time step
+        :return: `nstrtini` for each start date
+        :rtype: np.ndarray
+        """
+        nstrtini = compute_nstrtinis(
+            start_dates, self.start_date, self.frequency / pd.Timedelta(hours=1)
+        )
+        beyond_forcing = nstrtini > self.n_time
+        if end_dates is not None:
+            beyond_forcing |= pd.DatetimeIndex(end_dates) > self.end_date
+        if beyond_forcing.any():
+            dates = pd.DatetimeIndex(start_dates)[beyond_forcing]
+            raise ValueError(
+                f"Forcing file ends at {self.end_date}, runs starting at "
+                f"{', '.join(map(str, dates))} are not covered."
+            )
+        return nstrtini
+
+
+def compute_nstrtinis(
+    simulation_start_dates: pd.DatetimeIndex | list,
+    forcing_start_date: pd.Timestamp,
+    forcing_dt_hours: float = 6,
+) -> np.ndarray:
+    """Vectorized `compute_nstrtini`: `nstrtini` for an array of start dates.
+
+    :param simulation_start_dates: simulation start dates
+    :type simulation_start_dates: pd.DatetimeIndex | list
+    :param forcing_start_date: date of the first time step of the forcing file
+    :type forcing_start_date: pd.Timestamp
+    :param forcing_dt_hours: time step of the forcing file in hours, default: 6
+    :type forcing_dt_hours: float, optional
+    :raises ValueError: if any start date is before the forcing or between two
+        forcing time steps; the message lists all such dates
+    :return: `nstrtini` for each start date
+    :rtype: np.ndarray
+    """
+    start_dates = pd.DatetimeIndex(simulation_start_dates)
+    delta = (start_dates - forcing_start_date).total_seconds().to_numpy()
+    nstrtini = delta / (forcing_dt_hours * 3600) + 1
+    too_early = delta < 0
+    if too_early.any():
+        raise ValueError(
+            "Start dates are earlier than first value of forcing file: "
+            + ", ".join(map(str, start_dates[too_early]))
+        )
+    not_available = np.abs(np.round(nstrtini) - nstrtini) > 1e-10
+    if not_available.any():
+        raise ValueError(
+            "Start dates are not available in forcing file: "
+            + ", ".join(map(str, start_dates[not_available]))
+        )
+    return np.round(nstrtini).astype(int)
+
+
+def read_forcing_info(ifs_forcing_file: Path) -> ForcingInfo:
+    """Read the metadata of an OpenIFS forcing file.
+
+    Only the dimensions and the first two dates are read, not the forcing itself.
+
+    :param ifs_forcing_file: OpenIFS forcing file
+    :type ifs_forcing_file: Path
+    :raises ValueError: if the forcing file does not start at 00:00h
+    :return: start date, frequency, number of levels and of time steps
+    :rtype: ForcingInfo
+    """
+    with netcdf_lock, netCDF4.Dataset(ifs_forcing_file) as forcing:
+        n_time = forcing.dimensions["time"].size
+        nlev = forcing.dimensions["nlev"].size
+        dates = forcing.variables["date"][:2]
+        seconds = forcing.variables["second"][:2]
+    if seconds[0] > 0:
+        raise ValueError("OIFS forcing file needs to start at 00:00h.")
+    start_date = _timestamp(dates[0], seconds[0])
+    frequency = pd.Timedelta(0)
+    if n_time > 1:
+        frequency = _timestamp(dates[1], seconds[1]) - start_date
+    return ForcingInfo(Path(ifs_forcing_file), start_date, frequency, nlev, n_time)
+
+
+class ForcingIndex:
+    """Cached metadata of the OpenIFS forcing files in a directory.
+
+    Metadata is read once per file version (path, size and modification time) and
+    can be kept in a JSON file, so that it is shared between processes (e.g., the
+    jobs of a campaign over many start dates). Files which are not OpenIFS forcing
+    files are ignored.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        pattern: str = "*.nc",
+        cache_file: Path | str = None,
+    ):
+        """Constructor.
+
+        :param directory: directory with forcing files, e.g., `Context.data_dir`
+        :type directory: Path | str
+        :param pattern: glob pattern of the forcing files, default: "*.nc"
+        :type pattern: str, optional
+        :param cache_file: JSON file to load and store the metadata, default: None
+        :type cache_file: Path | str, optional
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.cache_file = None if cache_file is None else Path(cache_file)
+        self._entries = {}
+        if self.cache_file is not None and self.cache_file.exists():
+            with open(self.cache_file) as file:
+                self._entries = json.load(file)
+
+    @staticmethod
+    def _version(path: Path) -> list:
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, path: Path | str) -> ForcingInfo | None:
+        """metadata of a forcing file, None if it is not an OpenIFS forcing file."""
+        path = Path(path).absolute()
+        version = self._version(path)
+        entry = self._entries.get(str(path))
+        if entry is None or entry["version"] != version:
+            try:
+                info = read_forcing_info(path)
+                entry = {
+                    "version": version,
+                    "start_date": str(info.start_date),
+                    "frequency_seconds": info.frequency.total_seconds(),
+                    "nlev": info.nlev,
+                    "n_time": info.n_time,
+                }
+            except (OSError, KeyError, ValueError):
+                entry = {"version": version, "start_date": None}
+            self._entries[str(path)] = entry
+        if entry["start_date"] is None:
+            return None
+        return ForcingInfo(
+            path,
+            pd.Timestamp(entry["start_date"]),
+            pd.Timedelta(seconds=entry["frequency_seconds"]),
+            entry["nlev"],
+            entry["n_time"],
+        )
+
+    def scan(self) -> list[ForcingInfo]:
+        """metadata of all forcing files in the directory, stored in the cache file."""
+        infos = [self.get(path) for path in sorted(self.directory.glob(self.pattern))]
+        # forget files which no longer exist
+        existing = {str(path.absolute()) for path in self.directory.glob(self.pattern)}
+        self._entries = {
+            path: entry for path, entry in self._entries.items() if path in existing
+        }
+        self.save()
+        return [info for info in infos if info is not None]
+
+    def save(self) -> None:
+        """write the metadata to the cache file (atomically), if there is one."""
+        if self.cache_file is None:
+            return
+        write_atomically(self.cache_file, json.dumps(self._entries, indent=2))
+
+    def find(
+        self,
+        start_dates: pd.DatetimeIndex | list,
+        end_dates: pd.DatetimeIndex | list,
+        nlev: int = None,
+    ) -> list[tuple[ForcingInfo, int]]:
+        """Find a forcing file covering each simulation period.
+
+        :param start_dates: simulation start dates
+        :type start_dates: pd.DatetimeIndex | list
+        :param end_dates: simulation end dates
+        :type end_dates: pd.DatetimeIndex | list
+        :param nlev: required number of levels (60 or 137), default: any
+        :type nlev: int, optional
+        :raises ValueError: if no forcing file covers some of the periods
+        :return: forcing file metadata and `nstrtini` for each period
+        :rtype: list[tuple[ForcingInfo, int]]
+        """
+        start_dates = pd.DatetimeIndex(start_dates)
+        end_dates = pd.DatetimeIndex(end_dates)
+        found = [None] * len(start_dates)
+        for info in self.scan():
+            if nlev is not None and info.nlev != nlev:
+                continue
+            if info.n_time < 2:
+                continue
+            delta = (start_dates - info.start_date) / info.frequency
+            nstrtini = np.round(delta).astype(int) + 1
+            covered = (
+                (delta >= 0)
+                & (np.abs(nstrtini - 1 - delta) < 1e-10)
+                & (end_dates <= info.end_date)
+            )
+            for i in np.flatnonzero(covered):
+                if found[i] is None:
+                    found[i] = (info, int(nstrtini[i]))
+        missing = [
+            str(start_dates[i]) for i, match in enumerate(found) if match is None
+        ]
+        if missing:
+            raise ValueError(
+                f"No forcing file in {self.directory} covers the runs starting at "
+                f"{', '.join(missing)}."
+            )
+        return found
@@ -1,11 +1,55 @@
+import asyncio
+import hashlib
+import os
+import re
+import signal
 import subprocess
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable
 
 import pandas as pd
-import xarray as xr
 
 from AOSCMcoupling.context import Context
-from AOSCMcoupling.files import ChangeDirectory
+from AOSCMcoupling.forcing import read_forcing_info
+from AOSCMcoupling.run_directory import reduce_output  # noqa: F401 (moved)
+from AOSCMcoupling.tracing import Tracer, trace
+
+
+class ModelRunError(RuntimeError):
+    """Raised if a model run exits with an error or prints a known error marker."""
+
+    def __init__(self, message: str, returncode: int = None, log_file: Path = None):
+        super().__init__(message)
+        self.returncode = returncode
+        self.log_file = log_file
+
+
+@dataclass
+class ModelRunEvent:
+    """Progress event of a running model, created from a line of its output.
+
+    `kind` is "leg_finished" for lines containing "Finished leg" and "time_reached"
+    for other lines reporting a (simulated) date. `simulated_time` is the date
+    found in the line, if any.
+    """
+
+    kind: str
+    line: str
+    simulated_time: pd.Timestamp = None
+
+
+_date_pattern = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?")
+
+
+def _parse_event(line: str) -> ModelRunEvent | None:
+    match = _date_pattern.search(line)
+    simulated_time = pd.Timestamp(match.group()) if match is not None else None
+    if "Finished leg" in line:
+        return ModelRunEvent("leg_finished", line, simulated_time)
+    if simulated_time is not None:
+        return ModelRunEvent("time_reached", line, simulated_time)
+    return None
 
 
 class AOSCM:
@@ -13,13 +57,67 @@ class AOSCM:
 
     The class takes care of running `ec-conf` + calling the correct run script inside `runscript_dir`.
     We assume that the experiment is configured correctly with `config-run.xml` inside `runscript_dir`.
+
+    The `*_async` run methods stream the model output to a log file and raise a
+    `ModelRunError` as soon as the model fails or prints one of `error_markers`.
+
+    If `cache_ecconf` is set, `ec-conf` is skipped as long as `config-run.xml`, the
+    platform, the `ec-conf` executable and the templates in `runscript_dir` are unchanged
+    since its last successful invocation and the generated runscripts still exist.
+    Other inputs of `ec-conf`, e.g., platform configuration files, are not checked, so
+    the cache is only enabled on request.
+
+    If a `tracer` is given, the phases "ecconf" and "model" are recorded.
     """
 
-    def __init__(self, context: Context):
+    error_markers = (
+        "ABORT",
+        "Segmentation fault",
+        "forrtl: severe",
+        "Traceback (most recent call last)",
+    )
+
+    ecconf_hash_file = ".ecconf_hash"
+
+    def __init__(
+        self, context: Context, cache_ecconf: bool = False, tracer: Tracer = None
+    ):
         self.context = context
+        self.cache_ecconf = cache_ecconf
+        self.tracer = tracer
+
+    def _ecconf_hash(self) -> str:
+        runscript_dir = self.context.runscript_dir
+        sha = hashlib.sha256()
+        sha.update(self.context.platform.encode())
+        sha.update(str(self.context.ecconf_executable).encode())
+        sha.update(self.context.ecconf_executable.read_bytes())
+        sha.update((runscript_dir / "config-run.xml").read_bytes())
+        for template in sorted(runscript_dir.rglob("*.tmpl")):
+            stat = template.stat()
+            sha.update(f"{template}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return sha.hexdigest()
+
+    def _ecconf_up_to_date(self, ecconf_hash: str) -> bool:
+        hash_file = self.context.runscript_dir / self.ecconf_hash_file
+        if not hash_file.exists() or hash_file.read_text() != ecconf_hash:
+            return False
+        runscripts = [
+            self.context.ascm_executable,
+            self.context.oscm_executable,
+            self.context.aoscm_executable,
+            self.context.aoscm_schwarz_correction_executable,
+        ]
+        return all(runscript.exists() for runscript in runscripts)
 
     def _run_ecconf(self):
-        with ChangeDirectory(self.context.runscript_dir):
+        with trace(self.tracer, "ecconf"):
+            hash_file = self.context.runscript_dir / self.ecconf_hash_file
+            if self.cache_ecconf:
+                ecconf_hash = self._ecconf_hash()
+                if self._ecconf_up_to_date(ecconf_hash):
+                    return
+            hash_file.unlink(missing_ok=True)
             subprocess.run(
                 [
                     self.context.ecconf_executable,
@@ -27,9 +125,12 @@ class AOSCM:
                     self.context.platform,
                     "config-run.xml",
                 ],
+                cwd=self.context.runscript_dir,
                 capture_output=True,
                 check=True,
             )
+            if self.cache_ecconf:
+                hash_file.write_text(ecconf_hash)
 
     def run_coupled_model(
         self, print_time: bool = False, schwarz_correction: bool = False
@@ -40,82 +141,180 @@ class AOSCM:
         :type print_time: bool, optional
         :param schwarz_correction: whether to use the Schwarz correction runscript, default: False
         :type schwarz_correction: bool, optional
+        :return: return code of the runscript
+        :rtype: int
         """
         self._run_ecconf()
         aoscm_executable = self.context.aoscm_executable
         if schwarz_correction:
             aoscm_executable = self.context.aoscm_schwarz_correction_executable
-        self._run_model(aoscm_executable, print_time)
+        return self._run_model(aoscm_executable, print_time)
 
     def run_atmosphere_only(self, print_time: bool = False):
         """do an atmosphere-only run of the EC-Earth AOSCM.
 
         :param print_time: print wall clock time at the end of the run, defaults to False
         :type print_time: bool, optional
+        :return: return code of the runscript
+        :rtype: int
         """
         self._run_ecconf()
         ascm_executable = self.context.ascm_executable
-        self._run_model(ascm_executable, print_time)
+        return self._run_model(ascm_executable, print_time)
 
     def run_ocean_only(self, print_time: bool = False):
         """do an ocean-only run of the EC-Earth AOSCM.
 
         :param print_time: print wall clock time at the end of the run, defaults to False
         :type print_time: bool, optional
+        :return: return code of the runscript
+        :rtype: int
         """
         self._run_ecconf()
         oscm_executable = self.context.oscm_executable
-        self._run_model(oscm_executable, print_time)
+        return self._run_model(oscm_executable, print_time)
 
-    def _run_model(self, executable: Path, print_time: bool = False) -> None:
+    def _run_model(self, executable: Path, print_time: bool = False) -> int:
         print("Running model...")
         args = [str(executable)]
-        with ChangeDirectory(self.context.runscript_dir):
+        with trace(self.tracer, "model", executable=Path(executable).name):
             completed_process = subprocess.run(
                 args,
+                cwd=self.context.runscript_dir,
                 capture_output=True,
                 text=print_time,  # if print_time, we want stdout and stderr to be string instead of bytes.
                 check=False,
             )
         print("Model run complete.")
-        if not print_time:
-            return
-        output = completed_process.stdout.splitlines()
-        for line in output:
-            if "Finished leg" in line:
-                print(line)
+        if print_time:
+            for line in completed_process.stdout.splitlines():
+                if "Finished leg" in line:
+                    print(line)
+        return completed_process.returncode
 
+    async def run_coupled_model_async(
+        self,
+        schwarz_correction: bool = False,
+        log_file: Path = None,
+        on_event: Callable[[ModelRunEvent], None] = None,
+    ) -> None:
+        """run the EC-Earth AOSCM in coupled mode, asynchronously.
 
-def reduce_output(run_directory: Path, keep_debug_output: bool = True) -> None:
-    """
-    remove all AOSCM output which is irrelevant for further analysis.
-    """
-    output_files = list(run_directory.glob("*"))
-    output_files_to_remove = []
-    for output_file in output_files:
-        whitelisted = [
-            "diagvar",
-            "progvar",
-            "_grid_",
-            "_icemod",
-            "_OpenIFS_",
-            "_ATMIFS_",
-            "_oceanx_",
-            "namelist_",
-            "namcouple",
-            "fort.4",
-        ]
-        if any(wl in output_file.name for wl in whitelisted):
-            continue
-        if keep_debug_output:
-            if "debug" in output_file.name:
-                continue
-            if output_file.name == "nout.000000":
+        :param schwarz_correction: whether to use the Schwarz correction runscript, default: False
+        :type schwarz_correction: bool, optional
+        :param log_file: file for stdout and stderr of the model, default: `<runscript>.log` in `runscript_dir`
+        :type log_file: Path, optional
+        :param on_event: called with every `ModelRunEvent` during the run, default: None
+        :type on_event: Callable[[ModelRunEvent], None], optional
+        :raises ModelRunError: if the model fails
+        """
+        await asyncio.to_thread(self._run_ecconf)
+        aoscm_executable = self.context.aoscm_executable
+        if schwarz_correction:
+            aoscm_executable = self.context.aoscm_schwarz_correction_executable
+        await self._run_model_async(aoscm_executable, log_file, on_event)
+
+    async def run_atmosphere_only_async(
+        self,
+        log_file: Path = None,
+        on_event: Callable[[ModelRunEvent], None] = None,
+    ) -> None:
+        """do an atmosphere-only run of the EC-Earth AOSCM, asynchronously.
+
+        See `run_coupled_model_async` for the parameters.
+        """
+        await asyncio.to_thread(self._run_ecconf)
+        await self._run_model_async(self.context.ascm_executable, log_file, on_event)
+
+    async def run_ocean_only_async(
+        self,
+        log_file: Path = None,
+        on_event: Callable[[ModelRunEvent], None] = None,
+    ) -> None:
+        """do an ocean-only run of the EC-Earth AOSCM, asynchronously.
+
+        See `run_coupled_model_async` for the parameters.
+        """
+        await asyncio.to_thread(self._run_ecconf)
+        await self._run_model_async(self.context.oscm_executable, log_file, on_event)
+
+    async def _run_model_async(
+        self,
+        executable: Path,
+        log_file: Path = None,
+        on_event: Callable[[ModelRunEvent], None] = None,
+    ) -> None:
+        if log_file is None:
+            log_file = self.context.runscript_dir / f"{Path(executable).stem}.log"
+        log_file = Path(log_file)
+        print("Running model...")
+        with trace(self.tracer, "model", executable=Path(executable).name):
+            process = await asyncio.create_subprocess_exec(
+                str(executable),
+                cwd=self.context.runscript_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=2**20,
+                start_new_session=True,  # allows to kill MPI processes started by the runscript
+            )
+            with open(log_file, "w", buffering=1) as log:
+                readers = [
+                    asyncio.create_task(
+                        self._read_stream(stream, log, log_file, on_event)
+                    )
+                    for stream in (process.stdout, process.stderr)
+                ]
+                try:
+                    done, _ = await asyncio.wait(
+                        readers, return_when=asyncio.FIRST_EXCEPTION
+                    )
+                    for reader in done:
+                        reader.result()
+                    returncode = await process.wait()
+                finally:
+                    for reader in readers:
+                        reader.cancel()
+                    if process.returncode is None:
+                        os.killpg(process.pid, signal.SIGKILL)
+                        await process.wait()
+        if returncode != 0:
+            raise ModelRunError(
+                f"Model exited with return code {returncode}, see {log_file}",
+                returncode,
+                log_file,
+            )
+        print("Model run complete.")
+
+    async def _read_stream(
+        self,
+        stream: asyncio.StreamReader,
+        log,
+        log_file: Path,
+        on_event: Callable[[ModelRunEvent], None] = None,
+    ) -> None:
+        while line := await stream.readline():
+            line = line.decode(errors="replace")
+            log.write(line)
+            line = line.rstrip("\n")
+            for marker in self.error_markers:
+                if marker in line:
+                    raise ModelRunError(
+                        f"Model output contains error marker: {line}",
+                        log_file=log_file,
+                    )
+            if on_event is None:
                 continue
-        output_files_to_remove.append(output_file)
+            event = _parse_event(line)
+            if event is not None:
+                on_event(event)
+
 
-    for file in output_files_to_remove:
-        file.unlink()
+def available_cores() -> int:
+    """number of cores this process may run on (respects CPU affinity, e.g., set by SLURM)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
 
 def compute_nstrtini(
@@ -135,13 +334,9 @@ def compute_nstrtini(
 def get_ifs_forcing_info(
     ifs_forcing_file: Path,
 ) -> tuple[pd.Timestamp, pd.Timedelta, int]:
-    oifs_forcing = xr.open_dataset(ifs_forcing_file)
-    nlev = len(oifs_forcing.nlev)
-    start_second = oifs_forcing.second[0].to_numpy()
-    if start_second > 0:
-        raise ValueError("OIFS forcing file needs to start at 00:00h.")
-    start_date = pd.Timestamp(str(oifs_forcing.date[0].to_numpy()))
-    frequency = pd.Timedelta(
-        oifs_forcing.time.data[1] - oifs_forcing.time.data[0], unit="seconds"
-    )
-    return start_date, frequency, nlev
+    """start date, frequency and number of levels of an OpenIFS forcing file.
+
+    See `AOSCMcoupling.forcing` for the full metadata and a cached index.
+    """
+    info = read_forcing_info(ifs_forcing_file)
+    return info.start_date, info.frequency, info.nlev
@@ -0,0 +1,307 @@
+import json
+import shutil
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import xarray as xr
+
+from AOSCMcoupling.checkpoint import atomic_path, write_atomically
+from AOSCMcoupling.compaction import _chunksizes
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.run_directory import RunDirectoryIndex
+
+delta_categories = ("coupling", "oifs", "nemo")
+archive_manifest_name = "archive.json"
+
+
+def _bits(data: np.ndarray) -> np.ndarray:
+    """bit pattern of numeric data as unsigned integers of the same width."""
+    return data.view(np.dtype(f"u{data.dtype.itemsize}"))
+
+
+def _is_delta_encodable(data: np.ndarray, reference) -> bool:
+    return (
+        reference is not None
+        and data.ndim > 0
+        and data.dtype.kind in "fiu"
+        and reference[1].dtype == data.dtype
+        and reference[1].shape == data.shape
+    )
+
+
+def _read_raw(path: Path) -> tuple[dict, dict, dict]:
+    """global attributes, dimensions and variables (dims, raw data, attributes)."""
+    with netcdf_lock, netCDF4.Dataset(path) as dataset:
+        attributes = {attr: dataset.getncattr(attr) for attr in dataset.ncattrs()}
+        dimensions = {
+            name: None if dim.isunlimited() else dim.size
+            for name, dim in dataset.dimensions.items()
+        }
+        variables = {}
+        for name, variable in dataset.variables.items():
+            variable.set_auto_maskandscale(False)
+            variables[name] = (
+                variable.dimensions,
+                np.asarray(variable[...]),
+                {attr: variable.getncattr(attr) for attr in variable.ncattrs()},
+            )
+    return attributes, dimensions, variables
+
+
+def _write_netcdf(
+    path: Path,
+    attributes: dict,
+    dimensions: dict,
+    variables: dict,
+    complevel: int = None,
+) -> None:
+    """write raw variables, compressed if a compression level is given."""
+    with (
+        atomic_path(path) as temporary_file,
+        netcdf_lock,
+        netCDF4.Dataset(temporary_file, "w") as dataset,
+    ):
+        dataset.setncatts(attributes)
+        for name, size in dimensions.items():
+            dataset.createDimension(name, size)
+        for name, (dims, data, variable_attributes) in variables.items():
+            variable_attributes = dict(variable_attributes)
+            fill_value = variable_attributes.pop("_FillValue", None)
+            compress = complevel is not None and data.ndim > 0 and data.dtype != object
+            variable = dataset.createVariable(
+                name,
+                str if data.dtype == object else data.dtype,
+                dims,
+                zlib=compress,
+                complevel=complevel or 4,
+                shuffle=compress,
+                chunksizes=_chunksizes(data) if compress else None,
+                fill_value=fill_value,
+            )
+            variable.set_auto_maskandscale(False)
+            variable.setncatts(variable_attributes)
+            variable[...] = data
+
+
+def _encode(path: Path, reference_path: Path | None, target: Path, complevel: int):
+    """Store a NetCDF file, numeric variables as XOR deltas to a reference file.
+
+    Variables with the same dtype and shape as in the reference are stored as the
+    bitwise XOR of both, which is mostly zero bits for similar values and therefore
+    compresses well. The delta is exact, as opposed to an arithmetic difference of
+    floating point numbers.
+    """
+    attributes, dimensions, variables = _read_raw(path)
+    reference = {}
+    if reference_path is not None:
+        reference = _read_raw(reference_path)[2]
+    encoded = {}
+    for name, (dims, data, variable_attributes) in variables.items():
+        reference_variable = reference.get(name)
+        if not _is_delta_encodable(data, reference_variable):
+            encoded[name] = (dims, data, variable_attributes)
+            continue
+        variable_attributes = dict(variable_attributes)
+        fill_value = variable_attributes.pop("_FillValue", None)
+        if fill_value is not None:
+            variable_attributes["xor_fill_value"] = fill_value
+        variable_attributes["xor_dtype"] = data.dtype.str
+        delta = _bits(data) ^ _bits(reference_variable[1])
+        encoded[name] = (dims, delta, variable_attributes)
+    _write_netcdf(target, attributes, dimensions, encoded, complevel)
+
+
+def _decode(variables: dict, reference: dict) -> dict:
+    decoded = {}
+    for name, (dims, data, attributes) in variables.items():
+        if "xor_dtype" not in attributes:
+            decoded[name] = (dims, data, attributes)
+            continue
+        attributes = dict(attributes)
+        dtype = np.dtype(attributes.pop("xor_dtype"))
+        if "xor_fill_value" in attributes:
+            attributes["_FillValue"] = attributes.pop("xor_fill_value")
+        original = (data ^ _bits(reference[name][1])).view(dtype)
+        decoded[name] = (dims, original, attributes)
+    return decoded
+
+
+def archive_iterates(
+    output_dir: Path | str,
+    exp_id: str,
+    archive_dir: Path | str,
+    keyframe: str = "first",
+    complevel: int = 4,
+) -> "IterateArchive":
+    """Archive the iterates of an SWR experiment with delta encoding.
+
+    The iterates `{exp_id}_1`, `{exp_id}_2`, ... in `output_dir` are copied to
+    `{archive_dir}/{exp_id}_{n}`. The NetCDF output kept by `reduce_output` (OASIS
+    coupling fields, diagvar/progvar, NEMO output) of one iterate, the keyframe, is
+    stored in full. In all other iterates, it is stored as exact (bitwise XOR)
+    differences to the neighbouring iterate closer to the keyframe. NetCDF output is
+    compressed, unless this does not reduce a file's size; other files are copied.
+    Use `IterateArchive` to read the archive; the original iterates are not removed.
+
+    :param output_dir: output directory of the experiment, e.g., `Context.output_dir`
+    :type output_dir: Path | str
+    :param exp_id: experiment ID
+    :type exp_id: str
+    :param archive_dir: directory of the archive, created if it does not exist
+    :type archive_dir: Path | str
+    :param keyframe: "first" or "last", iterate stored in full, default: "first"
+    :type keyframe: str, optional
+    :param complevel: zlib compression level, default: 4
+    :type complevel: int, optional
+    :raises ValueError: if the keyframe is not "first" or "last"
+    :raises FileNotFoundError: if there is no iterate `{exp_id}_1`
+    :return: the archive
+    :rtype: IterateArchive
+    """
+    if keyframe not in ("first", "last"):
+        raise ValueError(f"Keyframe must be 'first' or 'last', got {keyframe}.")
+    output_dir = Path(output_dir)
+    iterations = []
+    while (output_dir / f"{exp_id}_{len(iterations) + 1}").is_dir():
+        iterations.append(len(iterations) + 1)
+    if not iterations:
+        raise FileNotFoundError(f"No iterates of {exp_id} in {output_dir}")
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    # encode away from the keyframe, so each iterate refers to one already stored
+    order = iterations if keyframe == "first" else iterations[::-1]
+    delta_files = {}
+    for position, iteration in enumerate(order):
+        iterate_dir = output_dir / f"{exp_id}_{iteration}"
+        reference_dir = None
+        if position > 0:
+            reference_dir = output_dir / f"{exp_id}_{order[position - 1]}"
+        target_dir = archive_dir / iterate_dir.name
+        target_dir.mkdir(exist_ok=True)
+        delta_files[iteration] = []
+        for path, category in RunDirectoryIndex(iterate_dir).files.items():
+            if not path.is_file():
+                continue
+            if category not in delta_categories or path.suffix != ".nc":
+                shutil.copy2(path, target_dir / path.name)
+                continue
+            reference_path = None
+            if reference_dir is not None and (reference_dir / path.name).exists():
+                reference_path = reference_dir / path.name
+            target = target_dir / path.name
+            _encode(path, reference_path, target, complevel)
+            # small files do not compress, HDF5 adds overhead
+            if target.stat().st_size >= path.stat().st_size:
+                shutil.copy2(path, target)
+            elif reference_path is not None:
+                delta_files[iteration].append(path.name)
+        print(f"Archived iteration {iteration}")
+
+    manifest = {
+        "exp_id": exp_id,
+        "keyframe": keyframe,
+        "iterations": iterations,
+        "delta_files": {str(key): sorted(value) for key, value in delta_files.items()},
+    }
+    write_atomically(
+        archive_dir / archive_manifest_name, json.dumps(manifest, indent=2)
+    )
+    return IterateArchive(archive_dir)
+
+
+class IterateArchive:
+    """Reader of iterates archived with `archive_iterates`.
+
+    Delta-encoded files are reconstructed exactly from the keyframe and all iterates
+    in between, so reading an iterate far from the keyframe reads several files.
+    """
+
+    def __init__(self, archive_dir: Path | str):
+        """Constructor.
+
+        :param archive_dir: directory of the archive
+        :type archive_dir: Path | str
+        :raises FileNotFoundError: if the directory contains no archive
+        """
+        self.archive_dir = Path(archive_dir)
+        with open(self.archive_dir / archive_manifest_name) as file:
+            manifest = json.load(file)
+        self.exp_id = manifest["exp_id"]
+        self.keyframe = manifest["keyframe"]
+        self.iterations = manifest["iterations"]
+        self._delta_files = {
+            int(key): set(value) for key, value in manifest["delta_files"].items()
+        }
+
+    def iterate_dir(self, iteration: int) -> Path:
+        """archived directory of an iterate (containing delta-encoded files)."""
+        if iteration not in self.iterations:
+            raise ValueError(f"Iteration {iteration} is not in the archive.")
+        return self.archive_dir / f"{self.exp_id}_{iteration}"
+
+    def files(self, iteration: int) -> list[str]:
+        """names of all files of an iterate."""
+        return sorted(
+            path.name for path in RunDirectoryIndex(self.iterate_dir(iteration)).files
+        )
+
+    def _reference(self, iteration: int) -> int:
+        return iteration - 1 if self.keyframe == "first" else iteration + 1
+
+    def _read(self, iteration: int, file_name: str) -> tuple[dict, dict, dict]:
+        """raw content of a file, reconstructed towards the iterate from the keyframe."""
+        chain = [iteration]
+        while file_name in self._delta_files[chain[-1]]:
+            chain.append(self._reference(chain[-1]))
+        attributes, dimensions, variables = _read_raw(
+            self.iterate_dir(chain[-1]) / file_name
+        )
+        for link in chain[-2::-1]:
+            attributes, dimensions, deltas = _read_raw(
+                self.iterate_dir(link) / file_name
+            )
+            variables = _decode(deltas, variables)
+        return attributes, dimensions, variables
+
+    def open_dataset(self, iteration: int, file_name: str) -> xr.Dataset:
+        """Reconstruct a NetCDF file of an iterate as a Dataset in memory.
+
+        :param iteration: iteration number
+        :type iteration: int
+        :param file_name: name of the file in the iterate, e.g., "diagvar.nc"
+        :type file_name: str
+        :return: the file's content, decoded like `xr.open_dataset`
+        :rtype: xr.Dataset
+        """
+        attributes, _, variables = self._read(iteration, file_name)
+        ds = xr.Dataset(
+            {
+                name: xr.Variable(dims, data, variable_attributes)
+                for name, (dims, data, variable_attributes) in variables.items()
+            },
+            attrs=attributes,
+        )
+        return xr.decode_cf(ds)
+
+    def restore(self, iteration: int, target_dir: Path | str) -> Path:
+        """Restore all files of an iterate (NetCDF files compressed) to a directory.
+
+        :param iteration: iteration number
+        :type iteration: int
+        :param target_dir: directory to write to, created if it does not exist
+        :type target_dir: Path | str
+        :return: the target directory
+        :rtype: Path
+        """
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for file_name in self.files(iteration):
+            if file_name in self._delta_files[iteration]:
+                _write_netcdf(
+                    target_dir / file_name, *self._read(iteration, file_name), 4
+                )
+            else:
+                shutil.copy2(self.iterate_dir(iteration) / file_name, target_dir)
+        return target_dir
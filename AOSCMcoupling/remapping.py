@@ -1,7 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import netCDF4
 import xarray as xr
 
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.run_directory import RunDirectoryIndex, as_index
+
 atm_to_oce = {
     "A_TauX_oce": "O_OTaux1",
     "A_TauY_oce": "O_OTauy1",
@@ -28,22 +33,70 @@ oce_to_atm = {
 }
 
 
+def read_coupling_file(name: str, content: bytes) -> dict | None:
+    """parse an OASIS coupling file from memory; None if it is not a plain (time, ny, nx) field."""
+    with netCDF4.Dataset(name, memory=content) as dataset:
+        variables = [var for var in dataset.variables if var != "time"]
+        if len(variables) != 1 or "time" not in dataset.variables:
+            return None
+        variable = dataset.variables[variables[0]]
+        time = dataset.variables["time"]
+        if variable.ndim != 3 or "since" in getattr(time, "units", ""):
+            return None
+        variable.set_auto_maskandscale(False)
+        time.set_auto_maskandscale(False)
+        return {
+            "dimensions": variable.dimensions,
+            "data": variable[:],
+            "attributes": {
+                attr: variable.getncattr(attr) for attr in variable.ncattrs()
+            },
+            "time": time[:],
+            "time_attributes": {attr: time.getncattr(attr) for attr in time.ncattrs()},
+        }
+
+
+def write_coupling_file(name: str, var_name: str, field: dict) -> memoryview:
+    """create a coupling file in memory, returns its content."""
+    dataset = netCDF4.Dataset(name, "w", memory=1024)
+    for dim, size in zip(field["dimensions"], field["data"].shape):
+        dataset.createDimension(dim, size)
+    for var, dims, data, attributes in (
+        ("time", ("time",), field["time"], field["time_attributes"]),
+        (var_name, field["dimensions"], field["data"], field["attributes"]),
+    ):
+        attributes = dict(attributes)
+        fill_value = attributes.pop("_FillValue", None)
+        variable = dataset.createVariable(var, data.dtype, dims, fill_value=fill_value)
+        variable.set_auto_maskandscale(False)
+        variable.setncatts(attributes)
+        variable[:] = data
+    return dataset.close()
+
+
 class RemapCouplerOutput:
     """
     Create input files for an upcoming Schwarz iteration.
 
     Fields get remapped, renamed, and their time coordinate is updated as required.
+
+    With `lean_io`, fields are read and written with netCDF4 directly instead of xarray,
+    using a pool of `max_workers` threads. File system access happens concurrently,
+    while the (not thread-safe) netCDF library only works on in-memory copies,
+    one field at a time.
     """
 
     def __init__(
         self,
-        read_directory: Path,
+        read_directory: Path | RunDirectoryIndex,
         write_directory: Path,
         coupling_scheme: int,
         dt_cpl: int,
         dt_atm: int,
         dt_oce: int,
         model_version: int,
+        lean_io: bool = False,
+        max_workers: int = 1,
     ) -> None:
         self.read_directory = read_directory
         self.write_directory = write_directory
@@ -56,20 +109,76 @@ class RemapCouplerOutput:
         else:
             self.oifs_separator = "_ATMIFS_"
         self.nemo_separator = "_oceanx_"
+        self.lean_io = lean_io
+        self.max_workers = max_workers
 
     def remap(self) -> None:
-        for path in self.read_directory.glob("*.nc"):
-            if self.oifs_separator in path.stem:
+        index = as_index(self.read_directory)
+        atm_files = list(index.coupling_files(self.oifs_separator).values())
+        oce_files = list(index.coupling_files(self.nemo_separator).values())
+        if not self.lean_io:
+            for path in atm_files:
                 self._remap_atm_to_oce(path)
-            if self.nemo_separator in path.stem:
+            for path in oce_files:
                 self._remap_oce_to_atm(path)
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # list() to propagate exceptions
+            list(executor.map(self._remap_lean, atm_files + oce_files))
+
+    def _remap_lean(self, path: Path) -> None:
+        from_atm = self.oifs_separator in path.stem
+        if from_atm:
+            source_var_name = path.stem.split(self.oifs_separator)[0]
+            target_var_name = atm_to_oce.get(source_var_name, None)
+            fallback = self._remap_atm_to_oce
+        elif self.nemo_separator in path.stem:
+            source_var_name = path.stem.split(self.nemo_separator)[0]
+            target_var_name = oce_to_atm.get(source_var_name, None)
+            fallback = self._remap_oce_to_atm
+        else:
+            return
+        if target_var_name is None:
+            return
+
+        content = path.read_bytes()
+        with netcdf_lock:
+            field = read_coupling_file(path.name, content)
+            if field is None:
+                fallback(path)
+                return
+
+        data = field["data"]
+        if from_atm:
+            data = data[:, 3 * [0]][:, :, 3 * [0]]
+            drop_first = self.coupling_scheme != 1
+            time_shift = self.dt_cpl - self.dt_atm
+        else:
+            if data.shape[2] > 4:
+                data = data[:, :, [4]]
+            else:
+                data = data[:, [0]][:, :, [0]]
+            drop_first = self.coupling_scheme != 2
+            time_shift = self.dt_cpl - self.dt_oce
+        time = field["time"]
+        if drop_first:
+            data = data[1:]
+            time = time[1:]
+        field["data"] = data
+        field["time"] = time - time_shift
+
+        target_file_path = self.write_directory / f"{target_var_name}.nc"
+        with netcdf_lock:
+            content = write_coupling_file(target_file_path.name, target_var_name, field)
+        target_file_path.write_bytes(content)
 
     def _remap_oce_to_atm(self, oce_file_path: Path) -> None:
         oce_var_name = oce_file_path.stem.split(self.nemo_separator)[0]
         atm_var_name = oce_to_atm.get(oce_var_name, None)
         if atm_var_name is None:
             return
-        oce_da = xr.open_dataarray(oce_file_path)
+        with xr.open_dataarray(oce_file_path) as oce_da:
+            oce_da = oce_da.load()
         try:
             atm_da = oce_da[:, :, [4]]
         except IndexError:
@@ -88,7 +197,8 @@ class RemapCouplerOutput:
         oce_var_name = atm_to_oce.get(atm_var_name, None)
         if oce_var_name is None:
             return
-        atm_da = xr.open_dataarray(atm_file_path)
+        with xr.open_dataarray(atm_file_path) as atm_da:
+            atm_da = atm_da.load()
         oce_da = atm_da[:, 3 * [0], 3 * [0]]
         oce_da = oce_da.rename(oce_var_name)
         if self.coupling_scheme != 1:
@@ -0,0 +1,205 @@
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from AOSCMcoupling.checkpoint import file_checksum
+from AOSCMcoupling.context import Context
+from AOSCMcoupling.experiment import Experiment
+from AOSCMcoupling.templates import get_template
+
+_exp_id_placeholder = "RUNCACHE"
+_entry_file = ".entry.json"
+
+# OpenIFS, NEMO and OASIS binaries in `sources` of the model directory
+model_binary_patterns = (
+    "**/bin/*.exe",
+    "**/bin/ifsmaster*",
+    "**/bin/ifsMASTER*",
+    "**/lib/liboasis*",
+    "**/lib/libpsmile*",
+)
+
+
+def _rename(name: str, old_exp_id: str, new_exp_id: str) -> str:
+    """replace the experiment ID at the start of a file or directory name."""
+    if name == old_exp_id or name.startswith(f"{old_exp_id}_"):
+        return new_exp_id + name[len(old_exp_id) :]
+    return name
+
+
+def _link_or_copy(source: Path, target: Path, hardlinks: bool) -> None:
+    if hardlinks:
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            # e.g., cache and run directory are on different file systems
+            pass
+    shutil.copy2(source, target)
+
+
+class RunCache:
+    """Content-addressed cache of coupled AOSCM runs.
+
+    A run is identified by a hash of its `config-run.xml` (rendered with a
+    placeholder experiment ID and without output paths), the contents of its input
+    files (forcing, restarts), the runscript, the OpenIFS, NEMO and OASIS binaries in
+    the model directory (see `model_binary_patterns`) and any `extra_files`. Cached runs are materialized with hardlinks where possible, so neither
+    cached nor materialized output may be modified in place.
+    Files and directories whose names start with the experiment ID (e.g.,
+    `{exp_id}_1ts_grid_T.nc` of NEMO) are renamed accordingly.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | str,
+        extra_files: list[Path] = (),
+        hardlinks: bool = True,
+    ):
+        """Constructor.
+
+        :param cache_dir: directory of the cache, created if it does not exist
+        :type cache_dir: Path | str
+        :param extra_files: further files whose content determines the output, in
+            addition to the runscript and the model binaries, default: none
+        :type extra_files: list[Path], optional
+        :param hardlinks: use hardlinks instead of copies where possible, default: True
+        :type hardlinks: bool, optional
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.extra_files = [Path(file) for file in extra_files]
+        self.hardlinks = hardlinks
+        self._checksums = {}
+        self._model_binaries = {}
+
+    def _checksum(self, path: Path) -> str:
+        """content checksum, computed only once per file version (size, mtime)."""
+        stat = path.stat()
+        version = (str(path.absolute()), stat.st_size, stat.st_mtime_ns)
+        if version not in self._checksums:
+            self._checksums[version] = file_checksum(path)
+        return self._checksums[version]
+
+    def model_binaries(self, context: Context) -> list[Path]:
+        """model binaries in `context.model_dir`, searched once per model directory."""
+        model_dir = context.model_dir
+        if model_dir not in self._model_binaries:
+            sources = model_dir / "sources"
+            binaries = {
+                path
+                for pattern in model_binary_patterns
+                for path in sources.glob(pattern)
+                if path.is_file()
+            }
+            self._model_binaries[model_dir] = sorted(binaries)
+        return self._model_binaries[model_dir]
+
+    def key(self, context: Context, experiment: Experiment) -> str:
+        """cache key of a coupled run."""
+        normalized = dataclasses.replace(
+            experiment,
+            exp_id=_exp_id_placeholder,
+            iteration=None,
+            iterate_converged=None,
+            convergence_prediction=None,
+        )
+        config = get_template(context.config_run_template).render(
+            context=context, experiment=normalized, str=str
+        )
+        input_files = [
+            normalized.ifs_input_file,
+            normalized.nem_input_file,
+            normalized.oasis_rstas,
+            normalized.oasis_rstos,
+        ]
+        if normalized.with_ice:
+            input_files.append(normalized.ice_input_file)
+        for input_file in input_files:
+            config = config.replace(
+                str(input_file), f"sha256:{self._checksum(input_file)}"
+            )
+        # the output location does not influence the output
+        config = config.replace(str(context.output_dir), "OUTPUT_DIR")
+        config = config.replace(str(context.output_dir.parent), "OUTPUT_ROOT")
+
+        key = hashlib.sha256(config.encode())
+        for file in [context.aoscm_executable, *self.extra_files]:
+            key.update(f"{file.name}:{self._checksum(file)}".encode())
+        for file in self.model_binaries(context):
+            name = file.relative_to(context.model_dir)
+            key.update(f"{name}:{self._checksum(file)}".encode())
+        return key.hexdigest()
+
+    def entry(self, key: str) -> Path | None:
+        """directory of a cached run, None if the run is not cached."""
+        entry = self.cache_dir / key
+        if (entry / _entry_file).exists():
+            return entry
+        return None
+
+    def store(self, key: str, run_directory: Path, exp_id: str) -> Path:
+        """Add the output of a run to the cache.
+
+        :param key: cache key of the run (see `key`)
+        :type key: str
+        :param run_directory: output directory of the run
+        :type run_directory: Path
+        :param exp_id: experiment ID used in the output file names
+        :type exp_id: str
+        :return: directory of the cached run
+        :rtype: Path
+        """
+        entry = self.entry(key)
+        if entry is not None:
+            return entry
+        # populate a temporary directory first, so that entries are always complete
+        temporary = self.cache_dir / f".{key}.{uuid.uuid4().hex}"
+        self._transfer(Path(run_directory), temporary, exp_id, _exp_id_placeholder)
+        with open(temporary / _entry_file, "w") as file:
+            json.dump({"exp_id": exp_id}, file)
+        try:
+            temporary.rename(self.cache_dir / key)
+        except OSError:
+            # stored concurrently by another process
+            shutil.rmtree(temporary)
+        return self.cache_dir / key
+
+    def materialize(self, key: str, run_directory: Path, exp_id: str) -> bool:
+        """Reproduce the output of a cached run in a run directory.
+
+        :param key: cache key of the run (see `key`)
+        :type key: str
+        :param run_directory: target directory, created if it does not exist
+        :type run_directory: Path
+        :param exp_id: experiment ID to use in the output file names
+        :type exp_id: str
+        :return: False if the run is not cached, True otherwise
+        :rtype: bool
+        """
+        entry = self.entry(key)
+        if entry is None:
+            return False
+        self._transfer(entry, Path(run_directory), _exp_id_placeholder, exp_id)
+        return True
+
+    def _transfer(
+        self, source_dir: Path, target_dir: Path, old_exp_id: str, new_exp_id: str
+    ) -> None:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for source in sorted(source_dir.rglob("*")):
+            relative_path = source.relative_to(source_dir)
+            if relative_path.name == _entry_file:
+                continue
+            target = target_dir.joinpath(
+                *(_rename(part, old_exp_id, new_exp_id) for part in relative_path.parts)
+            )
+            if source.is_dir():
+                target.mkdir(exist_ok=True)
+            else:
+                target.unlink(missing_ok=True)
+                _link_or_copy(source, target, self.hardlinks)
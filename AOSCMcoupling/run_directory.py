@@ -0,0 +1,140 @@
+import os
+from pathlib import Path
+
+coupling_separators = ("_OpenIFS_", "_ATMIFS_", "_oceanx_")
+
+file_categories = {
+    "coupling": coupling_separators,
+    "oifs": ("diagvar", "progvar"),
+    "nemo": ("_grid_", "_icemod"),
+    "static": ("namelist_", "namcouple", "fort.4"),
+    "metadata": ("setup_dict.yaml", "convergence_errors.csv", "manifest.json"),
+    "debug": ("debug",),
+}
+
+
+def classify(file_name: str) -> str:
+    """category of an AOSCM output file.
+
+    Categories are "coupling" (OASIS coupling fields), "oifs" (diagvar/progvar),
+    "nemo" (grid/icemod output), "static" (namelists, namcouple, fort.4),
+    "metadata" (files written by `SchwarzCoupling`), "debug" (debug output, including `nout.000000`), and "other".
+    """
+    for category, patterns in file_categories.items():
+        if any(pattern in file_name for pattern in patterns):
+            return category
+    if file_name == "nout.000000":
+        return "debug"
+    return "other"
+
+
+class RunDirectoryIndex:
+    """Index of the files in an AOSCM run directory.
+
+    The directory is scanned once, every file is classified (see `classify`), and
+    OASIS coupling files are additionally indexed by separator and variable name.
+    The index can be shared by remapping, convergence checking and `reduce_output`.
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """scan the directory again."""
+        self.files = {}
+        self._coupling_files = {separator: {} for separator in coupling_separators}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                self._add(self.directory / entry.name)
+
+    def _add(self, path: Path) -> None:
+        category = classify(path.name)
+        self.files[path] = category
+        if category != "coupling" or path.suffix != ".nc":
+            return
+        for separator in coupling_separators:
+            if separator in path.stem:
+                var_name = path.stem.split(separator)[0]
+                self._coupling_files[separator].setdefault(var_name, []).append(path)
+
+    def remove(self, path: Path) -> None:
+        """delete a file and remove it from the index."""
+        path.unlink()
+        del self.files[path]
+        for coupling_files in self._coupling_files.values():
+            for var_name, paths in list(coupling_files.items()):
+                if path in paths:
+                    paths.remove(path)
+                if not paths:
+                    del coupling_files[var_name]
+
+    def category(self, category: str) -> list[Path]:
+        """all files of a category."""
+        return [path for path, cat in self.files.items() if cat == category]
+
+    def coupling_files(self, separator: str) -> dict[str, Path]:
+        """coupling files of one component, by variable name.
+
+        Like `next(directory.glob(...))`, the first file found is used if there are
+        several files for a variable.
+
+        :param separator: "_OpenIFS_", "_ATMIFS_", or "_oceanx_"
+        :type separator: str
+        """
+        return {
+            var_name: paths[0]
+            for var_name, paths in self._coupling_files[separator].items()
+        }
+
+    def coupling_file(self, var_name: str) -> Path:
+        """coupling file of a variable, regardless of the component.
+
+        If there are several files, the first one found is returned.
+
+        :raises FileNotFoundError: if there is no file for this variable
+        """
+        candidates = [
+            coupling_files[var_name][0]
+            for coupling_files in self._coupling_files.values()
+            if var_name in coupling_files
+        ]
+        if not candidates:
+            raise FileNotFoundError(
+                f"No coupling file for {var_name} in {self.directory}"
+            )
+        if len(candidates) > 1:
+            scan_order = list(self.files)
+            return min(candidates, key=scan_order.index)
+        return candidates[0]
+
+
+def as_index(directory: Path | str | RunDirectoryIndex) -> RunDirectoryIndex:
+    """index for a run directory, scans the directory only if no index is given."""
+    if isinstance(directory, RunDirectoryIndex):
+        return directory
+    return RunDirectoryIndex(directory)
+
+
+def reduce_output(
+    run_directory: Path | RunDirectoryIndex, keep_debug_output: bool = True
+) -> None:
+    """
+    remove all AOSCM output which is irrelevant for further analysis.
+
+    Kept are OASIS coupling fields, OpenIFS diagvar/progvar and NEMO grid/icemod output,
+    namelists, namcouple, fort.4, metadata written by `SchwarzCoupling` and,
+    optionally, debug output.
+    If an index of the run directory is given, it is updated accordingly.
+    """
+    index = as_index(run_directory)
+    categories_to_keep = ["coupling", "oifs", "nemo", "static", "metadata"]
+    if keep_debug_output:
+        categories_to_keep.append("debug")
+    output_files_to_remove = [
+        output_file
+        for output_file, category in index.files.items()
+        if category not in categories_to_keep
+    ]
+    for file in output_files_to_remove:
+        index.remove(file)
@@ -1,118 +1,459 @@
+import asyncio
 import shutil
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
+import pandas as pd
+
+from AOSCMcoupling.acceleration import (
+    Acceleration,
+    accelerate_forcing,
+    read_forcing,
+    write_forcing,
+)
+from AOSCMcoupling.catalog import ExperimentCatalog
+from AOSCMcoupling.checkpoint import (
+    directory_checksums,
+    is_complete,
+    read_manifest,
+    write_manifest,
+)
+from AOSCMcoupling.compaction import compact_output
 from AOSCMcoupling.context import Context
-from AOSCMcoupling.convergence_checker import ConvergenceChecker
+from AOSCMcoupling.convergence_checker import ConvergenceChecker, ConvergenceMonitor
 from AOSCMcoupling.experiment import Experiment
-from AOSCMcoupling.helpers import AOSCM, reduce_output
+from AOSCMcoupling.helpers import AOSCM
 from AOSCMcoupling.remapping import RemapCouplerOutput
+from AOSCMcoupling.run_cache import RunCache
+from AOSCMcoupling.run_directory import RunDirectoryIndex, reduce_output
 from AOSCMcoupling.templates import render_config_xml
+from AOSCMcoupling.tracing import Tracer, trace
 
 
 class SchwarzCoupling:
     """Wrapper class to run AOSCM experiments with Schwarz WR."""
 
+    remap_workers = 4
+
     def __init__(
         self,
         experiment: Experiment,
         context: Context,
         reduce_output_after_iteration: bool = True,
+        compact_output_after_iteration: bool = False,
+        compaction_options: dict = None,
+        run_cache: RunCache = None,
+        tracer: Tracer = None,
+        catalog: ExperimentCatalog = None,
     ):
+        """Constructor.
+
+        :param experiment: experiment to run
+        :type experiment: Experiment
+        :param context: model context
+        :type context: Context
+        :param reduce_output_after_iteration: remove irrelevant output after each iteration, default: True
+        :type reduce_output_after_iteration: bool, optional
+        :param compact_output_after_iteration: compress output after each iteration, default: False
+        :type compact_output_after_iteration: bool, optional
+        :param compaction_options: keyword arguments for `compact_output`, default: None
+        :type compaction_options: dict, optional
+        :param run_cache: take the first iteration (a plain coupled run) from this cache
+            if possible and add it otherwise, default: None
+        :type run_cache: RunCache, optional
+        :param tracer: record the wall time of all phases of the SWR loop, default: None
+        :type tracer: Tracer, optional
+        :param catalog: record each completed iteration in this catalog, default: None
+        :type catalog: ExperimentCatalog, optional
+        """
         self.context = context
         self.exp_id = experiment.exp_id
         self.experiment = experiment
         self.iter = 1
         self.output_dir = context.output_dir
         self.run_directory = context.output_dir / self.exp_id
-        self.aoscm = AOSCM(context)
+        self.tracer = tracer
+        self.aoscm = AOSCM(context, tracer=tracer)
         self.convergence_checker = ConvergenceChecker()
         self.reduce_output = reduce_output_after_iteration
+        self.compact_output = compact_output_after_iteration
+        self.compaction_options = compaction_options or {}
+        self.run_cache = run_cache
+        self.acceleration = None
         self.converged = False
+        self.monitor = ConvergenceMonitor()
+        self.predictive_stopping = False
+        self.stop_reason = None
+        self.max_iters = None
+        self.catalog = catalog
+        self._run_times = {}
 
     def run(
         self,
         max_iters: int,
-        current_iter: int = 1,
+        current_iter: int | None = 1,
         stop_at_convergence: bool = False,
         rel_tol: float = 1e-3,
+        pipelined: bool = False,
+        acceleration: Acceleration = None,
+        predictive_stopping: bool = False,
     ) -> int:
+        """Run Schwarz iterations.
+
+        :param max_iters: maximum number of iterations
+        :type max_iters: int
+        :param current_iter: iteration to start with, requires output of the previous one,
+            or None to resume after the last completed iteration (see
+            `resume_iteration`), default: 1
+        :type current_iter: int | None, optional
+        :param stop_at_convergence: stop once both convergence criteria are met, default: False
+        :type stop_at_convergence: bool, optional
+        :param rel_tol: relative tolerance of the convergence criteria, default: 1e-3
+        :type rel_tol: float, optional
+        :param pipelined: postprocess an iteration while the next one runs (see `run_pipelined`), default: False
+        :type pipelined: bool, optional
+        :param acceleration: acceleration of the fixed-point iteration, e.g.,
+            `AitkenRelaxation()` or `AndersonAcceleration()`; its history is not
+            checkpointed, so a resumed run starts with a plain fixed-point step, default: None
+        :type acceleration: Acceleration, optional
+        :param predictive_stopping: stop if the iteration stagnates or diverges, or if it
+            is predicted not to converge within `max_iters` (see `ConvergenceMonitor`),
+            default: False
+        :type predictive_stopping: bool, optional
+        """
+        self.monitor = ConvergenceMonitor(rel_tol)
+        self.predictive_stopping = predictive_stopping
+        self.stop_reason = None
+        self.max_iters = max_iters
+        self.acceleration = acceleration
+        if acceleration is not None:
+            acceleration.reset()
         if max_iters < 1:
             raise ValueError("Maximum amount of iterations must be >= 1")
-        if current_iter < 1:
-            raise ValueError("Current iteration must be >=1")
-        self.iter = current_iter
-        if self.iter > 1:
-            self._prepare_restart()
+        if current_iter is None:
+            self.iter = self.resume_iteration()
+            if self._stop_requested(stop_at_convergence):
+                print(f"Not resuming: iteration {self.iter - 1} {self._stop_message()}")
+                self.iter -= 1
+                return
+        else:
+            if current_iter < 1:
+                raise ValueError("Current iteration must be >=1")
+            self.iter = current_iter
+            if self.iter > 1:
+                self._prepare_restart()
 
-        render_config_xml(self.context, self.experiment)
-        while self.iter <= max_iters:
-            print(f"Iteration {self.iter}")
-            self.aoscm.run_coupled_model(schwarz_correction=bool(self.iter - 1))
-            self._postprocess_iteration(self.iter < max_iters, rel_tol)
-            self.iter += 1
-            if stop_at_convergence and self.converged:
-                break
+        with trace(self.tracer, "experiment", exp_id=self.exp_id):
+            with trace(self.tracer, "render_config"):
+                render_config_xml(self.context, self.experiment)
+            if pipelined:
+                asyncio.run(self.run_pipelined(max_iters, stop_at_convergence, rel_tol))
+                return
+            while self.iter <= max_iters:
+                print(f"Iteration {self.iter}")
+                self._run_model()
+                self._postprocess_iteration(self.iter < max_iters, rel_tol)
+                self.iter += 1
+                if self._stop_requested(stop_at_convergence):
+                    break
+            self.iter -= 1
+
+    async def run_pipelined(
+        self, max_iters: int, stop_at_convergence: bool, rel_tol: float
+    ) -> None:
+        """Run Schwarz iterations, overlapping postprocessing with the next iteration.
+
+        Only the remapping of the coupling fields happens before the next iteration is
+        started. The convergence check, output reduction/compaction and writing
+        `setup_dict.yaml` run in a background thread meanwhile. If an iteration turns
+        out to be converged and `stop_at_convergence` is set, the speculatively
+        started next iteration is cancelled and its run directory is reset.
+
+        `config-run.xml` has to be rendered and a restart prepared beforehand,
+        as done by `run(..., pipelined=True)`.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            postprocessing = None
+            previous_iterate = None
+            while self.iter <= max_iters:
+                print(f"Iteration {self.iter}")
+                model_run = asyncio.ensure_future(self._run_model_async())
+                if postprocessing is not None:
+                    try:
+                        await postprocessing
+                    except BaseException:
+                        await self._cancel(model_run)
+                        raise
+                    if self._stop_requested(stop_at_convergence):
+                        print(f"Cancelling speculative iteration {self.iter}")
+                        await self._cancel(model_run)
+                        # reset the run directory to the state after the converged iterate
+                        shutil.rmtree(self.run_directory)
+                        self.run_directory.mkdir()
+                        self._remapper(previous_iterate).remap()
+                        if self.acceleration is not None:
+                            fields, _ = read_forcing(self.run_directory)
+                            write_forcing(fields, self.acceleration.forcing)
+                        break
+                await model_run
+                previous_iterate, forcing = self._remap_iteration()
+                postprocessing = loop.run_in_executor(
+                    executor,
+                    self._finish_iteration,
+                    self.iter,
+                    previous_iterate,
+                    forcing,
+                    self.iter < max_iters,
+                    rel_tol,
+                )
+                self.iter += 1
+            else:
+                if postprocessing is not None:
+                    await postprocessing
         self.iter -= 1
 
+    def _stop_requested(self, stop_at_convergence: bool) -> bool:
+        return (stop_at_convergence and self.converged) or self.stop_reason is not None
+
+    def _stop_message(self) -> str:
+        return "converged" if self.stop_reason is None else self.stop_reason
+
+    def _update_prediction(self, iteration: int) -> None:
+        """record the convergence prediction, decide on predictive stopping."""
+        prediction = self.monitor.prediction()
+        remaining_iterations = prediction["remaining_iterations"]
+        if remaining_iterations is not None:
+            prediction["predicted_iterations"] = iteration + remaining_iterations
+        self.experiment.convergence_prediction = prediction
+        if not self.predictive_stopping or self.converged:
+            return
+        if prediction["status"] in ("stagnating", "diverging"):
+            self.stop_reason = prediction["status"]
+        elif (
+            prediction["status"] == "converging"
+            and iteration + remaining_iterations > self.max_iters
+        ):
+            self.stop_reason = (
+                f"is predicted to converge after {iteration + remaining_iterations}"
+                f" > {self.max_iters} iterations"
+            )
+        if self.stop_reason is not None:
+            warnings.warn(f"Stopping SWR: iteration {iteration} {self.stop_reason}")
+
+    def _run_model(self):
+        with trace(self.tracer, "coupled_run", iteration=self.iter):
+            if self.iter == 1 and self._materialize_cached_run():
+                return
+            start = time.perf_counter()
+            returncode = self.aoscm.run_coupled_model(
+                schwarz_correction=bool(self.iter - 1)
+            )
+            self._run_times[self.iter] = time.perf_counter() - start
+            # the synchronous run does not raise if the model fails
+            if self.iter == 1 and returncode == 0:
+                self._cache_run()
+
+    async def _run_model_async(self):
+        with trace(self.tracer, "coupled_run", iteration=self.iter):
+            if self.iter == 1 and self._materialize_cached_run():
+                return
+            start = time.perf_counter()
+            await self.aoscm.run_coupled_model_async(
+                schwarz_correction=bool(self.iter - 1)
+            )
+            self._run_times[self.iter] = time.perf_counter() - start
+            if self.iter == 1:
+                self._cache_run()
+
+    def _materialize_cached_run(self) -> bool:
+        if self.run_cache is None:
+            return False
+        key = self.run_cache.key(self.context, self.experiment)
+        if self.run_cache.entry(key) is None:
+            return False
+        shutil.rmtree(self.run_directory, ignore_errors=True)
+        self.run_cache.materialize(key, self.run_directory, self.exp_id)
+        print("Iteration 1 taken from the run cache")
+        return True
+
+    def _cache_run(self):
+        if self.run_cache is None:
+            return
+        key = self.run_cache.key(self.context, self.experiment)
+        self.run_cache.store(key, self.run_directory, self.exp_id)
+
+    @staticmethod
+    async def _cancel(model_run: asyncio.Future) -> None:
+        model_run.cancel()
+        try:
+            await model_run
+        except asyncio.CancelledError:
+            pass
+
+    def resume_iteration(self) -> int:
+        """Find the iteration to resume with and prepare its input.
+
+        Iterations are complete if their output directory contains a manifest with
+        status "complete" (see `AOSCMcoupling.checkpoint`), which is written as the
+        last step of postprocessing. The forcing remapped from the last complete
+        iteration is verified against the checksums in its manifest; if they do not
+        match, that iteration is redone as well. The convergence state of the last
+        complete iteration is restored, and the error history of the convergence
+        monitor is rebuilt from `convergence_errors.csv` of the complete iterations.
+
+        :return: first iteration which has to be (re)done
+        :rtype: int
+        """
+        iteration = 1
+        while is_complete(read_manifest(self._iterate_dir(iteration))):
+            iteration += 1
+        while iteration > 1:
+            manifest = read_manifest(self._iterate_dir(iteration - 1))
+            # leftovers of an interrupted run are discarded
+            shutil.rmtree(self.run_directory, ignore_errors=True)
+            self.iter = iteration
+            self._prepare_restart()
+            if directory_checksums(self.run_directory) == manifest["forcing"]:
+                break
+            warnings.warn(
+                f"Forcing from iteration {iteration - 1} does not match its manifest."
+                " Redoing the iteration."
+            )
+            iteration -= 1
+        if iteration > 1:
+            print(f"Resuming at iteration {iteration}")
+            converged = manifest["converged"]
+            if converged is not None:
+                self.experiment.iterate_converged = converged
+                self.converged = all(converged.values())
+            for previous_iteration in range(2, iteration):
+                errors_file = (
+                    self._iterate_dir(previous_iteration) / "convergence_errors.csv"
+                )
+                if errors_file.exists():
+                    self.monitor.update(
+                        pd.read_csv(errors_file, header=[0, 1], index_col=0)
+                    )
+            if self.monitor.errors:
+                self._update_prediction(iteration - 1)
+        return iteration
+
+    def _iterate_dir(self, iteration: int) -> Path:
+        return self.output_dir / f"{self.exp_id}_{iteration}"
+
     def _postprocess_iteration(self, next_iteration_exists: bool, rel_tol: float):
+        current_iterate, forcing = self._remap_iteration()
+        self._finish_iteration(
+            self.iter, current_iterate, forcing, next_iteration_exists, rel_tol
+        )
+
+    def _remap_iteration(self) -> tuple[RunDirectoryIndex, dict[str, str]]:
+        """move the output of the current iteration, create input for the next one."""
         print(f"Postprocessing iteration {self.iter}")
 
-        current_iterate_dir = self.output_dir / f"{self.exp_id}_{self.iter}"
+        current_iterate_dir = self._iterate_dir(self.iter)
         if current_iterate_dir.exists():
             warnings.warn("Iteration already exists. Replacing contents!")
             shutil.rmtree(current_iterate_dir)
         self.run_directory.rename(current_iterate_dir)
+        current_iterate = RunDirectoryIndex(current_iterate_dir)
 
         self.run_directory.mkdir()
-        remapper = RemapCouplerOutput(
-            current_iterate_dir,
-            self.run_directory,
-            self.experiment.cpl_scheme,
-            self.experiment.dt_cpl,
-            self.experiment.dt_ifs,
-            self.experiment.dt_nemo,
-            self.context.model_version,
-        )
-        remapper.remap()
+        with trace(self.tracer, "remap", iteration=self.iter):
+            self._remapper(current_iterate).remap()
+            forcing = directory_checksums(self.run_directory)
+        if self.acceleration is not None:
+            with trace(self.tracer, "acceleration", iteration=self.iter):
+                accelerate_forcing(self.run_directory, self.acceleration)
+        return current_iterate, forcing
 
-        if self.iter > 1:
-            previous_iterate_dir = self.output_dir / f"{self.exp_id}_{self.iter - 1}"
-            reference_dir = self.output_dir / f"{self.exp_id}_1"
+    def _finish_iteration(
+        self,
+        iteration: int,
+        current_iterate: RunDirectoryIndex,
+        forcing: dict[str, str],
+        next_iteration_exists: bool,
+        rel_tol: float,
+    ):
+        """check convergence, reduce output, write the experiment setup and the manifest."""
+        current_iterate_dir = current_iterate.directory
+        if iteration > 1:
+            previous_iterate_dir = self._iterate_dir(iteration - 1)
+            reference_dir = self._iterate_dir(1)
 
-            conv_2_norm, conv_inf_norm = self.convergence_checker.check_convergence(
-                current_iterate_dir, previous_iterate_dir, reference_dir, rel_tol
-            )
+            with trace(self.tracer, "convergence_check", iteration=iteration):
+                conv_2_norm, conv_inf_norm = self.convergence_checker.check_convergence(
+                    current_iterate, previous_iterate_dir, reference_dir, rel_tol
+                )
             self.experiment.iterate_converged = {
                 "2-norm": conv_2_norm,
                 "inf-norm": conv_inf_norm,
             }
             if conv_2_norm and conv_inf_norm:
                 self.converged = True
-                print(f"Iteration {self.iter} converged!")
+                print(f"Iteration {iteration} converged!")
+            self.monitor.update(self.convergence_checker.errors)
+            self._update_prediction(iteration)
 
-        self.experiment.iteration = self.iter
+        self.experiment.iteration = iteration
 
         if self.reduce_output:
             if not next_iteration_exists:
                 shutil.rmtree(self.run_directory)
-            reduce_output(current_iterate_dir, keep_debug_output=False)
-        self.experiment.to_yaml(current_iterate_dir / "setup_dict.yaml")
+            with trace(self.tracer, "reduce_output", iteration=iteration):
+                reduce_output(current_iterate, keep_debug_output=False)
+        if self.compact_output:
+            with trace(self.tracer, "compaction", iteration=iteration):
+                bytes_saved = compact_output(current_iterate, **self.compaction_options)
+            print(f"Compaction saved {bytes_saved / 2**20:.1f} MiB")
+        with trace(self.tracer, "write_setup", iteration=iteration):
+            self.experiment.to_yaml(current_iterate_dir / "setup_dict.yaml")
+            if iteration > 1:
+                self.convergence_checker.errors.to_csv(
+                    current_iterate_dir / "convergence_errors.csv"
+                )
+            write_manifest(
+                current_iterate_dir,
+                {
+                    "status": "complete",
+                    "exp_id": self.exp_id,
+                    "iteration": iteration,
+                    "forcing": forcing,
+                    "converged": (
+                        self.experiment.iterate_converged if iteration > 1 else None
+                    ),
+                },
+            )
+            if self.catalog is not None:
+                self.catalog.record(
+                    self.experiment,
+                    current_iterate_dir,
+                    "schwarz",
+                    self._run_times.pop(iteration, None),
+                )
 
     def _prepare_restart(self):
-        previous_iterate_dir = self.output_dir / f"{self.exp_id}_{self.iter - 1}"
+        previous_iterate_dir = self._iterate_dir(self.iter - 1)
         if not previous_iterate_dir.exists():
             raise FileNotFoundError(
                 f"Output data from iteration {self.iter - 1} not found!"
             )
 
         self.run_directory.mkdir(exist_ok=True)
-        remapper = RemapCouplerOutput(
-            previous_iterate_dir,
+        self._remapper(previous_iterate_dir).remap()
+
+    def _remapper(self, iterate_dir: Path | RunDirectoryIndex) -> RemapCouplerOutput:
+        return RemapCouplerOutput(
+            iterate_dir,
             self.run_directory,
             self.experiment.cpl_scheme,
             self.experiment.dt_cpl,
             self.experiment.dt_ifs,
             self.experiment.dt_nemo,
             self.context.model_version,
+            lean_io=True,
+            max_workers=self.remap_workers,
         )
-        remapper.remap()
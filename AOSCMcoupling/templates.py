@@ -1,4 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterable
 
 import jinja2
 
@@ -6,20 +8,90 @@ from AOSCMcoupling.context import Context
 from AOSCMcoupling.experiment import Experiment
 
 
+@lru_cache(maxsize=None)
+def _get_environment(template_dir: Path) -> jinja2.Environment:
+    loader = jinja2.FileSystemLoader(template_dir)
+    # with auto_reload, compiled templates are reused until the template file changes
+    return jinja2.Environment(
+        loader=loader, undefined=jinja2.StrictUndefined, auto_reload=True
+    )
+
+
 def get_template(template_path: Path) -> jinja2.Template:
-    """get Jinja2 template file"""
-    loader = jinja2.FileSystemLoader(template_path.parent)
-    environment = jinja2.Environment(loader=loader, undefined=jinja2.StrictUndefined)
+    """get Jinja2 template file
+
+    The compiled template is cached and recompiled only if the template file changes.
+    """
+    template_path = Path(template_path)
+    environment = _get_environment(template_path.parent.absolute())
     return environment.get_template(template_path.name)
 
 
-def render_config_xml(context: Context, experiment: Experiment) -> None:
+def _write_if_changed(path: Path, content: str, skip_unchanged: bool) -> None:
+    if skip_unchanged and path.exists() and path.read_text() == content:
+        return
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def render_config_xml(
+    context: Context,
+    experiment: Experiment,
+    target_dir: Path = None,
+    skip_unchanged: bool = False,
+) -> Path:
+    """Render `config-run.xml` for an experiment.
+
+    :param context: model context, provides the template
+    :type context: Context
+    :param experiment: experiment to configure
+    :type experiment: Experiment
+    :param target_dir: directory for `config-run.xml`, default: `context.runscript_dir`
+    :type target_dir: Path, optional
+    :param skip_unchanged: do not write the file if its content would not change, default: False
+    :type skip_unchanged: bool, optional
+    :return: path of the rendered `config-run.xml`
+    :rtype: Path
+    """
+    if target_dir is None:
+        target_dir = context.runscript_dir
     jinja_template = get_template(context.config_run_template)
-    with open(context.runscript_dir / "config-run.xml", "w") as config_run_xml:
-        config_run_xml.write(
-            jinja_template.render(
-                context=context,
-                experiment=experiment,
-                str=str,
-            )
-        )
+    config_run_xml = Path(target_dir) / "config-run.xml"
+    _write_if_changed(
+        config_run_xml,
+        jinja_template.render(
+            context=context,
+            experiment=experiment,
+            str=str,
+        ),
+        skip_unchanged,
+    )
+    return config_run_xml
+
+
+def render_config_xmls(
+    runs: Iterable[tuple[Context, Experiment]],
+    target_dirs: Iterable[Path] = None,
+    skip_unchanged: bool = False,
+) -> list[Path]:
+    """Render `config-run.xml` for many runs at once.
+
+    :param runs: pairs of context and experiment
+    :type runs: Iterable[tuple[Context, Experiment]]
+    :param target_dirs: one directory per run, default: `runscript_dir` of each context
+    :type target_dirs: Iterable[Path], optional
+    :param skip_unchanged: do not write files if their content would not change, default: False
+    :type skip_unchanged: bool, optional
+    :return: paths of the rendered files, in the order of `runs`
+    :rtype: list[Path]
+    """
+    runs = list(runs)
+    if target_dirs is None:
+        target_dirs = [context.runscript_dir for context, _ in runs]
+    target_dirs = list(target_dirs)
+    if len(target_dirs) != len(runs):
+        raise ValueError("Number of target directories does not match number of runs")
+    return [
+        render_config_xml(context, experiment, target_dir, skip_unchanged)
+        for (context, experiment), target_dir in zip(runs, target_dirs)
+    ]
@@ -0,0 +1,97 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+
+@dataclass
+class TraceEvent:
+    """A completed phase, times in seconds since the start of the tracer."""
+
+    name: str
+    start: float
+    duration: float
+    thread: int
+    args: dict = field(default_factory=dict)
+
+
+class Tracer:
+    """Record the wall time of phases of AOSCM runs.
+
+    Phases are recorded with the context manager `phase`, from any thread.
+    `AOSCM` and `SchwarzCoupling` record their phases (e.g., "ecconf", "model",
+    "remap", "convergence_check") if they are given a tracer.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **args):
+        """record the wall time of the enclosed code as phase `name`.
+
+        :param name: name of the phase
+        :type name: str
+        :param args: additional information, e.g., the iteration
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = TraceEvent(
+                name, start - self._origin, end - start, threading.get_ident(), args
+            )
+            with self._lock:
+                self.events.append(event)
+
+    def summary(self) -> pd.DataFrame:
+        """number of calls, total and mean wall time (in seconds) of each phase."""
+        durations = pd.DataFrame(
+            {
+                "phase": [event.name for event in self.events],
+                "duration": [event.duration for event in self.events],
+            }
+        )
+        summary = durations.groupby("phase")["duration"].agg(["count", "sum", "mean"])
+        return summary.rename(columns={"sum": "total"}).sort_values(
+            "total", ascending=False
+        )
+
+    def to_json(self, path: Path | str) -> None:
+        """write all events to a JSON file."""
+        with open(path, "w") as file:
+            json.dump([asdict(event) for event in self.events], file, indent=2)
+
+    def to_chrome_trace(self, path: Path | str) -> None:
+        """write all events in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": event.name,
+                "cat": "AOSCM",
+                "ph": "X",
+                "ts": event.start * 1e6,
+                "dur": event.duration * 1e6,
+                "pid": pid,
+                "tid": event.thread,
+                "args": event.args,
+            }
+            for event in self.events
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+
+
+def trace(tracer: Tracer | None, name: str, **args):
+    """`tracer.phase(name, **args)`, or a no-op if no tracer is given."""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.phase(name, **args)
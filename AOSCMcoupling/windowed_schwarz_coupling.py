@@ -0,0 +1,303 @@
+import dataclasses
+import shutil
+import warnings
+from pathlib import Path
+
+import netCDF4
+import pandas as pd
+
+from AOSCMcoupling.acceleration import Acceleration
+from AOSCMcoupling.checkpoint import read_manifest, write_manifest
+from AOSCMcoupling.context import Context
+from AOSCMcoupling.experiment import Experiment
+from AOSCMcoupling.files import netcdf_lock
+from AOSCMcoupling.forcing import read_forcing_info
+from AOSCMcoupling.run_directory import reduce_output
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+oasis_restart_files = ("rstas.nc", "rstos.nc")
+
+
+def split_windows(
+    start_date: pd.Timestamp, end_date: pd.Timestamp, window_length: pd.Timedelta
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """consecutive windows covering [start_date, end_date], the last one may be shorter."""
+    if window_length <= pd.Timedelta(0):
+        raise ValueError("Window length must be positive")
+    window_starts = pd.date_range(start_date, end_date, freq=window_length)
+    return [
+        (window_start, min(window_start + window_length, end_date))
+        for window_start in window_starts
+        if window_start < end_date
+    ]
+
+
+def collect_restart_files(iterate_dir: Path, target_dir: Path) -> dict[str, Path]:
+    """Copy the restart files written at the end of a run.
+
+    Collected are the OASIS restarts (`rstas.nc`, `rstos.nc`) and the last NEMO
+    ocean (`*_restart.nc`) and sea ice (`*_restart_ice.nc`) restarts.
+
+    :return: paths of the copies, by "rstas", "rstos", "nemo" and "ice"
+    :rtype: dict[str, Path]
+    """
+    target_dir.mkdir(parents=True)
+    restart_files = {}
+    for name in oasis_restart_files:
+        restart_files[Path(name).stem] = iterate_dir / name
+    nemo_restarts = sorted(iterate_dir.glob("*_restart.nc"))
+    if nemo_restarts:
+        restart_files["nemo"] = nemo_restarts[-1]
+    ice_restarts = sorted(iterate_dir.glob("*_restart_ice.nc"))
+    if ice_restarts:
+        restart_files["ice"] = ice_restarts[-1]
+
+    copies = {}
+    for kind, restart_file in restart_files.items():
+        if not restart_file.exists():
+            raise FileNotFoundError(f"Restart file not found: {restart_file}")
+        copies[kind] = target_dir / restart_file.name
+        shutil.copy2(restart_file, copies[kind])
+    return copies
+
+
+def check_initial_state(initial_state_file: Path, restart_file: Path) -> None:
+    """Check that a restart file can replace an initial state file.
+
+    The runscripts read `nem_input_file` and `ice_input_file` as initial state (e.g.,
+    NEMO copies it to `init_C1D.nc`), so a restart file has to provide all variables
+    of the initial state file it replaces.
+
+    :raises ValueError: if variables of the initial state file are missing
+    """
+    with netcdf_lock, netCDF4.Dataset(initial_state_file) as initial_state:
+        variables = set(initial_state.variables) - set(initial_state.dimensions)
+    with netcdf_lock, netCDF4.Dataset(restart_file) as restart:
+        missing = variables - set(restart.variables)
+    if missing:
+        raise ValueError(
+            f"Restart file {restart_file} cannot replace the initial state"
+            f" {initial_state_file}, it lacks the variables {sorted(missing)}."
+            " Use runscripts which start from restart files and"
+            " check_restart_files=False."
+        )
+
+
+class WindowedSchwarzCoupling:
+    """Schwarz WR on consecutive time windows.
+
+    The simulation interval of the experiment is split into windows of equal length.
+    SWR is run on each window (with `SchwarzCoupling`) until convergence, and the
+    next window starts from the restart files written by the last iterate:
+    OASIS restarts become `oasis_rstas`/`oasis_rstos`, NEMO ocean and sea ice
+    restarts become `nem_input_file`/`ice_input_file`. OpenIFS is started from the
+    forcing file at the window's start date (`ifs_nstrtini`).
+
+    The runscripts have to accept NEMO restart files as initial state; by default,
+    this is checked with `check_initial_state` before the next window is started.
+    Window start dates have to be available in the OpenIFS forcing file.
+
+    Each window has its own output directory (`window_000`, ...) in `context.output_dir`
+    (see `window_context`), which also holds the restart files for the next window in
+    `restart`, along with the iteration they were taken from. If a window is resumed
+    and ends with another iteration, e.g., with a larger `max_iters`, its restart files
+    are collected again and the output of all later windows is removed.
+    """
+
+    def __init__(
+        self,
+        experiment: Experiment,
+        context: Context,
+        window_length: pd.Timedelta,
+        reduce_output_after_window: bool = True,
+        check_restart_files: bool = True,
+        **schwarz_options,
+    ):
+        """Constructor.
+
+        :param experiment: experiment spanning all windows
+        :type experiment: Experiment
+        :param context: model context
+        :type context: Context
+        :param window_length: length of each window, a multiple of the coupling time step
+        :type window_length: pd.Timedelta
+        :param reduce_output_after_window: remove irrelevant output of all iterations
+            once the restart files of a window have been collected, default: True
+        :type reduce_output_after_window: bool, optional
+        :param check_restart_files: check that the NEMO and sea ice restarts can replace
+            the initial state files (see `check_initial_state`), default: True
+        :type check_restart_files: bool, optional
+        :param schwarz_options: further keyword arguments for `SchwarzCoupling`, except
+            `reduce_output_after_iteration` (see `reduce_output_after_window`)
+        :raises ValueError: if the window length is not a multiple of the coupling step
+            or `reduce_output_after_iteration` is given
+        """
+        if "reduce_output_after_iteration" in schwarz_options:
+            raise ValueError(
+                "Output is reduced after each window, as the restart files of the last"
+                " iterate are needed. Use reduce_output_after_window instead of"
+                " reduce_output_after_iteration."
+            )
+        window_length = pd.Timedelta(window_length)
+        if window_length % pd.Timedelta(seconds=experiment.dt_cpl) != pd.Timedelta(0):
+            raise ValueError("Window length must be a multiple of the coupling step")
+        self.experiment = experiment
+        self.context = context
+        self.window_length = window_length
+        self.reduce_output = reduce_output_after_window
+        self.check_restart_files = check_restart_files
+        self.schwarz_options = schwarz_options
+        self.windows = split_windows(
+            pd.Timestamp(experiment.run_start_date),
+            pd.Timestamp(experiment.run_end_date),
+            window_length,
+        )
+        self.iterations = []
+        # validate all window start dates before running the first window
+        self._nstrtini = read_forcing_info(experiment.ifs_input_file).nstrtini(
+            [window_start for window_start, _ in self.windows]
+        )
+
+    def window_context(self, window: int) -> Context:
+        """Context writing the output of a window to its own directory.
+
+        The ece3 runscripts write to `<RUN_DIR_BASE>/<site>/<exp_id>` with the parent of
+        `output_dir` as `RUN_DIR_BASE`, so `output_dir` is named after the site. Its
+        name is kept there, i.e., the output goes to `window_000/<site>`.
+        """
+        window_dir = self._window_dir(window)
+        if self.context.model_version == 3:
+            window_dir.mkdir(exist_ok=True)
+            window_dir = window_dir / self.context.output_dir.name
+        return dataclasses.replace(self.context, output_dir=window_dir)
+
+    def _window_dir(self, window: int) -> Path:
+        return self.context.output_dir / f"window_{window:03d}"
+
+    def window_experiment(
+        self, window: int, restart_files: dict[str, Path] = None
+    ) -> Experiment:
+        """experiment for one window, starting from the given restart files."""
+        window_start, window_end = self.windows[window]
+        changes = {
+            "run_start_date": window_start,
+            "run_end_date": window_end,
+            "ifs_nstrtini": int(self._nstrtini[window]),
+            "iteration": None,
+            "iterate_converged": None,
+            "convergence_prediction": None,
+        }
+        if restart_files:
+            changes["oasis_rstas"] = restart_files["rstas"]
+            changes["oasis_rstos"] = restart_files["rstos"]
+            if "nemo" in restart_files:
+                changes["nem_input_file"] = restart_files["nemo"]
+            if self.experiment.with_ice and "ice" in restart_files:
+                changes["ice_input_file"] = restart_files["ice"]
+        return dataclasses.replace(self.experiment, **changes)
+
+    def _schwarz_coupling(
+        self, experiment: Experiment, context: Context
+    ) -> SchwarzCoupling:
+        return SchwarzCoupling(
+            experiment,
+            context,
+            reduce_output_after_iteration=False,
+            **self.schwarz_options,
+        )
+
+    def run(
+        self,
+        max_iters: int,
+        rel_tol: float = 1e-3,
+        pipelined: bool = False,
+        acceleration: Acceleration = None,
+    ) -> list[int]:
+        """Run SWR on all windows, each until convergence or `max_iters`.
+
+        Windows which were already completed are skipped, and SWR within a window
+        resumes from its last completed iteration (see `SchwarzCoupling.run`).
+        Windows after one whose restart files changed are run again from scratch.
+
+        :param max_iters: maximum number of iterations per window
+        :type max_iters: int
+        :param rel_tol: relative tolerance of the convergence criteria, default: 1e-3
+        :type rel_tol: float, optional
+        :param pipelined: see `SchwarzCoupling.run`, default: False
+        :type pipelined: bool, optional
+        :param acceleration: see `SchwarzCoupling.run`, reset for every window, default: None
+        :type acceleration: Acceleration, optional
+        :return: number of iterations of each window
+        :rtype: list[int]
+        """
+        restart_files = None
+        restarts_changed = False
+        self.iterations = []
+        for window, (window_start, window_end) in enumerate(self.windows):
+            print(f"Window {window}: {window_start} - {window_end}")
+            if restarts_changed and self._window_dir(window).exists():
+                print(f"Removing window {window}, its restart files changed")
+                shutil.rmtree(self._window_dir(window))
+            context = self.window_context(window)
+            experiment = self.window_experiment(window, restart_files)
+            schwarz = self._schwarz_coupling(experiment, context)
+            schwarz.run(
+                max_iters,
+                current_iter=None,
+                stop_at_convergence=True,
+                rel_tol=rel_tol,
+                pipelined=pipelined,
+                acceleration=acceleration,
+            )
+            if not schwarz.converged:
+                warnings.warn(
+                    f"Window {window} did not converge in {max_iters} iterations."
+                )
+            self.iterations.append(schwarz.iter)
+
+            restart_dir = context.output_dir / "restart"
+            restart_manifest = read_manifest(restart_dir)
+            # restarts are stale if the window ended with another iteration
+            restarts_changed = (
+                restart_manifest is None
+                or restart_manifest.get("iteration") != schwarz.iter
+            )
+            if restarts_changed:
+                final_iterate_dir = (
+                    context.output_dir / f"{experiment.exp_id}_{schwarz.iter}"
+                )
+                # collect in a temporary directory first, so that restarts are complete
+                temporary_dir = context.output_dir / ".restart"
+                shutil.rmtree(temporary_dir, ignore_errors=True)
+                collect_restart_files(final_iterate_dir, temporary_dir)
+                write_manifest(temporary_dir, {"iteration": schwarz.iter})
+                shutil.rmtree(restart_dir, ignore_errors=True)
+                temporary_dir.rename(restart_dir)
+            restart_files = self._restart_files(restart_dir)
+            if self.check_restart_files and window + 1 < len(self.windows):
+                self._check_restart_files(restart_files)
+            if self.reduce_output:
+                shutil.rmtree(schwarz.run_directory, ignore_errors=True)
+                for iteration in range(1, schwarz.iter + 1):
+                    reduce_output(
+                        context.output_dir / f"{experiment.exp_id}_{iteration}",
+                        keep_debug_output=False,
+                    )
+        return self.iterations
+
+    def _check_restart_files(self, restart_files: dict[str, Path]) -> None:
+        if "nemo" in restart_files:
+            check_initial_state(self.experiment.nem_input_file, restart_files["nemo"])
+        if self.experiment.with_ice and "ice" in restart_files:
+            check_initial_state(self.experiment.ice_input_file, restart_files["ice"])
+
+    @staticmethod
+    def _restart_files(restart_dir: Path) -> dict[str, Path]:
+        restart_files = {
+            Path(name).stem: restart_dir / name for name in oasis_restart_files
+        }
+        for kind, pattern in (("nemo", "*_restart.nc"), ("ice", "*_restart_ice.nc")):
+            matches = sorted(restart_dir.glob(pattern))
+            if matches:
+                restart_files[kind] = matches[-1]
+        return restart_files
@@ -0,0 +1,204 @@
+"""Benchmark the preprocessors and convergence criteria used to analyse AOSCM output.
+
+Each case is timed (best of `--repeat` runs) and memory-profiled (peak of the memory
+allocated with Python's allocators, incl. NumPy, measured with `tracemalloc`) on
+synthetic output written by `synthetic.py`. Results are compared to the baselines
+stored in `baselines.json`; cases slower or more memory-hungry than their baseline
+by more than the tolerance are reported as regressions (exit status 1).
+
+Timings depend on the machine, so compare against baselines recorded on the same
+machine, e.g., by running with `--save-baseline` on the previous release first.
+
+Run from the top-level directory:
+```bash
+python benchmarks/preprocessing.py --nlev 60 137 --days 30 --members 8
+```
+"""
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from synthetic import write_coupling_files, write_ensemble
+
+from AOSCMcoupling.convergence_checker import relative_criterion, relative_error
+from AOSCMcoupling.files import (
+    NEMOEnsemblePreprocessor,
+    NEMOPreprocessor,
+    OASISPreprocessor,
+    OIFSEnsemblePreprocessor,
+    OIFSPreprocessor,
+    load_nemo_ensemble,
+    load_nemo_output,
+    load_oifs_ensemble,
+    load_oifs_output,
+)
+
+default_baseline_file = Path(__file__).parent / "baselines.json"
+origin = pd.Timestamp("2014-07-01")
+min_time_difference = 0.02
+
+
+def measure(function, repeat: int) -> dict[str, float]:
+    """best wall time (s) of `repeat` calls and peak traced memory (MiB) of one call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_s": min(timings), "peak_mib": peak / 2**20}
+
+
+def load(paths: list[Path], preprocess) -> None:
+    with xr.open_mfdataset(paths, preprocess=preprocess) as ds:
+        ds.load()
+
+
+def benchmark_cases(directory: Path, nlev: int, n_time: int, members: int) -> dict:
+    """write synthetic output to `directory` and return the benchmark cases."""
+    ensemble = write_ensemble(directory / "ensemble", members, n_time, nlev)
+    oifs_file, nemo_file = ensemble["oifs"][0], ensemble["nemo"][0]
+    coupling_files = write_coupling_files(
+        directory / "coupling", n_time=n_time, dt_cpl=900
+    )
+    with xr.open_dataset(oifs_file) as ds:
+        iterate = ds[["t", "q", "u", "v", "ts"]].load()
+    rng = np.random.default_rng(0)
+    perturbation = xr.DataArray(rng.standard_normal(iterate.time.size), dims="time")
+    previous_iterate = iterate * (1 + 1e-3 * perturbation)
+
+    oifs_variables = ["t", "q", "ts"]
+    nemo_variables = ["sst", "votemper"]
+    oifs = OIFSPreprocessor(origin)
+    nemo = NEMOPreprocessor(origin)
+    oasis = OASISPreprocessor(origin)
+    oifs_ensemble = OIFSEnsemblePreprocessor()
+    nemo_ensemble = NEMOEnsemblePreprocessor()
+    return {
+        "OIFSPreprocessor": lambda: load([oifs_file], oifs.preprocess),
+        "NEMOPreprocessor": lambda: load([nemo_file], nemo.preprocess),
+        "OASISPreprocessor": lambda: [
+            load([path], oasis.preprocess) for path in coupling_files
+        ],
+        "OIFSEnsemblePreprocessor": lambda: load(
+            ensemble["oifs"], oifs_ensemble.preprocess_ensemble
+        ),
+        "NEMOEnsemblePreprocessor": lambda: load(
+            ensemble["nemo"], nemo_ensemble.preprocess_ensemble
+        ),
+        # loaders reading a few variables, as in most analyses
+        "load_oifs_output": lambda: load_oifs_output(
+            [oifs_file], oifs_variables, origin
+        ),
+        "load_nemo_output": lambda: load_nemo_output(
+            [nemo_file], nemo_variables, origin
+        ),
+        "load_oifs_ensemble": lambda: load_oifs_ensemble(
+            ensemble["oifs"], oifs_variables
+        ),
+        "load_nemo_ensemble": lambda: load_nemo_ensemble(
+            ensemble["nemo"], nemo_variables
+        ),
+        "relative_error": lambda: relative_error(
+            iterate, previous_iterate, iterate
+        ).load(),
+        # relative_criterion reduces to a single bool, which requires a DataArray
+        "relative_criterion": lambda: relative_criterion(
+            iterate.t, previous_iterate.t, iterate.t, 1e-3
+        ),
+    }
+
+
+def compare(
+    results: dict, baselines: dict, time_tolerance: float, memory_tolerance: float
+) -> list[str]:
+    """names of all cases which regressed with respect to their baselines."""
+    regressions = []
+    for configuration, cases in results.items():
+        for case, result in cases.items():
+            baseline = baselines.get(configuration, {}).get(case)
+            if baseline is None:
+                continue
+            time_ratio = result["time_s"] / baseline["time_s"]
+            memory_ratio = result["peak_mib"] / max(baseline["peak_mib"], 1e-6)
+            # differences of a few milliseconds are within the timing noise
+            slower = (
+                time_ratio > 1 + time_tolerance
+                and result["time_s"] - baseline["time_s"] > min_time_difference
+            )
+            if slower or memory_ratio > 1 + memory_tolerance:
+                regressions.append(
+                    f"{configuration} {case}: time x{time_ratio:.2f}, "
+                    f"memory x{memory_ratio:.2f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nlev", type=int, nargs="+", default=[60, 137])
+    parser.add_argument("--days", type=int, default=30, help="simulated days")
+    parser.add_argument("--members", type=int, default=8, help="ensemble start dates")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline-file", type=Path, default=default_baseline_file)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as baselines"
+    )
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    n_time = 96 * args.days + 1
+    results = {}
+    for nlev in args.nlev:
+        configuration = f"nlev={nlev},days={args.days},members={args.members}"
+        results[configuration] = {}
+        print(configuration)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cases = benchmark_cases(Path(tmp_dir), nlev, n_time, args.members)
+            for case, function in cases.items():
+                result = measure(function, args.repeat)
+                results[configuration][case] = result
+                print(
+                    f"{case:>26}: {1e3 * result['time_s']:9.1f} ms "
+                    f"{result['peak_mib']:9.1f} MiB"
+                )
+    # ru_maxrss is in KiB on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(f"maximum resident set size: {maxrss:.1f} MiB")
+
+    baselines = {}
+    if args.baseline_file.exists():
+        with open(args.baseline_file) as file:
+            baselines = json.load(file)
+    if args.save_baseline:
+        baselines.update(results)
+        with open(args.baseline_file, "w") as file:
+            json.dump(baselines, file, indent=2)
+        print(f"Baselines written to {args.baseline_file}")
+        return
+
+    regressions = compare(
+        results, baselines, args.time_tolerance, args.memory_tolerance
+    )
+    if regressions:
+        print("Regressions with respect to the baselines:")
+        print("\n".join(regressions))
+        sys.exit(1)
+    print("No regressions with respect to the baselines.")
+
+
+if __name__ == "__main__":
+    main()
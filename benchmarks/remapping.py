@@ -0,0 +1,63 @@
+"""Benchmark `RemapCouplerOutput`: xarray path vs. lean netCDF4 path.
+
+Run from the top-level directory:
+```bash
+python benchmarks/remapping.py --days 30 --repeat 10
+```
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import write_coupling_files
+
+from AOSCMcoupling.remapping import RemapCouplerOutput
+
+
+def time_remapping(
+    read_directory: Path, write_directory: Path, repeat: int, **kwargs
+) -> float:
+    remapper = RemapCouplerOutput(
+        read_directory, write_directory, 0, 3600, 900, 900, 4, **kwargs
+    )
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        remapper.remap()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="simulated days")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        read_directory = Path(tmp_dir) / "iterate"
+        write_coupling_files(read_directory, n_time=24 * args.days + 1)
+        configurations = {
+            "xarray": {},
+            "lean, serial": {"lean_io": True, "max_workers": 1},
+            f"lean, {args.workers} threads": {
+                "lean_io": True,
+                "max_workers": args.workers,
+            },
+        }
+        baseline = None
+        for label, kwargs in configurations.items():
+            write_directory = Path(tmp_dir) / label.replace(" ", "_")
+            write_directory.mkdir()
+            best = time_remapping(
+                read_directory, write_directory, args.repeat, **kwargs
+            )
+            baseline = baseline or best
+            print(f"{label:>20}: {1e3 * best:8.1f} ms (speedup {baseline / best:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Stand-in for an EC-Earth AOSCM installation, for benchmarks without a compiled model.
+
+`create_stub_model` sets up a model directory with a stub `ec-conf`, which generates
+runscripts calling this file. Like the real model, the runscripts read
+`config-run.xml` and write OASIS coupling files (with the separators of the model
+version), OpenIFS/NEMO output and restart files to `<RUN_DIR_BASE>/<EXP_NAME>`.
+
+The coupling fields are base_i(t) + contraction * scale_i * c(t), where c(t) measures
+the deviation of the forcing remapped from the previous iterate (found in the run
+directory for Schwarz correction runs) from the base state, and c = 1 otherwise.
+SWR with the stub model therefore converges geometrically with rate `contraction`.
+"""
+
+import argparse
+import json
+import stat
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import pandas as pd
+
+from AOSCMcoupling.context import Context
+from AOSCMcoupling.remapping import atm_to_oce, oce_to_atm
+
+repository_dir = Path(__file__).absolute().parents[1]
+stub_config_name = "stub.json"
+
+runscript_suffixes = {
+    "atmosphere": "-scm_oifs.sh",
+    "ocean": "-scm_nemo.sh",
+    "coupled": "-scm_oifs+nemo.sh",
+    "schwarz_correction": "-scm_oifs+nemo_schwarz_corr.sh",
+}
+
+
+def _write_executable(path: Path, content: str) -> None:
+    path.write_text(content)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def create_stub_model(
+    root: Path,
+    model_version: int = 4,
+    contraction: float = 0.3,
+    seconds_per_day: float = 0.0,
+    nlev: int = 60,
+) -> Context:
+    """Create a stub model installation and a context using it.
+
+    :param root: directory for the model, data and output directories
+    :param model_version: EC-Earth version to mimic (3 or 4), default: 4
+    :param contraction: convergence rate of SWR, default: 0.3
+    :param seconds_per_day: wall time the stub model takes per simulated day, default: 0
+    :param nlev: number of levels of the OpenIFS output, default: 60
+    :return: context for the stub model
+    """
+    root = Path(root).absolute()
+    model_dir = root / "model"
+    runscript_dir = model_dir / "runtime/scm-classic/PAPA"
+    runscript_dir.mkdir(parents=True, exist_ok=True)
+    ecconf_executable = model_dir / "sources/util/ec-conf/ec-conf"
+    ecconf_executable.parent.mkdir(parents=True, exist_ok=True)
+    _write_executable(
+        ecconf_executable,
+        f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).absolute()}" '
+        f"ecconf {model_version}\n",
+    )
+    with open(model_dir / stub_config_name, "w") as file:
+        json.dump(
+            {
+                "model_version": model_version,
+                "contraction": contraction,
+                "seconds_per_day": seconds_per_day,
+                "nlev": nlev,
+            },
+            file,
+        )
+    data_dir = root / "data"
+    data_dir.mkdir(exist_ok=True)
+    # the output directory is named after the site, as expected by the ece3 runscripts
+    output_dir = root / "experiments" / "PAPA"
+    output_dir.parent.mkdir(exist_ok=True)
+    for input_file in ("oifs.nc", "rstas.nc", "rstos.nc"):
+        (data_dir / input_file).touch()
+    # initial state with the variables of the NEMO restarts written by `run`
+    _write_netcdf(data_dir / "nemo.nc", {"sst": (("x",), np.ones(1))}, {"x": 1})
+    return Context(
+        model_version=model_version,
+        platform="stub",
+        model_dir=model_dir,
+        output_dir=output_dir,
+        template_dir=repository_dir / "templates",
+        data_dir=data_dir,
+    )
+
+
+def ecconf(model_version: int) -> None:
+    """generate the runscripts in the current directory (the runscript directory)."""
+    prefix = "ece4" if model_version == 4 else "ece"
+    for mode, suffix in runscript_suffixes.items():
+        _write_executable(
+            Path(prefix + suffix),
+            f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).absolute()}" '
+            f'run "$(dirname "$0")" {mode}\n',
+        )
+
+
+def read_config_run(runscript_dir: Path) -> dict[str, str]:
+    """values of all parameters in `config-run.xml`, by name."""
+    tree = ElementTree.parse(runscript_dir / "config-run.xml")
+    return {
+        parameter.get("name"): (parameter.findtext("Value") or "").strip()
+        for parameter in tree.iter("Parameter")
+    }
+
+
+def _write_netcdf(path: Path, variables: dict[str, np.ndarray], dims: dict) -> None:
+    with netCDF4.Dataset(path, "w") as dataset:
+        for dim, size in dims.items():
+            dataset.createDimension(dim, size)
+        for name, (var_dims, values) in variables.items():
+            dataset.createVariable(name, "f8", var_dims)[:] = values
+
+
+def _forcing_deviation(
+    run_directory: Path, n_time: int, base: np.ndarray
+) -> np.ndarray:
+    """c(t): mean relative deviation of the remapped forcing from the base state."""
+    source_names = {target: source for source, target in atm_to_oce.items()}
+    source_names |= {target: source for source, target in oce_to_atm.items()}
+    scales = {name: i + 1 for i, name in enumerate([*atm_to_oce, *oce_to_atm])}
+    deviations = []
+    for target, source in source_names.items():
+        path = run_directory / f"{target}.nc"
+        if not path.exists():
+            continue
+        with netCDF4.Dataset(path) as dataset:
+            values = dataset.variables[target][:].reshape(
+                dataset.dimensions["time"].size, -1
+            )
+        values = values.mean(axis=1) / scales[source]
+        # the remapped forcing may lack the first coupling step
+        values = np.concatenate([np.repeat(values[:1], n_time - len(values)), values])
+        deviations.append(values[:n_time] - base)
+    if not deviations:
+        return np.ones(n_time)
+    return np.mean(deviations, axis=0)
+
+
+def run(runscript_dir: Path, mode: str) -> None:
+    """mimic a model run configured by `config-run.xml` in `runscript_dir`."""
+    runscript_dir = Path(runscript_dir)
+    config = read_config_run(runscript_dir)
+    model_dir = Path(config["ECEARTH_SRC_DIR"]).parent
+    with open(model_dir / stub_config_name) as file:
+        stub_config = json.load(file)
+    exp_id = config["EXP_NAME"]
+    run_directory = Path(config["RUN_DIR_BASE"]) / exp_id
+    if stub_config["model_version"] == 3:
+        # the ece3 runscripts add the site name to the run directory base
+        run_directory = Path(config["RUN_DIR_BASE"]) / "PAPA" / exp_id
+    run_directory.mkdir(parents=True, exist_ok=True)
+    start_date = pd.Timestamp(config["RUN_START_DATE"])
+    end_date = pd.Timestamp(config["RUN_END_DATE"])
+    dt_cpl = int(config["CPL_FREQ_ATM_OCE_SEC"])
+    n_time = int((end_date - start_date).total_seconds() // dt_cpl) + 1
+    time.sleep(
+        stub_config["seconds_per_day"] * (end_date - start_date) / pd.Timedelta("1D")
+    )
+
+    seconds = dt_cpl * np.arange(n_time, dtype=np.float64)
+    base = 1 + 0.5 * np.sin(2 * np.pi * (seconds + start_date.hour * 3600) / 86400)
+    if mode == "schwarz_correction":
+        deviation = _forcing_deviation(run_directory, n_time, base)
+    else:
+        deviation = np.ones(n_time)
+    values = base + stub_config["contraction"] * deviation
+
+    oifs_separator = "_OpenIFS_" if stub_config["model_version"] == 4 else "_ATMIFS_"
+    fields = []
+    if mode != "ocean":
+        fields += [(name, oifs_separator, 1) for name in atm_to_oce]
+    if mode != "atmosphere":
+        fields += [(name, "_oceanx_", 9) for name in oce_to_atm]
+    scales = {name: i + 1 for i, name in enumerate([*atm_to_oce, *oce_to_atm])}
+    for name, separator, nx in fields:
+        field = np.repeat((scales[name] * values)[:, None, None], nx, axis=2)
+        _write_netcdf(
+            run_directory / f"{name}{separator}01.nc",
+            {"time": (("time",), seconds), name: (("time", "ny", "nx"), field)},
+            {"time": n_time, "ny": 1, "nx": nx},
+        )
+
+    rng = np.random.default_rng(0)
+    nlev = stub_config["nlev"]
+    if mode != "ocean":
+        for name in ("diagvar.nc", "progvar.nc"):
+            _write_netcdf(
+                run_directory / name,
+                {
+                    "time": (("time",), seconds),
+                    "t": (("time", "nlev"), rng.random((n_time, nlev))),
+                },
+                {"time": n_time, "nlev": nlev},
+            )
+        _write_netcdf(
+            run_directory / "rstas.nc", {"A_SST": (("x",), values[-1:])}, {"x": 1}
+        )
+    if mode != "atmosphere":
+        _write_netcdf(
+            run_directory
+            / f"{exp_id}_1ts_{start_date:%Y%m%d}_{end_date:%Y%m%d}_grid_T.nc",
+            {
+                "time_counter": (("time_counter",), seconds),
+                "sst": (("time_counter",), values),
+            },
+            {"time_counter": n_time},
+        )
+        _write_netcdf(
+            run_directory / "rstos.nc", {"O_SSTSST": (("x",), values[-1:])}, {"x": 1}
+        )
+        _write_netcdf(
+            run_directory / f"{exp_id}_{n_time - 1:08d}_restart.nc",
+            {"sst": (("x",), values[-1:])},
+            {"x": 1},
+        )
+    print(f"Finished leg 1 at {end_date}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stub EC-Earth AOSCM")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ecconf_parser = subparsers.add_parser("ecconf")
+    ecconf_parser.add_argument("model_version", type=int)
+    ecconf_parser.add_argument("ecconf_args", nargs="*")
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("runscript_dir", type=Path)
+    run_parser.add_argument("mode", choices=runscript_suffixes)
+    args, _ = parser.parse_known_args()
+    if args.command == "ecconf":
+        ecconf(args.model_version)
+    else:
+        run(args.runscript_dir, args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark the Python side of Schwarz waveform relaxation with a stub model.
+
+The stub model (see `stub_model.py`) writes synthetic output instead of running
+EC-Earth, so the timings show the overhead of the SWR loop: template rendering,
+ec-conf, remapping, convergence checks, output reduction and writing the setup.
+
+Run from the top-level directory:
+```bash
+python benchmarks/swr_benchmark.py --days 30 --max-iters 10 --experiments 4
+```
+"""
+
+import argparse
+import dataclasses
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from stub_model import create_stub_model
+
+from AOSCMcoupling import (
+    EnsembleRunner,
+    Experiment,
+    SchwarzCoupling,
+    Tracer,
+)
+
+
+def stub_experiment(context, days: int, dt_cpl: int = 3600) -> Experiment:
+    start_date = pd.Timestamp("2014-07-01")
+    return Experiment(
+        dt_cpl=dt_cpl,
+        dt_nemo=900,
+        dt_ifs=900,
+        run_start_date=start_date,
+        run_end_date=start_date + pd.Timedelta(days=days),
+        nem_input_file=context.data_dir / "nemo.nc",
+        ifs_input_file=context.data_dir / "oifs.nc",
+        oasis_rstas=context.data_dir / "rstas.nc",
+        oasis_rstos=context.data_dir / "rstos.nc",
+        exp_id="STUB",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="simulated days")
+    parser.add_argument("--max-iters", type=int, default=10)
+    parser.add_argument("--experiments", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="for >1 experiments")
+    parser.add_argument("--model-version", type=int, default=4, choices=(3, 4))
+    parser.add_argument("--contraction", type=float, default=0.3)
+    parser.add_argument("--seconds-per-day", type=float, default=0.0)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        context = create_stub_model(
+            tmp_dir,
+            args.model_version,
+            contraction=args.contraction,
+            seconds_per_day=args.seconds_per_day,
+        )
+        experiment = stub_experiment(context, args.days)
+        run_kwargs = {
+            "max_iters": args.max_iters,
+            "stop_at_convergence": True,
+            "pipelined": args.pipelined,
+        }
+        experiments = [
+            dataclasses.replace(experiment, exp_id=f"S{i:03d}")
+            for i in range(args.experiments)
+        ]
+        start = time.perf_counter()
+        if args.workers > 1:
+            runner = EnsembleRunner(context, Path(tmp_dir) / "sandboxes", args.workers)
+            members = runner.run(experiments, mode="schwarz", **run_kwargs)
+            iterations = [member.experiment.iteration for member in members]
+            tracer = None
+        else:
+            tracer = Tracer()
+            iterations = []
+            for member in experiments:
+                schwarz = SchwarzCoupling(member, context, tracer=tracer)
+                schwarz.run(current_iter=1, **run_kwargs)
+                iterations.append(schwarz.iter)
+        wall_time = time.perf_counter() - start
+
+    print(
+        f"{args.experiments} experiment(s), {args.days} days, iterations: {iterations}"
+    )
+    print(f"total wall time: {wall_time:.2f} s")
+    if tracer is not None:
+        print(tracer.summary().to_string(float_format="{:.3f}".format))
+        if args.trace:
+            tracer.to_chrome_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
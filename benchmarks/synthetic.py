@@ -0,0 +1,167 @@
+"""Synthetic output files for benchmarks, mimicking the output of the EC-Earth AOSCM."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from AOSCMcoupling.remapping import atm_to_oce, oce_to_atm
+
+
+def oifs_separator(model_version: int) -> str:
+    if model_version == 4:
+        return "_OpenIFS_"
+    return "_ATMIFS_"
+
+
+def write_coupling_file(
+    path: Path, name: str, values: np.ndarray, dt_cpl: int, nx: int = 1
+) -> None:
+    """write an OASIS coupling file with dimensions (time, ny, nx)."""
+    values = np.repeat(np.asarray(values, dtype=np.float64)[:, None, None], nx, axis=2)
+    time = dt_cpl * np.arange(values.shape[0], dtype=np.float64)
+    xr.DataArray(
+        values, dims=("time", "ny", "nx"), coords={"time": time}, name=name
+    ).to_netcdf(path)
+
+
+def write_coupling_files(
+    directory: Path,
+    n_time: int,
+    dt_cpl: int = 3600,
+    model_version: int = 4,
+    scale: float = 1.0,
+    seed: int = 0,
+) -> list[Path]:
+    """write one OASIS coupling file for every field exchanged in the AOSCM.
+
+    Atmospheric fields have one grid point, oceanic fields nine (`nx=9`).
+
+    :param directory: target directory, created if necessary
+    :param n_time: number of coupling time steps
+    :param dt_cpl: coupling time step in seconds, default: 3600
+    :param model_version: EC-Earth version (determines the OpenIFS file separator)
+    :param scale: factor applied to all values, default: 1.0
+    :param seed: seed for the random perturbations, default: 0
+    :return: paths of the written files
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    time = np.arange(n_time)
+    paths = []
+    fields = [(name, oifs_separator(model_version), 1) for name in atm_to_oce]
+    fields += [(name, "_oceanx_", 9) for name in oce_to_atm]
+    for i, (name, separator, nx) in enumerate(fields):
+        values = (i + 1) * (1 + 0.5 * np.sin(2 * np.pi * time * dt_cpl / 86400))
+        values = scale * (values + 0.01 * rng.standard_normal(n_time))
+        path = directory / f"{name}{separator}01.nc"
+        write_coupling_file(path, name, values, dt_cpl, nx)
+        paths.append(path)
+    return paths
+
+
+def write_oifs_output(
+    path: Path, n_time: int, nlev: int = 60, dt: int = 900, seed: int = 0
+) -> Path:
+    """write an OpenIFS SCM output file (like `diagvar.nc`/`progvar.nc`).
+
+    Profiles have dimensions (time, nlev), surface fields (time,). As in the model
+    output, `time` is relative to the start date and `ncextr` is an extra variable.
+
+    :param path: target file
+    :param n_time: number of output time steps
+    :param nlev: number of vertical levels, e.g., 60 or 137, default: 60
+    :param dt: output time step in seconds, default: 900
+    :param seed: seed for the random values, default: 0
+    :return: path of the written file
+    """
+    rng = np.random.default_rng(seed)
+    time = pd.to_timedelta(dt * np.arange(n_time), unit="s")
+    profiles = {
+        name: (("time", "nlev"), rng.random((n_time, nlev)))
+        for name in ("t", "q", "u", "v")
+    }
+    surface = {name: ("time", rng.random(n_time)) for name in ("ts", "sshf", "slhf")}
+    ds = xr.Dataset(
+        {**profiles, **surface, "ncextr": ("time", np.zeros(n_time))},
+        coords={"time": time, "nlev": np.arange(nlev)},
+    )
+    ds.to_netcdf(path)
+    return Path(path)
+
+
+def write_nemo_output(
+    path: Path,
+    n_time: int,
+    start_date: pd.Timestamp = pd.Timestamp("2014-07-01"),
+    ndepth: int = 75,
+    dt: int = 900,
+    seed: int = 0,
+) -> Path:
+    """write a NEMO SCM output file (like `*_grid_T.nc`) on a 3x3 horizontal grid.
+
+    :param path: target file
+    :param n_time: number of output time steps
+    :param start_date: date of the first output time step
+    :param ndepth: number of vertical levels, default: 75
+    :param dt: output time step in seconds, default: 900
+    :param seed: seed for the random values, default: 0
+    :return: path of the written file
+    """
+    rng = np.random.default_rng(seed)
+    surface = {
+        name: (("time_counter", "y", "x"), rng.random((n_time, 3, 3)))
+        for name in ("sst", "sss", "qns", "qsr")
+    }
+    ds = xr.Dataset(
+        {
+            **surface,
+            "votemper": (
+                ("time_counter", "deptht", "y", "x"),
+                rng.random((n_time, ndepth, 3, 3)),
+            ),
+        },
+        coords={"time_counter": dt * np.arange(n_time, dtype=np.float64)},
+    )
+    ds.time_counter.attrs = {
+        "units": f"seconds since {start_date:%Y-%m-%d %H:%M:%S}",
+        "calendar": "gregorian",
+    }
+    ds.to_netcdf(path)
+    return Path(path)
+
+
+def write_ensemble(
+    root: Path,
+    members: int,
+    n_time: int,
+    nlev: int = 60,
+    coupling_schemes: tuple[str] = ("parallel", "schwarz"),
+) -> dict[str, list[Path]]:
+    """write OpenIFS and NEMO output of an ensemble, in `<start_date>/<coupling_scheme>/`.
+
+    :param root: ensemble directory
+    :param members: number of start dates (one day apart)
+    :param n_time: number of output time steps per member
+    :param nlev: number of OpenIFS levels, default: 60
+    :param coupling_schemes: coupling schemes run for each start date
+    :return: paths of the OpenIFS ("oifs") and NEMO ("nemo") files
+    """
+    paths = {"oifs": [], "nemo": []}
+    start_dates = pd.date_range("2014-07-01", periods=members, freq="1D")
+    for i, start_date in enumerate(start_dates):
+        for j, coupling_scheme in enumerate(coupling_schemes):
+            member_dir = Path(root) / f"{start_date:%Y-%m-%d}" / coupling_scheme
+            member_dir.mkdir(parents=True, exist_ok=True)
+            seed = i * len(coupling_schemes) + j
+            paths["oifs"].append(
+                write_oifs_output(member_dir / "diagvar.nc", n_time, nlev, seed=seed)
+            )
+            paths["nemo"].append(
+                write_nemo_output(
+                    member_dir / "nemo_grid_T.nc", n_time, start_date, seed=seed
+                )
+            )
+    return paths
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from AOSCMcoupling.context import Context
+from AOSCMcoupling.convergence_checker import ConvergenceChecker
+from AOSCMcoupling.experiment import Experiment
+
+template_dir = Path(__file__).parents[1] / "templates"
+
+
+@pytest.fixture
+def context(tmp_path):
+    model_dir = tmp_path / "model"
+    ecconf_executable = model_dir / "sources/util/ec-conf/ec-conf"
+    ecconf_executable.parent.mkdir(parents=True)
+    ecconf_executable.touch()
+    (model_dir / "runtime/scm-classic/PAPA").mkdir(parents=True)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return Context(
+        model_version=4,
+        platform="pc-gcc-openmpi",
+        model_dir=model_dir,
+        output_dir=tmp_path / "output",
+        template_dir=template_dir,
+        data_dir=data_dir,
+    )
+
+
+@pytest.fixture
+def experiment(context):
+    input_files = ["nemo.nc", "oifs.nc", "rstas.nc", "rstos.nc"]
+    for input_file in input_files:
+        (context.data_dir / input_file).touch()
+    return Experiment(
+        dt_cpl=3600,
+        dt_nemo=900,
+        dt_ifs=900,
+        run_start_date=pd.Timestamp("2014-07-01"),
+        run_end_date=pd.Timestamp("2014-07-02"),
+        nem_input_file=context.data_dir / "nemo.nc",
+        ifs_input_file=context.data_dir / "oifs.nc",
+        oasis_rstas=context.data_dir / "rstas.nc",
+        oasis_rstos=context.data_dir / "rstos.nc",
+        exp_id="TEST",
+    )
+
+
+def write_coupling_file(path, name, values, nx=1):
+    """write a synthetic OASIS coupling file with dimensions (time, ny, nx)."""
+    values = np.repeat(np.asarray(values, dtype=float)[:, None, None], nx, axis=2)
+    time = 3600.0 * np.arange(values.shape[0])
+    da = xr.DataArray(
+        values, dims=("time", "ny", "nx"), coords={"time": time}, name=name
+    )
+    da.to_netcdf(path)
+
+
+@pytest.fixture
+def coupling_files():
+    """factory writing one synthetic file for each coupling field of the checker."""
+
+    def write(directory, scale=1.0, n_time=25):
+        directory.mkdir(exist_ok=True)
+        for i, name in enumerate(ConvergenceChecker().coupling_vars):
+            separator = "OpenIFS" if name.startswith("A_") else "oceanx"
+            values = scale * (i + 1) * (1 + np.sin(np.arange(n_time)))
+            write_coupling_file(directory / f"{name}_{separator}_01.nc", name, values)
+        return directory
+
+    return write
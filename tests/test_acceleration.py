@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import xarray as xr
+from conftest import write_coupling_file
+
+from AOSCMcoupling.acceleration import (
+    Acceleration,
+    AitkenRelaxation,
+    AndersonAcceleration,
+    ConstantRelaxation,
+    accelerate_forcing,
+)
+
+
+def _iterations_to_converge(acceleration, eigenvalues, tol=1e-8, max_iters=200):
+    """iterate the linear contraction G(x) = Ax + b, return the number of iterations."""
+    rng = np.random.default_rng(0)
+    q, _ = np.linalg.qr(rng.normal(size=(20, 20)))
+    matrix = q @ np.diag(eigenvalues) @ q.T
+    offset = rng.normal(size=20)
+    solution = np.linalg.solve(np.eye(20) - matrix, offset)
+    forcing = np.zeros(20)
+    for iteration in range(1, max_iters + 1):
+        if np.linalg.norm(forcing - solution) < tol:
+            return iteration
+        remapped = matrix @ forcing + offset
+        forcing = remapped if acceleration is None else acceleration.update(remapped)
+    return max_iters
+
+
+def test_acceleration_requires_next():
+    class NoAcceleration(Acceleration):
+        pass
+
+    with pytest.raises(TypeError):
+        NoAcceleration()
+
+
+def test_accelerations_converge_faster():
+    # oscillating iteration, which benefits from under-relaxation
+    eigenvalues = np.linspace(-0.95, 0.2, 20)
+    plain = _iterations_to_converge(None, eigenvalues)
+    assert _iterations_to_converge(AitkenRelaxation(), eigenvalues) < plain / 4
+
+    eigenvalues = np.linspace(-0.9, 0.9, 20)
+    plain = _iterations_to_converge(None, eigenvalues)
+    anderson = _iterations_to_converge(AndersonAcceleration(history=20), eigenvalues)
+    assert anderson < plain / 4
+    pytest.raises(ValueError, ConstantRelaxation, 1.5)
+
+
+def test_accelerate_forcing(tmp_path):
+    write_coupling_file(tmp_path / "A_Ice_frac.nc", "A_Ice_frac", np.full(4, 0.9))
+    write_coupling_file(tmp_path / "O_QsrMix.nc", "O_QsrMix", np.full(4, 100.0))
+    relaxation = ConstantRelaxation(omega=2 / 3)
+    # first step: plain fixed-point iteration
+    accelerate_forcing(tmp_path, relaxation)
+
+    write_coupling_file(tmp_path / "A_Ice_frac.nc", "A_Ice_frac", np.full(4, 1.5))
+    write_coupling_file(tmp_path / "O_QsrMix.nc", "O_QsrMix", np.full(4, 130.0))
+    accelerate_forcing(tmp_path, relaxation)
+    with xr.open_dataarray(tmp_path / "O_QsrMix.nc") as da:
+        np.testing.assert_allclose(da.to_numpy(), 120.0)
+    with xr.open_dataarray(tmp_path / "A_Ice_frac.nc") as da:
+        np.testing.assert_allclose(da.to_numpy(), 1.0)
+    np.testing.assert_allclose(relaxation.forcing, [120.0] * 4 + [1.0] * 4)
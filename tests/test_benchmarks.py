@@ -0,0 +1,15 @@
+from preprocessing import benchmark_cases, compare, measure
+
+
+def test_preprocessing_benchmark(tmp_path):
+    cases = benchmark_cases(tmp_path, nlev=137, n_time=25, members=2)
+    results = {case: measure(function, repeat=1) for case, function in cases.items()}
+    assert all(result["peak_mib"] > 0 for result in results.values())
+
+    baselines = {"small": {case: dict(result) for case, result in results.items()}}
+    assert compare({"small": results}, baselines, 0.25, 0.1) == []
+    baselines["small"]["OIFSPreprocessor"]["time_s"] = 0.5
+    results["OIFSPreprocessor"]["time_s"] = 1.0
+    assert compare({"small": results}, baselines, 0.25, 0.1) == [
+        "small OIFSPreprocessor: time x2.00, memory x1.00"
+    ]
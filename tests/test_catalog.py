@@ -0,0 +1,83 @@
+import dataclasses
+
+import pandas as pd
+import pytest
+from ruamel.yaml import YAML
+from test_schwarz_coupling import FakeAOSCM
+
+from AOSCMcoupling.catalog import ExperimentCatalog
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+
+def test_catalog(tmp_path, experiment):
+    catalog = ExperimentCatalog(tmp_path / "catalog.sqlite")
+    catalog.record(experiment, tmp_path / "coupled", "coupled", wall_time=2.0)
+    with_ice = dataclasses.replace(
+        experiment,
+        exp_id="ICE",
+        dt_cpl=900,
+        iteration=3,
+        with_ice=True,
+        ice_input_file=experiment.nem_input_file,
+    )
+    with_ice.iterate_converged = {"2-norm": True, "inf-norm": False}
+    catalog.record(with_ice, tmp_path / "ICE_3", "schwarz")
+
+    assert catalog.find(kind="coupled") == [tmp_path / "coupled"]
+    assert catalog.find(with_ice=True, dt_cpl=[900, 1800]) == [tmp_path / "ICE_3"]
+    assert catalog.find(converged=False, iteration=3) == [tmp_path / "ICE_3"]
+    assert catalog.find(run_start_date="2014-07-01", iteration=None) == [
+        tmp_path / "coupled"
+    ]
+    assert catalog.find(run_end_date=pd.Timestamp("2014-07-05")) == []
+    with pytest.raises(ValueError):
+        catalog.find(dt=900)
+
+    # recording a run directory again replaces its entry
+    with_ice.iterate_converged = {"2-norm": True, "inf-norm": True}
+    catalog.record(with_ice, tmp_path / "ICE_3", "schwarz")
+    records = ExperimentCatalog(tmp_path / "catalog.sqlite").records(exp_id="ICE")
+    assert len(records) == 1
+    assert records.converged[0] and records.with_ice[0]
+    assert records.run_start_date[0] == "2014-07-01 00:00:00"
+
+    catalog.to_yaml(tmp_path / "catalog.yaml", kind="coupled")
+    (entry,) = YAML(typ="safe", pure=True).load(tmp_path / "catalog.yaml")
+    assert entry["wall_time"] == 2.0 and entry["with_ice"] is False
+    assert entry["iterate_converged"] is None
+
+
+def test_catalog_field_representation(tmp_path, experiment):
+    catalog = ExperimentCatalog(tmp_path / "catalog.sqlite")
+    not_converged = dataclasses.replace(
+        experiment, run_start_date="2014-07-01", iteration=2
+    )
+    not_converged.iterate_converged = {"2-norm": False, "inf-norm": False}
+    catalog.record(not_converged, tmp_path / "TEST_2", "schwarz")
+
+    # dates given as strings are found by string and Timestamp queries
+    assert catalog.find(run_start_date="2014-07-01") == [tmp_path / "TEST_2"]
+    assert catalog.find(run_start_date=pd.Timestamp("2014-07-01")) == [
+        tmp_path / "TEST_2"
+    ]
+    records = catalog.records()
+    assert not records.converged[0]
+    assert records.iterate_converged[0] == {"2-norm": False, "inf-norm": False}
+
+    catalog.to_yaml(tmp_path / "catalog.yaml")
+    (entry,) = YAML(typ="safe", pure=True).load(tmp_path / "catalog.yaml")
+    assert entry["iterate_converged"] == {"2-norm": False, "inf-norm": False}
+
+
+def test_schwarz_coupling_records_iterations(tmp_path, context, experiment):
+    catalog = ExperimentCatalog(tmp_path / "catalog.sqlite")
+    schwarz = SchwarzCoupling(experiment, context, catalog=catalog)
+    schwarz.aoscm = FakeAOSCM(schwarz.run_directory)
+    schwarz.run_directory.mkdir(parents=True)
+    schwarz.run(6, stop_at_convergence=True)
+
+    records = catalog.records(kind="schwarz")
+    assert list(records.iteration) == [1, 2, 3, 4]
+    assert records.converged.isna()[0] and not records.converged[1]
+    assert (records.wall_time >= 0).all()
+    assert catalog.find(converged=True) == [context.output_dir / "TEST_4"]
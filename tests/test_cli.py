@@ -0,0 +1,101 @@
+import subprocess
+import sys
+
+import pytest
+from ruamel.yaml import YAML
+from stub_model import create_stub_model, stub_config_name
+
+import AOSCMcoupling
+from AOSCMcoupling.catalog import ExperimentCatalog
+from AOSCMcoupling.cli import load_setup, main
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+
+def test_lazy_imports():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, AOSCMcoupling; print(sorted(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    for heavy_module in ("pandas", "xarray", "netCDF4"):
+        assert f"'{heavy_module}'" not in modules
+    assert AOSCMcoupling.SchwarzCoupling is SchwarzCoupling
+    assert "SchwarzCoupling" in dir(AOSCMcoupling)
+    with pytest.raises(AttributeError):
+        AOSCMcoupling.NotAClass
+
+
+def write_config(tmp_path):
+    context = create_stub_model(tmp_path / "stub", contraction=0.05)
+    config = {
+        "context": {
+            "model_version": context.model_version,
+            "platform": context.platform,
+            "model_dir": str(context.model_dir),
+            "output_dir": str(context.output_dir),
+            "template_dir": str(context.template_dir),
+            "data_dir": str(context.data_dir),
+        },
+        "experiment": {
+            "exp_id": "CLI",
+            "dt_cpl": 3600,
+            "dt_nemo": 900,
+            "dt_ifs": 900,
+            "run_start_date": "2014-07-01",
+            "run_end_date": "2014-07-02",
+            **{
+                name: str(context.data_dir / file)
+                for name, file in (
+                    ("nem_input_file", "nemo.nc"),
+                    ("ifs_input_file", "oifs.nc"),
+                    ("oasis_rstas", "rstas.nc"),
+                    ("oasis_rstos", "rstos.nc"),
+                )
+            },
+        },
+    }
+    config_file = tmp_path / "config.yaml"
+    with open(config_file, "w") as file:
+        YAML(typ="safe", pure=True).dump(config, file)
+    return config_file, context.output_dir
+
+
+def test_cli(tmp_path, capsys):
+    config_file, output_dir = write_config(tmp_path)
+    catalog = str(tmp_path / "catalog.sqlite")
+    swr = ["swr", str(config_file), "--max-iters", "2", "--catalog", catalog]
+    assert main(swr) == 0
+    assert "Iterations: 2, converged: False" in capsys.readouterr().out
+    assert (
+        main(["resume", str(config_file), "--max-iters", "6", "--catalog", catalog])
+        == 0
+    )
+    assert "converged: True" in capsys.readouterr().out
+    assert main(["find", catalog, "converged=true", "dt_cpl=900,3600"]) == 0
+    (converged_iterate,) = capsys.readouterr().out.split()
+
+    iterates = sorted(output_dir.glob("CLI_[0-9]"))
+    iterates = [str(iterate) for iterate in iterates]
+    assert iterates[-1] == converged_iterate
+    assert main(["check-convergence", iterates[-1], iterates[-2], iterates[0]]) == 0
+    assert main(["check-convergence", iterates[1], iterates[0], iterates[0]]) == 1
+
+    (output_dir / "CLI_1" / "ocean.output").touch()
+    assert main(["reduce-output", iterates[0]]) == 0
+    assert not (output_dir / "CLI_1" / "ocean.output").exists()
+
+
+def test_cli_run(tmp_path):
+    config_file, output_dir = write_config(tmp_path)
+    catalog = tmp_path / "catalog.sqlite"
+    assert main(["run", str(config_file), "--catalog", str(catalog)]) == 0
+    assert (output_dir / "CLI" / "progvar.nc").exists()
+    assert len(ExperimentCatalog(catalog).find()) == 1
+
+    # a failing model gives a non-zero exit status and is not recorded
+    context, _ = load_setup(config_file)
+    (context.model_dir / stub_config_name).unlink()
+    catalog.unlink()
+    assert main(["run", str(config_file), "--catalog", str(catalog)]) == 1
+    assert ExperimentCatalog(catalog).find() == []
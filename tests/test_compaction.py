@@ -0,0 +1,42 @@
+import numpy as np
+import xarray as xr
+
+from AOSCMcoupling.compaction import compact_output
+
+
+def test_compact_output(tmp_path):
+    time = np.arange(1000)
+    ds = xr.Dataset(
+        {
+            "t": (("time", "lev"), np.tile(np.sin(time)[:, None], (1, 60))),
+            "ts": ("time", np.cos(time)),
+        },
+        coords={"time": time},
+        attrs={"title": "diagvar"},
+    )
+    ds.to_netcdf(tmp_path / "diagvar.nc")
+    ds.to_netcdf(tmp_path / "rstas.nc")
+    size = (tmp_path / "diagvar.nc").stat().st_size
+
+    bytes_saved = compact_output(tmp_path, float32_variables=["t"], max_workers=2)
+    assert bytes_saved == size - (tmp_path / "diagvar.nc").stat().st_size > 0
+    assert (tmp_path / "rstas.nc").stat().st_size == size
+    with xr.open_dataset(tmp_path / "diagvar.nc") as compacted:
+        assert compacted.t.dtype == np.float32
+        assert compacted.t.encoding["zlib"]
+        xr.testing.assert_allclose(compacted, ds, rtol=1e-6)
+        assert compacted.ts.dtype == np.float64
+        assert compacted.attrs == ds.attrs
+    assert compact_output(tmp_path) == 0
+
+
+def test_compact_output_keeps_coordinates(tmp_path):
+    time = 1e9 + np.arange(1000.0)
+    xr.Dataset({"ts": ("time", np.cos(time))}, coords={"time": time}).to_netcdf(
+        tmp_path / "diagvar.nc"
+    )
+    compact_output(tmp_path, float32_variables=True, max_workers=1)
+    with xr.open_dataset(tmp_path / "diagvar.nc") as compacted:
+        assert compacted.ts.dtype == np.float32
+        assert compacted.time.dtype == np.float64
+        np.testing.assert_array_equal(compacted.time, time)
@@ -1,7 +1,17 @@
 import numpy as np
+import pytest
 import xarray as xr
+from conftest import write_coupling_file
 
-from AOSCMcoupling.convergence_checker import relative_criterion, vector_norm
+from AOSCMcoupling.convergence_checker import (
+    ConvergenceChecker,
+    ConvergenceMonitor,
+    criteria_from_error_table,
+    error_table,
+    relative_criterion,
+    relative_error,
+    vector_norm,
+)
 
 
 def test_vector_norm():
@@ -18,3 +28,66 @@ def test_relative_criterion():
     da_2 = xr.DataArray(arr_2, dims="time")
     assert relative_criterion(da_1, da_2, da_1, 1e-3)
     assert not relative_criterion(da_1, da_2, da_1, 1e-5)
+
+
+def test_convergence_checker(tmp_path, coupling_files):
+    reference = coupling_files(tmp_path / "iter_1")
+    iterate_2 = coupling_files(tmp_path / "iter_2", 1 + 1e-2)
+    iterate_3 = coupling_files(tmp_path / "iter_3", 1 + 1e-2 + 1e-4)
+    checker = ConvergenceChecker()
+    assert checker.check_convergence(iterate_2, reference, reference, 1e-3) == (
+        False,
+        False,
+    )
+    assert checker.check_convergence(iterate_3, iterate_2, reference, 1e-3) == (
+        True,
+        True,
+    )
+    assert set(checker._iterates) == {reference, iterate_3}
+
+    iterate_4 = coupling_files(tmp_path / "iter_4", n_time=24)
+    with pytest.raises(ValueError, match="number of time steps"):
+        checker.check_convergence(iterate_4, iterate_3, reference, 1e-3)
+    write_coupling_file(iterate_4 / "O_SSTSST_oceanx_01.nc", "O_SSTSST", np.ones(25))
+    with pytest.raises(ValueError, match="differ in length"):
+        checker.check_convergence(iterate_4, iterate_3, reference, 1e-3)
+
+
+def test_error_table():
+    arr_1 = np.random.rand(2, 5)
+    arr_2 = arr_1 * (1 + 1e-4)
+    da_1 = xr.DataArray(
+        arr_1, dims=("variable", "time"), coords={"variable": ["a", "b"]}
+    )
+    da_2 = xr.DataArray(
+        arr_2, dims=("variable", "time"), coords={"variable": ["a", "b"]}
+    )
+    table = error_table(da_1, da_2, da_1)
+    for ord, name in ((2, "2-norm"), (np.inf, "inf-norm")):
+        expected = relative_error(da_1, da_2, da_1, ord).to_numpy()
+        assert np.allclose(table[name, "relative"], expected)
+    assert criteria_from_error_table(table, 1e-3) == {"2-norm": True, "inf-norm": True}
+    assert not any(criteria_from_error_table(table, 1e-5).values())
+
+
+def test_convergence_monitor():
+    monitor = ConvergenceMonitor(rel_tol=1e-3, window=3)
+    assert monitor.update(1e-1)["status"] == "unknown"
+    for error in (1e-2, 1e-3 * 2, 2e-3 / 5):
+        prediction = monitor.update(error)
+    assert prediction["status"] == "converged"
+    assert prediction["remaining_iterations"] == 0
+
+    monitor = ConvergenceMonitor(rel_tol=1e-3, window=2)
+    for error in (0.8, 0.4, 0.2):
+        prediction = monitor.update(error)
+    assert prediction["status"] == "converging"
+    assert np.isclose(prediction["contraction_factor"], 0.5)
+    # 0.2 * 0.5^8 < 1e-3 < 0.2 * 0.5^7
+    assert prediction["remaining_iterations"] == 8
+
+    monitor = ConvergenceMonitor(rel_tol=1e-3, window=2)
+    for error in (0.5, 0.49, 0.48):
+        prediction = monitor.update(error)
+    assert prediction["status"] == "stagnating"
+    assert monitor.update(0.6)["status"] == "diverging"
@@ -0,0 +1,55 @@
+import stat
+
+from AOSCMcoupling.cli import main
+from AOSCMcoupling.deduplication import deduplicate, prune_store
+
+
+def write_iterates(output_dir, exp_id, iterations):
+    for iteration in range(1, iterations + 1):
+        iterate_dir = output_dir / f"{exp_id}_{iteration}"
+        iterate_dir.mkdir(parents=True)
+        (iterate_dir / "namcouple").write_text("namcouple " * 100)
+        (iterate_dir / "namelist_cfg").write_text(f"namelist {exp_id}")
+        (iterate_dir / "fort.4").write_text(f"fort.4 {exp_id} {iteration}")
+        (iterate_dir / "diagvar.nc").write_text("diagvar")
+
+
+def test_deduplicate(tmp_path):
+    output_dir = tmp_path / "output"
+    write_iterates(output_dir, "EXP1", 3)
+    write_iterates(output_dir, "EXP2", 2)
+    store = tmp_path / "store"
+
+    bytes_saved = deduplicate([output_dir], store)
+    namcouple = output_dir / "EXP1_1" / "namcouple"
+    assert namcouple.stat().st_nlink == 6
+    assert namcouple.read_text() == "namcouple " * 100
+    assert namcouple.stat().st_mode & stat.S_IWUSR == 0
+    assert (output_dir / "EXP1_1" / "namelist_cfg").stat().st_nlink == 4
+    assert (output_dir / "EXP2_2" / "namelist_cfg").stat().st_nlink == 3
+    assert (output_dir / "EXP1_1" / "fort.4").stat().st_nlink == 2
+    assert (output_dir / "EXP1_1" / "diagvar.nc").stat().st_nlink == 1
+    assert bytes_saved == 4 * 1000 + 2 * len("namelist EXP1") + len("namelist EXP2")
+    assert sorted(path.name for path in (output_dir / "EXP1_1").iterdir()) == [
+        "diagvar.nc",
+        "fort.4",
+        "namcouple",
+        "namelist_cfg",
+    ]
+
+    write_iterates(output_dir, "EXP3", 1)
+    assert deduplicate([output_dir / "EXP3_1"], store) == 1000
+    assert deduplicate([output_dir], store) == 0
+
+    for iteration in range(1, 4):
+        (output_dir / f"EXP1_{iteration}" / "fort.4").unlink()
+    assert prune_store(store) == 3 * len("fort.4 EXP1 1")
+
+
+def test_cli_deduplicate(tmp_path, capsys):
+    write_iterates(tmp_path / "output", "EXP", 2)
+    store = tmp_path / "store"
+    argv = ["deduplicate", str(store), str(tmp_path / "output" / "EXP_1")]
+    assert main([*argv, str(tmp_path / "output" / "EXP_2"), "--prune"]) == 0
+    assert "Deduplication saved" in capsys.readouterr().out
+    assert (tmp_path / "output" / "EXP_2" / "namcouple").stat().st_nlink == 3
@@ -0,0 +1,21 @@
+import AOSCMcoupling.ensemble as ensemble
+
+
+def test_sweep(experiment):
+    experiments = ensemble.sweep(experiment, cpl_scheme=[0, 1, 2], dt_nemo=[900, 1800])
+    assert len(experiments) == 6
+    assert {(exp.cpl_scheme, exp.dt_nemo) for exp in experiments} == {
+        (cpl_scheme, dt_nemo) for cpl_scheme in (0, 1, 2) for dt_nemo in (900, 1800)
+    }
+    assert all(exp.dt_ice == exp.dt_nemo for exp in experiments)
+    assert all(exp.dt_cpl == experiment.dt_cpl for exp in experiments)
+
+
+def test_create_sandbox(context, tmp_path):
+    (context.runscript_dir / "config-run.xml").write_text("original")
+    sandbox_context = ensemble.create_sandbox(context, tmp_path / "sandbox")
+    assert sandbox_context.runscript_dir != context.runscript_dir
+    assert (sandbox_context.runscript_dir / "config-run.xml").read_text() == "original"
+    assert sandbox_context.aoscm_executable.parent == sandbox_context.runscript_dir
+    assert sandbox_context.output_dir.name == context.output_dir.name
+    assert sandbox_context.output_dir.exists()
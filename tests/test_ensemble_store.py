@@ -0,0 +1,73 @@
+import netCDF4
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from AOSCMcoupling.ensemble_store import EnsembleStore
+from AOSCMcoupling.files import OIFSEnsemblePreprocessor
+
+
+def write_oifs_member(root, start_date, coupling_scheme):
+    member_dir = root / start_date / coupling_scheme
+    member_dir.mkdir(parents=True)
+    time = pd.to_timedelta(np.arange(24), unit="h")
+    ds = xr.Dataset(
+        {
+            "t": (("time", "lev"), np.random.rand(24, 60)),
+            "ts": ("time", np.random.rand(24)),
+        },
+        coords={"time": time, "lev": np.arange(60)},
+    )
+    ds.to_netcdf(member_dir / "diagvar.nc")
+
+
+def test_ensemble_store(tmp_path):
+    root = tmp_path / "ensemble"
+    for start_date in ("2014-07-01", "2014-07-02"):
+        for coupling_scheme in ("parallel", "schwarz"):
+            write_oifs_member(root, start_date, coupling_scheme)
+
+    store = EnsembleStore(tmp_path / "oifs.nc", "oifs")
+    assert store.ingest(root, "diagvar.nc") == 4
+    assert store.ingest(root, "diagvar.nc") == 0
+    assert (pd.Timestamp("2014-07-02"), "converged SWR") in store.members()
+
+    preprocessor = OIFSEnsemblePreprocessor()
+    with xr.open_mfdataset(
+        sorted(root.glob("*/*/diagvar.nc")),
+        preprocess=preprocessor.preprocess_ensemble,
+    ) as expected:
+        with store.open() as actual:
+            actual = actual.sortby(["coupling_scheme", "start_date"])
+            expected = expected.sortby(["coupling_scheme", "start_date"])
+            xr.testing.assert_allclose(actual[["t", "ts"]], expected[["t", "ts"]])
+
+
+def test_interrupted_append(tmp_path, monkeypatch):
+    root = tmp_path / "ensemble"
+    write_oifs_member(root, "2014-07-01", "parallel")
+    store = EnsembleStore(tmp_path / "oifs.nc", "oifs")
+    assert store.ingest(root, "diagvar.nc") == 1
+
+    # an append interrupted after writing the data of a second member
+    with netCDF4.Dataset(store.path, "a") as dataset:
+        dataset.variables["t"][1] = np.zeros((24, 60))
+        dataset.variables["coupling_scheme"][1] = "schwarz"
+    assert EnsembleStore(store.path, "oifs").members() == [
+        (pd.Timestamp("2014-07-01"), "parallel")
+    ]
+    with store.open(unstack=False) as ds:
+        assert ds.sizes["member"] == 1
+
+    write_oifs_member(root, "2014-07-01", "schwarz")
+    store = EnsembleStore(store.path, "oifs")
+    reads = []
+    members = store.members
+    monkeypatch.setattr(store, "members", lambda: reads.append(1) or members())
+    assert store.ingest(root, "diagvar.nc") == 1
+    # the store is read once per ingest, not once per member
+    assert len(reads) == 1
+    with store.open(unstack=False) as ds:
+        # the slot of the interrupted append is reused
+        assert ds.sizes["member"] == 2
+        assert not (ds.t.isel(member=1) == 0).all()
@@ -1,5 +1,10 @@
 import os
 
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
 import AOSCMcoupling.files as files
 
 
@@ -9,3 +14,98 @@ def test_change_directory(tmpdir):
     with files.ChangeDirectory(nwd):
         assert os.getcwd() == nwd
     assert os.getcwd() == cwd
+
+
+def write_oifs_output(path, n_time=12):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    xr.Dataset(
+        {
+            "t": (("time", "nlev"), np.random.rand(n_time, 60), {"units": "K"}),
+            "ts": ("time", np.random.rand(n_time)),
+            "ncextr": ("time", np.zeros(n_time)),
+        },
+        coords={
+            "time": pd.to_timedelta(900 * np.arange(n_time), unit="s"),
+            "nlev": np.arange(60),
+        },
+    ).to_netcdf(path)
+    return path
+
+
+def write_nemo_output(path, start_date, n_time=12, calendar="gregorian"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ds = xr.Dataset(
+        {
+            "sst": (("time_counter", "y", "x"), np.random.rand(n_time, 3, 3)),
+            "votemper": (
+                ("time_counter", "deptht", "y", "x"),
+                np.random.rand(n_time, 75, 3, 3),
+            ),
+        },
+        coords={
+            "time_counter": 900.0 * np.arange(n_time),
+            "deptht": np.linspace(0.5, 500, 75),
+        },
+    )
+    ds.time_counter.attrs = {
+        "units": f"seconds since {start_date.date()} 00:00:00",
+        "calendar": calendar,
+    }
+    ds.to_netcdf(path)
+    return path
+
+
+@pytest.mark.parametrize("origin", ["2014-07-01", "2014-07-01 06:00"])
+def test_load_output(tmp_path, origin):
+    origin = pd.Timestamp(origin)
+    time_shift = pd.Timedelta("-8h")
+    oifs_files = [write_oifs_output(tmp_path / "diagvar.nc")]
+    preprocessor = files.OIFSPreprocessor(origin, time_shift)
+    with xr.open_mfdataset(oifs_files, preprocess=preprocessor.preprocess) as ds:
+        expected = ds[["t", "ts"]].load()
+    actual = files.load_oifs_output(oifs_files, ["t", "ts"], origin, time_shift)
+    xr.testing.assert_identical(actual, expected)
+
+    nemo_files = [write_nemo_output(tmp_path / "grid_T.nc", origin, calendar="noleap")]
+    preprocessor = files.NEMOPreprocessor(origin, time_shift)
+    with xr.open_mfdataset(nemo_files, preprocess=preprocessor.preprocess) as ds:
+        expected = ds[["sst", "votemper"]].load()
+    actual = files.load_nemo_output(nemo_files, ["sst", "votemper"], origin, time_shift)
+    xr.testing.assert_identical(actual.drop_vars(["y", "x"], errors="ignore"), expected)
+
+    time_range = (expected.time[2].values, expected.time[5].values)
+    actual = files.load_nemo_output(
+        nemo_files, ["sst"], origin, time_shift, time_range=time_range
+    )
+    xr.testing.assert_identical(actual.sst, expected.sst[2:6])
+
+
+def test_load_ensemble(tmp_path):
+    oifs_files = []
+    nemo_files = []
+    for start_date in ("2014-07-01", "2014-07-02"):
+        for coupling_scheme in ("parallel", "schwarz"):
+            member_dir = tmp_path / start_date / coupling_scheme
+            oifs_files.append(write_oifs_output(member_dir / "diagvar.nc"))
+            nemo_files.append(
+                write_nemo_output(member_dir / "grid_T.nc", pd.Timestamp(start_date))
+            )
+    time_shift = pd.Timedelta("2h")
+
+    preprocessor = files.OIFSEnsemblePreprocessor(time_shift)
+    with xr.open_mfdataset(
+        oifs_files, preprocess=preprocessor.preprocess_ensemble
+    ) as ds:
+        expected = ds[["t"]].load()
+    actual = files.load_oifs_ensemble(oifs_files, ["t"], time_shift)
+    xr.testing.assert_identical(actual, expected)
+    actual = files.load_oifs_ensemble(oifs_files, ["t"], time_shift, ("0h", "1h"))
+    assert actual.time.size == 5
+
+    preprocessor = files.NEMOEnsemblePreprocessor(time_shift)
+    with xr.open_mfdataset(
+        nemo_files, preprocess=preprocessor.preprocess_ensemble
+    ) as ds:
+        expected = ds[["sst"]].load()
+    actual = files.load_nemo_ensemble(nemo_files, ["sst"], time_shift)
+    xr.testing.assert_identical(actual, expected)
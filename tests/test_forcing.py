@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from AOSCMcoupling.forcing import ForcingIndex, compute_nstrtinis, read_forcing_info
+from AOSCMcoupling.helpers import compute_nstrtini, get_ifs_forcing_info
+
+
+def write_forcing(path, start_date="2014-07-01", n_time=20, nlev=60, dt_hours=6):
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(
+        dt_hours * np.arange(n_time), unit="h"
+    )
+    xr.Dataset(
+        {
+            "date": ("time", dates.strftime("%Y%m%d").astype(int)),
+            "second": ("time", (dates - dates.normalize()).total_seconds()),
+        },
+        coords={"time": dt_hours * 3600.0 * np.arange(n_time), "nlev": np.arange(nlev)},
+    ).to_netcdf(path)
+    return path
+
+
+def test_compute_nstrtinis():
+    start_dates = pd.date_range("2014-07-01", "2014-07-10", freq="1D")
+    forcing_start_date = pd.Timestamp("2014-07-01")
+    expected = [compute_nstrtini(date, forcing_start_date) for date in start_dates]
+    assert list(compute_nstrtinis(start_dates, forcing_start_date)) == expected
+    assert list(compute_nstrtinis(start_dates[:2], forcing_start_date, 3)) == [1, 9]
+    with pytest.raises(ValueError, match="2014-06-30"):
+        compute_nstrtinis(["2014-06-30", "2014-07-01"], forcing_start_date)
+    with pytest.raises(ValueError, match="03:00"):
+        compute_nstrtinis(["2014-07-01 03:00", "2014-07-02"], forcing_start_date)
+
+
+def test_read_forcing_info(tmp_path):
+    path = write_forcing(tmp_path / "forcing.nc", n_time=8, nlev=137)
+    info = read_forcing_info(path)
+    assert info.frequency == pd.Timedelta("6h") and info.nlev == 137
+    assert info.end_date == pd.Timestamp("2014-07-02 18:00")
+    assert get_ifs_forcing_info(path) == (info.start_date, info.frequency, 137)
+    assert list(info.nstrtini(["2014-07-01", "2014-07-02 12:00"])) == [1, 7]
+    with pytest.raises(ValueError):
+        info.nstrtini(["2014-07-02"], end_dates=["2014-07-03"])
+
+
+def test_forcing_index(tmp_path):
+    write_forcing(tmp_path / "july.nc", "2014-07-01", n_time=4 * 31)
+    write_forcing(tmp_path / "august.nc", "2014-08-01", n_time=4 * 31, nlev=137)
+    (tmp_path / "restart.nc").touch()
+    cache_file = tmp_path / "index.json"
+
+    index = ForcingIndex(tmp_path, cache_file=cache_file)
+    assert [info.path.name for info in index.scan()] == ["august.nc", "july.nc"]
+    start_dates = pd.DatetimeIndex(["2014-07-10", "2014-08-10"])
+    found = index.find(start_dates, start_dates + pd.Timedelta("2D"))
+    assert [(info.path.name, nstrtini) for info, nstrtini in found] == [
+        ("july.nc", 37),
+        ("august.nc", 37),
+    ]
+    with pytest.raises(ValueError, match="2014-07-30"):
+        index.find(["2014-07-30"], ["2014-08-02"])
+    with pytest.raises(ValueError):
+        index.find(start_dates, start_dates, nlev=60)
+
+    # metadata is read from the cache file, unless a file changed
+    cached = ForcingIndex(tmp_path, cache_file=cache_file)
+    assert cached.get(tmp_path / "july.nc") == index.get(tmp_path / "july.nc")
+    write_forcing(tmp_path / "july.nc", "2014-07-02", n_time=10)
+    assert cached.get(tmp_path / "july.nc").start_date == pd.Timestamp("2014-07-02")
@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pandas as pd
 import pytest
 
@@ -13,3 +16,70 @@ def test_compute_nstrtini():
     start_date = pd.Timestamp("2014-07-02")
     assert helpers.compute_nstrtini(start_date, forcing_start_date) == 5
     assert helpers.compute_nstrtini(start_date, forcing_start_date, 3) == 9
+
+
+def _write_script(path, lines):
+    path.write_text("\n".join(["#!/bin/sh", *lines]) + "\n")
+    path.chmod(0o755)
+    return path
+
+
+def test_run_model_async(context):
+    script = _write_script(
+        context.runscript_dir / "run.sh",
+        ["echo 'Finished leg 1 at 2014-07-02 00:00:00'", "echo warning >&2"],
+    )
+    aoscm = helpers.AOSCM(context)
+    events = []
+    asyncio.run(aoscm._run_model_async(script, on_event=events.append))
+    assert [event.kind for event in events] == ["leg_finished"]
+    assert events[0].simulated_time == pd.Timestamp("2014-07-02")
+    log = (context.runscript_dir / "run.log").read_text()
+    assert "Finished leg" in log and "warning" in log
+
+
+def test_run_model_async_fails_fast(context):
+    aoscm = helpers.AOSCM(context)
+    script = _write_script(context.runscript_dir / "fail.sh", ["exit 3"])
+    with pytest.raises(helpers.ModelRunError) as error:
+        asyncio.run(aoscm._run_model_async(script))
+    assert error.value.returncode == 3
+
+    script = _write_script(
+        context.runscript_dir / "abort.sh", ["echo 'MPI ABORT called'", "sleep 30"]
+    )
+    start = time.perf_counter()
+    with pytest.raises(helpers.ModelRunError):
+        asyncio.run(aoscm._run_model_async(script))
+    assert time.perf_counter() - start < 10
+
+
+def test_ecconf_cache(context):
+    context.ecconf_executable.write_text(
+        "\n".join(
+            [
+                "#!/bin/sh",
+                "echo run >> ecconf_calls.txt",
+                "touch ece4-scm_oifs.sh ece4-scm_nemo.sh ece4-scm_oifs+nemo.sh",
+                "touch ece4-scm_oifs+nemo_schwarz_corr.sh",
+            ]
+        )
+    )
+    context.ecconf_executable.chmod(0o755)
+    config_run_xml = context.runscript_dir / "config-run.xml"
+    config_run_xml.write_text("<Configuration/>")
+    calls = context.runscript_dir / "ecconf_calls.txt"
+
+    aoscm = helpers.AOSCM(context, cache_ecconf=True)
+    aoscm._run_ecconf()
+    aoscm._run_ecconf()
+    assert len(calls.read_text().splitlines()) == 1
+    config_run_xml.write_text("<Configuration></Configuration>")
+    aoscm._run_ecconf()
+    assert len(calls.read_text().splitlines()) == 2
+    context.aoscm_executable.unlink()
+    aoscm._run_ecconf()
+    assert len(calls.read_text().splitlines()) == 3
+    # ec-conf is run every time by default
+    helpers.AOSCM(context)._run_ecconf()
+    assert len(calls.read_text().splitlines()) == 4
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from AOSCMcoupling.cli import main
+from AOSCMcoupling.iterate_archive import IterateArchive, archive_iterates
+
+
+def write_iterates(output_dir, exp_id, iterations):
+    rng = np.random.default_rng(0)
+    time = pd.date_range("2014-07-01", periods=200, freq="15min")
+    t = 280 + rng.standard_normal((200, 60))
+    sst = 275 + rng.standard_normal(200)
+    for iteration in range(1, iterations + 1):
+        iterate_dir = output_dir / f"{exp_id}_{iteration}"
+        iterate_dir.mkdir(parents=True)
+        # iterates converge towards each other
+        t = t + 10.0 ** (-2 * iteration) * rng.standard_normal(t.shape)
+        t[0, 0] = np.nan
+        xr.Dataset(
+            {
+                "t": (("time", "nlev"), t, {"units": "K"}),
+                "nstep": ("time", np.arange(200)),
+            },
+            coords={"time": time},
+            attrs={"iteration": iteration},
+        ).to_netcdf(iterate_dir / "diagvar.nc")
+        sst = sst + 10.0 ** (-2 * iteration) * rng.standard_normal(sst.shape)
+        xr.Dataset({"O_SSTSST": ("time", sst)}).to_netcdf(
+            iterate_dir / "O_SSTSST_oceanx_01.nc"
+        )
+        (iterate_dir / "namcouple").write_text("namcouple")
+
+
+@pytest.mark.parametrize("keyframe", ["first", "last"])
+def test_archive_iterates(tmp_path, keyframe):
+    output_dir = tmp_path / "output"
+    write_iterates(output_dir, "SWR", 4)
+    archive_iterates(output_dir, "SWR", tmp_path / "archive", keyframe=keyframe)
+
+    archive = IterateArchive(tmp_path / "archive")
+    assert archive.iterations == [1, 2, 3, 4]
+    assert archive.files(2) == ["O_SSTSST_oceanx_01.nc", "diagvar.nc", "namcouple"]
+    for iteration in archive.iterations:
+        for file_name in ("diagvar.nc", "O_SSTSST_oceanx_01.nc"):
+            with xr.open_dataset(output_dir / f"SWR_{iteration}" / file_name) as ds:
+                xr.testing.assert_identical(
+                    archive.open_dataset(iteration, file_name), ds.load()
+                )
+    # the converged iterates 3 and 4 differ least
+    keyframe_iteration, delta_iteration = (1, 4) if keyframe == "first" else (4, 3)
+    keyframe_size = (archive.iterate_dir(keyframe_iteration) / "diagvar.nc").stat()
+    delta_size = (archive.iterate_dir(delta_iteration) / "diagvar.nc").stat()
+    assert delta_size.st_size < 0.75 * keyframe_size.st_size
+
+    restored = archive.restore(3, tmp_path / "restored")
+    assert (restored / "namcouple").read_text() == "namcouple"
+    with (
+        xr.open_dataset(restored / "diagvar.nc") as ds,
+        xr.open_dataset(output_dir / "SWR_3" / "diagvar.nc") as original,
+    ):
+        xr.testing.assert_identical(ds, original)
+
+
+def test_archive_iterates_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        archive_iterates(tmp_path, "SWR", tmp_path / "archive")
+    with pytest.raises(ValueError):
+        archive_iterates(tmp_path, "SWR", tmp_path / "archive", keyframe="middle")
+
+
+def test_cli_archive(tmp_path):
+    write_iterates(tmp_path / "output", "SWR", 2)
+    argv = ["archive", str(tmp_path / "output"), "SWR", str(tmp_path / "archive")]
+    assert main([*argv, "--keyframe", "last"]) == 0
+    assert IterateArchive(tmp_path / "archive").keyframe == "last"
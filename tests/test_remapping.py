@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import xarray as xr
+from conftest import write_coupling_file
+
+from AOSCMcoupling.remapping import RemapCouplerOutput, atm_to_oce, oce_to_atm
+
+
+@pytest.mark.parametrize("coupling_scheme", [0, 1, 2])
+def test_lean_remapping_matches_xarray(tmp_path, coupling_scheme):
+    read_directory = tmp_path / "iterate"
+    read_directory.mkdir()
+    for name in atm_to_oce:
+        values = np.random.rand(25)
+        write_coupling_file(read_directory / f"{name}_OpenIFS_01.nc", name, values)
+    for i, name in enumerate(oce_to_atm):
+        values = np.random.rand(25)
+        nx = 9 if i % 2 else 1
+        write_coupling_file(read_directory / f"{name}_oceanx_01.nc", name, values, nx)
+
+    results = {}
+    for lean_io in (False, True):
+        write_directory = tmp_path / f"lean_{lean_io}"
+        write_directory.mkdir()
+        RemapCouplerOutput(
+            read_directory,
+            write_directory,
+            coupling_scheme,
+            3600,
+            900,
+            1800,
+            4,
+            lean_io=lean_io,
+            max_workers=4,
+        ).remap()
+        results[lean_io] = write_directory
+    remapped_files = sorted(path.name for path in results[False].iterdir())
+    assert len(remapped_files) == len(atm_to_oce) + len(oce_to_atm)
+    assert remapped_files == sorted(path.name for path in results[True].iterdir())
+    for file_name in remapped_files:
+        with xr.open_dataarray(results[False] / file_name) as expected:
+            with xr.open_dataarray(results[True] / file_name) as actual:
+                xr.testing.assert_identical(actual, expected)
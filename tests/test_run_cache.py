@@ -0,0 +1,84 @@
+import dataclasses
+
+from test_schwarz_coupling import FakeAOSCM
+
+from AOSCMcoupling.run_cache import RunCache
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+
+def test_key(context, experiment, tmp_path):
+    context.aoscm_executable.write_text("run the model")
+    cache = RunCache(tmp_path / "cache")
+    key = cache.key(context, experiment)
+    other_id = dataclasses.replace(experiment, exp_id="BASE", iteration=3)
+    other_output = dataclasses.replace(context, output_dir=tmp_path / "elsewhere")
+    assert cache.key(other_output, other_id) == key
+    assert cache.key(context, dataclasses.replace(experiment, dt_cpl=1800)) != key
+
+    experiment.oasis_rstas.write_text("different restart")
+    new_key = cache.key(context, experiment)
+    assert new_key != key
+    context.aoscm_executable.write_text("run another model")
+    new_key = cache.key(context, experiment)
+    assert new_key != key
+
+    nemo_executable = context.model_dir / "sources/nemo-3.6/CONFIG/BLD/bin/nemo.exe"
+    nemo_executable.parent.mkdir(parents=True)
+    nemo_executable.write_text("nemo")
+    cache = RunCache(tmp_path / "cache")
+    assert cache.model_binaries(context) == [nemo_executable]
+    recompiled_key = cache.key(context, experiment)
+    assert recompiled_key != new_key
+    nemo_executable.write_text("recompiled nemo")
+    assert cache.key(context, experiment) != recompiled_key
+
+
+def test_store_and_materialize(tmp_path):
+    run_directory = tmp_path / "ice"
+    (run_directory / "output").mkdir(parents=True)
+    (run_directory / "ice_1ts_grid_T.nc").write_text("nemo")
+    (run_directory / "ice_1ts_icemod.nc").write_text("si3")
+    (run_directory / "output" / "diagvar.nc").write_text("oifs")
+    cache = RunCache(tmp_path / "cache")
+    assert not cache.materialize("key", tmp_path / "TEST", "TEST")
+    cache.store("key", run_directory, "ice")
+
+    assert cache.materialize("key", tmp_path / "TEST", "TEST")
+    materialized = tmp_path / "TEST"
+    assert (materialized / "TEST_1ts_grid_T.nc").read_text() == "nemo"
+    # only the leading experiment ID is replaced
+    assert (materialized / "TEST_1ts_icemod.nc").read_text() == "si3"
+    assert (materialized / "output" / "diagvar.nc").read_text() == "oifs"
+    assert (materialized / "output" / "diagvar.nc").stat().st_nlink == 3
+
+
+def test_schwarz_coupling_uses_cache(context, experiment, tmp_path):
+    context.aoscm_executable.write_text("run the model")
+    cache = RunCache(tmp_path / "cache")
+    runs = []
+    for exp_id in ("BASE", "TEST"):
+        schwarz = SchwarzCoupling(
+            dataclasses.replace(experiment, exp_id=exp_id), context, run_cache=cache
+        )
+        schwarz.aoscm = FakeAOSCM(schwarz.run_directory)
+        schwarz.run_directory.mkdir()
+        schwarz.run(2)
+        runs.append(schwarz.aoscm.runs)
+    assert runs == [2, 1]
+    assert (context.output_dir / "TEST_2" / "manifest.json").exists()
+
+
+class FailingAOSCM(FakeAOSCM):
+    def run_coupled_model(self, schwarz_correction=False):
+        super().run_coupled_model(schwarz_correction)
+        return 1
+
+
+def test_failed_run_is_not_cached(context, experiment, tmp_path):
+    context.aoscm_executable.write_text("run the model")
+    cache = RunCache(tmp_path / "cache")
+    schwarz = SchwarzCoupling(experiment, context, run_cache=cache)
+    schwarz.aoscm = FailingAOSCM(schwarz.run_directory)
+    schwarz.run_directory.mkdir()
+    schwarz.run(1)
+    assert cache.entry(cache.key(context, experiment)) is None
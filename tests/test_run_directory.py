@@ -0,0 +1,48 @@
+from AOSCMcoupling.run_directory import RunDirectoryIndex, classify, reduce_output
+
+file_names = {
+    "A_Qs_mix_OpenIFS_01.nc": "coupling",
+    "O_SSTSST_oceanx_01.nc": "coupling",
+    "diagvar.nc": "oifs",
+    "progvar.nc": "oifs",
+    "TEST_1ts_20140701_20140702_grid_T.nc": "nemo",
+    "TEST_1ts_20140701_20140702_icemod.nc": "nemo",
+    "namelist_cfg": "static",
+    "namcouple": "static",
+    "fort.4": "static",
+    "debug.01.000000": "debug",
+    "nout.000000": "debug",
+    "rstas.nc": "other",
+    "ocean.output": "other",
+}
+
+
+def test_run_directory_index(tmp_path):
+    for file_name in file_names:
+        (tmp_path / file_name).touch()
+    # like `Path.glob("*")`, hidden files are included (and removed by reduce_output)
+    (tmp_path / ".ecconf_hash").touch()
+    index = RunDirectoryIndex(tmp_path)
+    assert {path.name: category for path, category in index.files.items()} == {
+        file_name: classify(file_name) for file_name in [*file_names, ".ecconf_hash"]
+    }
+    assert {file_name: classify(file_name) for file_name in file_names} == file_names
+    assert index.coupling_file("A_Qs_mix") == tmp_path / "A_Qs_mix_OpenIFS_01.nc"
+    assert list(index.coupling_files("_oceanx_")) == ["O_SSTSST"]
+
+    reduce_output(index, keep_debug_output=True)
+    assert {path.name for path in tmp_path.iterdir()} == {
+        file_name for file_name, category in file_names.items() if category != "other"
+    }
+    reduce_output(tmp_path, keep_debug_output=False)
+    assert len(RunDirectoryIndex(tmp_path).category("debug")) == 0
+    assert len(RunDirectoryIndex(tmp_path).category("coupling")) == 2
+
+
+def test_coupling_file_first_match(tmp_path):
+    for file_name in ("A_Qs_mix_OpenIFS_01.nc", "A_Qs_mix_ATMIFS_01.nc"):
+        (tmp_path / file_name).touch()
+    index = RunDirectoryIndex(tmp_path)
+    assert index.coupling_file("A_Qs_mix") == next(tmp_path.glob("A_Qs_mix_*.nc"))
+    index.remove(index.coupling_file("A_Qs_mix"))
+    assert index.coupling_file("A_Qs_mix") == next(tmp_path.glob("A_Qs_mix_*.nc"))
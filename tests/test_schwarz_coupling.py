@@ -0,0 +1,199 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xarray as xr
+from conftest import write_coupling_file
+
+from AOSCMcoupling.acceleration import ConstantRelaxation
+from AOSCMcoupling.checkpoint import read_manifest, write_manifest
+from AOSCMcoupling.remapping import atm_to_oce, oce_to_atm
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+
+class FakeAOSCM:
+    """writes coupling fields which converge geometrically instead of running the model."""
+
+    contraction = 0.1
+    nx = 1
+
+    def __init__(self, run_directory, runs=0):
+        self.run_directory = run_directory
+        self.runs = runs
+
+    def _write_output(self):
+        self.runs += 1
+        scale = 1 + self.contraction**self.runs
+        for name in [*atm_to_oce, *oce_to_atm]:
+            separator = "OpenIFS" if name in atm_to_oce else "oceanx"
+            values = scale * (1 + np.sin(np.arange(25)))
+            write_coupling_file(
+                self.run_directory / f"{name}_{separator}_01.nc", name, values, self.nx
+            )
+
+    def run_coupled_model(self, schwarz_correction=False):
+        self._write_output()
+        return 0
+
+    async def run_coupled_model_async(self, schwarz_correction=False):
+        await asyncio.sleep(0.1)
+        self._write_output()
+
+
+def _schwarz_coupling(experiment, context, runs=0):
+    schwarz = SchwarzCoupling(experiment, context)
+    schwarz.aoscm = FakeAOSCM(schwarz.run_directory, runs)
+    schwarz.run_directory.mkdir(parents=True, exist_ok=True)
+    return schwarz
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_stop_at_convergence(context, experiment, pipelined):
+    schwarz = _schwarz_coupling(experiment, context)
+    schwarz.run(6, stop_at_convergence=True, pipelined=pipelined)
+
+    assert schwarz.iter == 4
+    assert experiment.iteration == 4
+    assert experiment.iterate_converged == {"2-norm": True, "inf-norm": True}
+    iterates = sorted(path.name for path in context.output_dir.glob("TEST_*"))
+    assert iterates == ["TEST_1", "TEST_2", "TEST_3", "TEST_4"]
+    assert (context.output_dir / "TEST_4" / "convergence_errors.csv").exists()
+    # the run directory holds the forcing remapped from the converged iterate
+    remapped = {path.name for path in schwarz.run_directory.iterdir()}
+    assert len(remapped) == len(atm_to_oce) + len(oce_to_atm)
+
+
+def test_resume(context, experiment):
+    _schwarz_coupling(experiment, context).run(2)
+    manifest = read_manifest(context.output_dir / "TEST_2")
+    assert manifest["status"] == "complete"
+    assert manifest["iteration"] == 2
+    assert len(manifest["forcing"]) == len(atm_to_oce) + len(oce_to_atm)
+
+    # iteration 3 was interrupted before its postprocessing finished
+    iterate_3 = context.output_dir / "TEST_3"
+    iterate_3.mkdir()
+    write_manifest(iterate_3, {"status": "running"})
+    schwarz = _schwarz_coupling(experiment, context, runs=2)
+    schwarz.run(4, current_iter=None)
+    assert schwarz.aoscm.runs == 4
+    assert read_manifest(iterate_3)["status"] == "complete"
+
+    # everything is done and converged
+    schwarz = _schwarz_coupling(experiment, context, runs=4)
+    schwarz.run(4, current_iter=None, stop_at_convergence=True)
+    assert schwarz.aoscm.runs == 4
+    assert schwarz.iter == 4
+
+    # without current_iter=None, all iterations are redone
+    schwarz = _schwarz_coupling(experiment, context)
+    schwarz.run(2)
+    assert schwarz.aoscm.runs == 2
+
+
+def test_resume_verifies_forcing(context, experiment):
+    _schwarz_coupling(experiment, context).run(2)
+    # modified output of iteration 2 leads to different forcing
+    name = next(iter(atm_to_oce))
+    write_coupling_file(
+        context.output_dir / "TEST_2" / f"{name}_OpenIFS_01.nc", name, np.zeros(25)
+    )
+    schwarz = _schwarz_coupling(experiment, context, runs=1)
+    with pytest.warns(UserWarning, match="does not match"):
+        schwarz.run(3, current_iter=None)
+    assert schwarz.aoscm.runs == 3
+    assert read_manifest(context.output_dir / "TEST_3")["iteration"] == 3
+
+
+def test_resume_after_compaction(context, experiment, recwarn):
+    def schwarz_coupling(runs):
+        schwarz = SchwarzCoupling(
+            experiment,
+            context,
+            compact_output_after_iteration=True,
+            compaction_options={"float32_variables": True, "max_workers": 1},
+        )
+        schwarz.aoscm = FakeAOSCM(schwarz.run_directory, runs)
+        # large enough for compaction to replace the files
+        schwarz.aoscm.nx = 500
+        schwarz.run_directory.mkdir(parents=True, exist_ok=True)
+        return schwarz
+
+    schwarz_coupling(0).run(3)
+    name = next(iter(atm_to_oce))
+    with xr.open_dataset(context.output_dir / "TEST_3" / f"{name}_OpenIFS_01.nc") as ds:
+        assert ds[name].encoding["zlib"]
+        assert ds[name].dtype == np.float64
+
+    schwarz = schwarz_coupling(3)
+    schwarz.run(4, current_iter=None)
+    assert schwarz.aoscm.runs == 4
+    assert not [w for w in recwarn if "does not match" in str(w.message)]
+
+
+def test_pipelined_compaction(context, experiment):
+    # compaction runs in worker processes started from the postprocessing thread
+    schwarz = SchwarzCoupling(
+        experiment,
+        context,
+        compact_output_after_iteration=True,
+        compaction_options={"max_workers": 2},
+    )
+    schwarz.aoscm = FakeAOSCM(schwarz.run_directory)
+    schwarz.aoscm.nx = 500
+    schwarz.run_directory.mkdir(parents=True)
+    schwarz.run(6, stop_at_convergence=True, pipelined=True)
+    assert schwarz.iter == 4
+    name = next(iter(atm_to_oce))
+    with xr.open_dataset(context.output_dir / "TEST_4" / f"{name}_OpenIFS_01.nc") as ds:
+        assert ds[name].encoding["zlib"]
+
+
+def test_acceleration(context, experiment, tmp_path):
+    schwarz = SchwarzCoupling(experiment, context, reduce_output_after_iteration=False)
+    schwarz.aoscm = FakeAOSCM(schwarz.run_directory)
+    schwarz.run_directory.mkdir(parents=True)
+    schwarz.run(2, acceleration=ConstantRelaxation(omega=0.5))
+
+    remapped = tmp_path / "remapped"
+    remapped.mkdir()
+    remapper = schwarz._remapper(context.output_dir / "TEST_2")
+    remapper.write_directory = remapped
+    remapper.remap()
+    for name in atm_to_oce.values():
+        with xr.open_dataarray(remapped / f"{name}.nc") as plain:
+            with xr.open_dataarray(schwarz.run_directory / f"{name}.nc") as relaxed:
+                # x_3 = (G(x_1) + G(x_2)) / 2, the fake output is scaled by 1.1 and 1.01
+                np.testing.assert_allclose(relaxed, plain * 1.055 / 1.01)
+
+
+def test_predictive_stopping(context, experiment):
+    schwarz = _schwarz_coupling(experiment, context)
+    schwarz.aoscm.contraction = 0.98
+    with pytest.warns(UserWarning, match="stagnating"):
+        schwarz.run(20, predictive_stopping=True)
+    assert schwarz.iter == 5
+    assert schwarz.stop_reason == "stagnating"
+    assert experiment.convergence_prediction["status"] == "stagnating"
+    assert experiment.convergence_prediction["contraction_factor"] > 0.95
+
+    # the error history is restored when resuming
+    schwarz = _schwarz_coupling(experiment, context, runs=5)
+    schwarz.aoscm.contraction = 0.98
+    with pytest.warns(UserWarning, match="stagnating"):
+        schwarz.run(20, current_iter=None, predictive_stopping=True)
+    assert schwarz.aoscm.runs == 5
+    assert len(schwarz.monitor.errors) == 4
+
+
+def test_convergence_prediction(context, experiment):
+    schwarz = _schwarz_coupling(experiment, context)
+    schwarz.run(3)
+    prediction = experiment.convergence_prediction
+    assert prediction["status"] == "unknown"
+    assert np.isclose(prediction["contraction_factor"], 0.1, rtol=0.05)
+    assert prediction["predicted_iterations"] == 4
+    assert (
+        "convergence_prediction"
+        in (context.output_dir / "TEST_3" / "setup_dict.yaml").read_text()
+    )
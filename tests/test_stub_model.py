@@ -0,0 +1,19 @@
+import pytest
+from stub_model import create_stub_model
+from swr_benchmark import stub_experiment
+
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+
+
+@pytest.mark.parametrize("model_version", [3, 4])
+def test_schwarz_coupling_with_stub_model(tmp_path, model_version):
+    context = create_stub_model(tmp_path, model_version, contraction=0.05)
+    experiment = stub_experiment(context, days=1)
+    schwarz = SchwarzCoupling(experiment, context)
+    schwarz.run(6, current_iter=1, stop_at_convergence=True)
+    assert schwarz.converged
+    assert 2 < schwarz.iter < 6
+    for iteration in range(1, schwarz.iter + 1):
+        iterate_dir = context.output_dir / f"{experiment.exp_id}_{iteration}"
+        assert (iterate_dir / "progvar.nc").exists()
+        assert list(iterate_dir.glob("*_grid_T.nc"))
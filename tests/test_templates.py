@@ -0,0 +1,31 @@
+import os
+
+import AOSCMcoupling.templates as templates
+
+
+def test_get_template_cache(tmp_path):
+    template_path = tmp_path / "template.j2"
+    template_path.write_text("{{ value }}")
+    template = templates.get_template(template_path)
+    assert templates.get_template(template_path) is template
+    template_path.write_text("value: {{ value }}")
+    os.utime(template_path, (0, template_path.stat().st_mtime + 10))
+    assert templates.get_template(template_path).render(value=1) == "value: 1"
+
+
+def test_render_config_xmls(context, experiment, tmp_path):
+    target_dirs = [tmp_path / "run_1", tmp_path / "run_2"]
+    for target_dir in target_dirs:
+        target_dir.mkdir()
+    paths = templates.render_config_xmls(
+        [(context, experiment), (context, experiment)], target_dirs
+    )
+    assert paths == [target_dir / "config-run.xml" for target_dir in target_dirs]
+    assert paths[0].read_text() == paths[1].read_text()
+    assert "<Value>TEST</Value>" in paths[0].read_text()
+
+    os.utime(paths[0], (0, 0))
+    templates.render_config_xml(context, experiment, target_dirs[0], True)
+    assert paths[0].stat().st_mtime == 0
+    templates.render_config_xml(context, experiment, target_dirs[0])
+    assert paths[0].stat().st_mtime > 0
@@ -0,0 +1,50 @@
+import json
+import threading
+
+from test_schwarz_coupling import FakeAOSCM
+
+from AOSCMcoupling.schwarz_coupling import SchwarzCoupling
+from AOSCMcoupling.tracing import Tracer, trace
+
+
+def test_tracer(tmp_path):
+    tracer = Tracer()
+    with tracer.phase("outer", iteration=1):
+        with trace(tracer, "inner"):
+            pass
+
+    def record_in_thread():
+        with tracer.phase("thread"):
+            pass
+
+    thread = threading.Thread(target=record_in_thread)
+    thread.start()
+    thread.join()
+    with trace(None, "ignored"):
+        pass
+    assert [event.name for event in tracer.events] == ["inner", "outer", "thread"]
+    outer = tracer.events[1]
+    assert outer.args == {"iteration": 1}
+    assert outer.duration >= tracer.events[0].duration
+    assert tracer.events[2].thread != outer.thread
+
+    tracer.to_chrome_trace(tmp_path / "trace.json")
+    trace_events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert trace_events[1]["ph"] == "X" and trace_events[1]["name"] == "outer"
+    tracer.to_json(tmp_path / "events.json")
+    assert json.loads((tmp_path / "events.json").read_text())[0]["name"] == "inner"
+    assert tracer.summary().loc["outer", "count"] == 1
+
+
+def test_schwarz_coupling_phases(context, experiment):
+    tracer = Tracer()
+    schwarz = SchwarzCoupling(experiment, context, tracer=tracer)
+    schwarz.aoscm = FakeAOSCM(schwarz.run_directory)
+    schwarz.run_directory.mkdir(parents=True)
+    schwarz.run(2)
+    summary = tracer.summary()
+    assert summary.loc["coupled_run", "count"] == 2
+    assert summary.loc["remap", "count"] == 2
+    assert summary.loc["convergence_check", "count"] == 1
+    for phase in ("experiment", "render_config", "reduce_output", "write_setup"):
+        assert phase in summary.index
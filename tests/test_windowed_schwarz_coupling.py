@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from stub_model import create_stub_model
+from swr_benchmark import stub_experiment
+from test_schwarz_coupling import FakeAOSCM
+
+from AOSCMcoupling.checkpoint import read_manifest
+from AOSCMcoupling.windowed_schwarz_coupling import (
+    WindowedSchwarzCoupling,
+    check_initial_state,
+    split_windows,
+)
+
+
+def write_nemo_state(path, value):
+    xr.Dataset({"votemper": ("z", np.full(75, value))}).to_netcdf(path)
+
+
+class FakeAOSCMWithRestarts(FakeAOSCM):
+    def _write_output(self):
+        super()._write_output()
+        for name in ("rstas.nc", "rstos.nc"):
+            (self.run_directory / name).write_text(f"run {self.runs}")
+        write_nemo_state(self.run_directory / "TEST_00000024_restart.nc", self.runs)
+
+
+class TestWindowedSchwarzCoupling(WindowedSchwarzCoupling):
+    __test__ = False
+
+    def _schwarz_coupling(self, experiment, context):
+        schwarz = super()._schwarz_coupling(experiment, context)
+        schwarz.aoscm = FakeAOSCMWithRestarts(schwarz.run_directory)
+        schwarz.run_directory.mkdir(exist_ok=True)
+        self.experiments.append(experiment)
+        self.schwarz_couplings.append(schwarz)
+        return schwarz
+
+    def run(self, *args, **kwargs):
+        self.experiments = []
+        self.schwarz_couplings = []
+        return super().run(*args, **kwargs)
+
+
+def write_forcing(experiment):
+    xr.Dataset(
+        {
+            "date": ("time", np.full(20, 20140701)),
+            "second": ("time", 21600 * (np.arange(20) % 4)),
+        },
+        coords={"time": 21600.0 * np.arange(20), "nlev": np.arange(60)},
+    ).to_netcdf(experiment.ifs_input_file)
+    write_nemo_state(experiment.nem_input_file, 0)
+
+
+def test_split_windows():
+    windows = split_windows(
+        pd.Timestamp("2014-07-01"), pd.Timestamp("2014-07-03 12:00"), pd.Timedelta("1D")
+    )
+    assert [end for _, end in windows] == [
+        pd.Timestamp("2014-07-02"),
+        pd.Timestamp("2014-07-03"),
+        pd.Timestamp("2014-07-03 12:00"),
+    ]
+
+
+def test_windowed_schwarz_coupling(context, experiment):
+    write_forcing(experiment)
+    experiment.run_end_date = pd.Timestamp("2014-07-03")
+    with pytest.raises(ValueError):
+        WindowedSchwarzCoupling(experiment, context, pd.Timedelta("90min"))
+    with pytest.raises(ValueError, match="reduce_output_after_window"):
+        WindowedSchwarzCoupling(
+            experiment,
+            context,
+            pd.Timedelta("1D"),
+            reduce_output_after_iteration=True,
+        )
+
+    windowed = TestWindowedSchwarzCoupling(experiment, context, pd.Timedelta("1D"))
+    assert windowed.run(6) == [4, 4]
+
+    first, second = windowed.experiments
+    assert first.ifs_nstrtini == 1 and second.ifs_nstrtini == 5
+    assert first.oasis_rstas == experiment.oasis_rstas
+    restart_dir = context.output_dir / "window_000" / "restart"
+    assert second.oasis_rstas == restart_dir / "rstas.nc"
+    assert second.nem_input_file == restart_dir / "TEST_00000024_restart.nc"
+    assert second.oasis_rstos.read_text() == "run 4"
+    assert read_manifest(restart_dir)["iteration"] == 4
+    assert second.run_start_date == pd.Timestamp("2014-07-02")
+    # restart files are removed from the iterates
+    assert not (context.output_dir / "window_000" / "TEST_4" / "rstas.nc").exists()
+
+    # completed windows are not run again
+    assert windowed.run(6) == [4, 4]
+    assert windowed.experiments[1].oasis_rstas == restart_dir / "rstas.nc"
+    assert [schwarz.aoscm.runs for schwarz in windowed.schwarz_couplings] == [0, 0]
+
+
+def test_windowed_schwarz_coupling_resumes_with_more_iterations(context, experiment):
+    write_forcing(experiment)
+    experiment.run_end_date = pd.Timestamp("2014-07-03")
+    windowed = TestWindowedSchwarzCoupling(experiment, context, pd.Timedelta("1D"))
+    with pytest.warns(UserWarning, match="did not converge"):
+        assert windowed.run(3) == [3, 3]
+
+    # window 0 runs further, so window 1 has to start from its new restarts
+    with pytest.warns(UserWarning, match="did not converge"):
+        iterations = windowed.run(5)
+    restart_dir = context.output_dir / "window_000" / "restart"
+    assert read_manifest(restart_dir)["iteration"] == iterations[0] == 5
+    first, second = windowed.schwarz_couplings
+    assert first.aoscm.runs == 2
+    assert second.experiment.oasis_rstos.read_text() == "run 2"
+    # window 1 is run again from its first iteration
+    assert second.aoscm.runs == iterations[1]
+
+
+def test_check_initial_state(tmp_path):
+    write_nemo_state(tmp_path / "init.nc", 0)
+    write_nemo_state(tmp_path / "restart.nc", 1)
+    check_initial_state(tmp_path / "init.nc", tmp_path / "restart.nc")
+    xr.Dataset({"tn": ("z", np.zeros(75))}).to_netcdf(tmp_path / "restart.nc")
+    with pytest.raises(ValueError, match="votemper"):
+        check_initial_state(tmp_path / "init.nc", tmp_path / "restart.nc")
+
+
+@pytest.mark.parametrize("model_version", [3, 4])
+def test_windowed_schwarz_coupling_with_stub_model(tmp_path, model_version):
+    context = create_stub_model(tmp_path, model_version, contraction=0.05)
+    experiment = stub_experiment(context, days=2)
+    xr.Dataset(
+        {
+            "date": ("time", np.repeat([20140701, 20140702, 20140703], 4)),
+            "second": ("time", 21600 * (np.arange(12) % 4)),
+        },
+        coords={"time": 21600.0 * np.arange(12), "nlev": np.arange(60)},
+    ).to_netcdf(experiment.ifs_input_file)
+
+    windowed = WindowedSchwarzCoupling(experiment, context, pd.Timedelta("1D"))
+    iterations = windowed.run(6)
+    assert len(iterations) == 2 and all(2 < n < 6 for n in iterations)
+    for window in range(2):
+        window_dir = windowed.window_context(window).output_dir
+        assert (window_dir / f"STUB_{iterations[window]}" / "progvar.nc").exists()